@@ -3,7 +3,7 @@
 import tkinter as tk
 import gui.theme_manager
 from gui.tray_app import TrayApplication
-from core import hotkey_handler
+from core import hotkey_handler, audio_capture, transcription, ai
 
 def main():
     """Main function to start VibeType with the correct, stable initialization order."""
@@ -25,7 +25,16 @@ def main():
     print("Starting hotkey listener...")
     hotkey_handler.start_hotkey_listener()
 
-    # 6. Run the main application loop.
+    # 6. Open the persistent microphone stream, if enabled, so dictation starts instantly.
+    audio_capture.warm_up()
+
+    # 7. Load the Whisper model in the resident backend so the first dictation doesn't wait for it.
+    transcription.warm_up()
+
+    # 8. Load the Ollama model in the background so the first AI request doesn't pay for it.
+    ai.warm_up()
+
+    # 9. Run the main application loop.
     print("Starting application main loop...")
     app.run()
 
@@ -4,7 +4,146 @@ import requests
 from tkinter import messagebox
 import json
 import re # Import the regular expression module
-from core.config_manager import load_config
+import threading
+import time
+from core.config_manager import get_config, subscribe
+from core import http_client
+from core.text_stream import SentenceSplitter, ThinkFilter
+
+# --- Model Residency ---
+# Ollama unloads a model keep_alive after its last request (5 minutes by
+# default), and the next request pays a multi-second reload. Every request
+# sends the configured keep_alive, the model is loaded in the background at
+# startup and whenever the Ollama settings change, and with rewarm_when_active
+# on, it is reloaded shortly before it would be unloaded as long as the user
+# has been using VibeType (dictating or pressing AI hotkeys) recently. A
+# keep_alive of 0, or one no longer than REWARM_MARGIN_SECONDS, asks for the
+# model to be unloaded promptly, so it is then neither warmed nor re-warmed.
+
+DEFAULT_KEEP_ALIVE = "30m"
+REWARM_MARGIN_SECONDS = 60.0
+REWARM_CHECK_SECONDS = 30.0
+WARM_UP_TIMEOUT_SECONDS = 120.0
+
+_residency_lock = threading.Lock()
+_last_request_time = None  # time.monotonic() of the last request that (re)started the keep_alive countdown
+_last_activity_time = None # time.monotonic() of the last user activity (see note_user_activity())
+_rewarm_thread = None
+
+# Ollama reads a JSON number as seconds and a string as a Go duration, so a
+# number typed as text ("300", "-1") has to be sent as a number.
+_KEEP_ALIVE_NUMBER = re.compile(r'-?\d+(?:\.\d+)?')
+_KEEP_ALIVE_DURATION = re.compile(r'-?(?:\d+(?:\.\d+)?(?:ns|us|µs|ms|s|m|h))+')
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ns|us|µs|ms|s|m|h)')
+_DURATION_UNIT_SECONDS = {"ns": 1e-9, "us": 1e-6, "µs": 1e-6, "ms": 1e-3, "s": 1, "m": 60, "h": 3600}
+
+def normalize_keep_alive(keep_alive) -> int | str | None:
+    """
+    Returns keep_alive the way Ollama accepts it: seconds as an int ("300" -> 300,
+    "-1" -> -1) and durations ("30m", "1h30m") as strings. None if it is neither.
+    """
+    if isinstance(keep_alive, bool):
+        return None
+    if isinstance(keep_alive, (int, float)):
+        return int(keep_alive)
+    text = str(keep_alive).strip()
+    if _KEEP_ALIVE_NUMBER.fullmatch(text):
+        return int(float(text))
+    if _KEEP_ALIVE_DURATION.fullmatch(text):
+        return text
+    return None
+
+def _keep_alive_seconds(keep_alive) -> float | None:
+    """Converts a normalized keep_alive (see normalize_keep_alive()) to seconds. None means the model is never unloaded."""
+    if isinstance(keep_alive, int):
+        seconds = float(keep_alive)
+    else:
+        seconds = sum(float(amount) * _DURATION_UNIT_SECONDS[unit] for amount, unit in _DURATION_PART.findall(keep_alive))
+        if keep_alive.startswith("-"):
+            seconds = -seconds
+    return None if seconds < 0 else seconds
+
+def _get_keep_alive(ollama_config) -> int | str:
+    keep_alive = normalize_keep_alive(ollama_config.get('keep_alive', DEFAULT_KEEP_ALIVE))
+    return DEFAULT_KEEP_ALIVE if keep_alive is None else keep_alive
+
+def _note_request():
+    global _last_request_time
+    with _residency_lock:
+        _last_request_time = time.monotonic()
+
+def _warm_model():
+    """Loads the configured model into Ollama's memory with an empty prompt."""
+    ollama_config = get_config().get('ai_providers', {}).get('Ollama', {})
+    api_url = ollama_config.get('api_url')
+    model = ollama_config.get('model')
+    if not ollama_config.get('enabled') or not api_url or not model:
+        return
+    if _keep_alive_seconds(_get_keep_alive(ollama_config)) == 0:
+        return # The model would be unloaded again right away.
+    try:
+        started = time.perf_counter()
+        response = http_client.post(f"{api_url}/api/generate",
+                                    json={"model": model, "prompt": "", "keep_alive": _get_keep_alive(ollama_config)},
+                                    timeout=WARM_UP_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        _note_request()
+        print(f"Ollama model '{model}' is loaded ({time.perf_counter() - started:.1f}s).")
+    except requests.exceptions.RequestException as e:
+        print(f"Could not warm up Ollama model '{model}': {e}")
+
+def _rewarm_if_expiring():
+    """Reloads the model shortly before its keep_alive runs out, if the user has been active since it was last used."""
+    ollama_config = get_config().get('ai_providers', {}).get('Ollama', {})
+    if not ollama_config.get('rewarm_when_active', False):
+        return
+    keep_alive = _keep_alive_seconds(_get_keep_alive(ollama_config))
+    # Never unloaded, or so short-lived that it would be reloaded on every check.
+    if keep_alive is None or keep_alive <= REWARM_MARGIN_SECONDS:
+        return
+    with _residency_lock:
+        last_request, last_activity = _last_request_time, _last_activity_time
+    if last_request is None or last_activity is None:
+        return
+    now = time.monotonic()
+    expires_soon = now >= last_request + keep_alive - REWARM_MARGIN_SECONDS
+    recently_active = now - last_activity < keep_alive
+    if expires_soon and recently_active:
+        print("Ollama model is about to be unloaded and the user is active; warming it again.")
+        _warm_model()
+
+def _rewarm_loop():
+    while True:
+        time.sleep(REWARM_CHECK_SECONDS)
+        _rewarm_if_expiring()
+
+def _on_ollama_config_changed(diff: dict):
+    """
+    Loads the newly selected model (or server) in the background so the next AI
+    request doesn't wait for it. Unlike warm_up(), this ignores the warm_up
+    setting, which only covers startup.
+    """
+    if any(key in diff for key in ('model', 'api_url', 'enabled', 'keep_alive', '')):
+        threading.Thread(target=_warm_model, daemon=True).start()
+
+subscribe('ai_providers.Ollama', _on_ollama_config_changed)
+
+def warm_up():
+    """Loads the configured Ollama model in the background, and starts the re-warm timer. Called at startup."""
+    global _rewarm_thread
+    ollama_config = get_config().get('ai_providers', {}).get('Ollama', {})
+    if ollama_config.get('enabled') and ollama_config.get('warm_up', True):
+        threading.Thread(target=_warm_model, daemon=True).start()
+    with _residency_lock:
+        if _rewarm_thread is None:
+            _rewarm_thread = threading.Thread(target=_rewarm_loop, daemon=True)
+            _rewarm_thread.start()
+
+def note_user_activity():
+    """Records that the user is using VibeType, which keeps the model warm with rewarm_when_active."""
+    global _last_activity_time
+    with _residency_lock:
+        _last_activity_time = time.monotonic()
 
 def get_ollama_models(api_url: str) -> list:
     """Fetches the list of available models from the Ollama API."""
@@ -12,7 +151,7 @@ def get_ollama_models(api_url: str) -> list:
         messagebox.showerror("Error", "Ollama API URL is not set.")
         return []
     try:
-        response = requests.get(f"{api_url}/api/tags", timeout=5)
+        response = http_client.get(f"{api_url}/api/tags", timeout=5)
         response.raise_for_status()
         models = response.json().get("models", [])
         return [model["name"] for model in models]
@@ -23,11 +162,57 @@ def get_ollama_models(api_url: str) -> list:
         messagebox.showerror("API Error", "Received an invalid response from the Ollama API.")
         return []
 
-def get_ai_response(prompt: str, mode: str) -> str:
+def is_streaming_enabled() -> bool:
+    """True if Ollama responses are streamed (see get_ai_response's on_sentence)."""
+    return get_config().get('ai_providers', {}).get('Ollama', {}).get('stream_response', True)
+
+def _strip_thinking(raw_text: str) -> str:
+    # --- DEFINITIVE FIX: Process and clean the text HERE, at the source ---
+    # This robustly finds the closing think tag and takes only the text after it.
+    # This is the only way to guarantee that the rest of the application
+    # NEVER sees the AI's internal monologue.
+    parts = re.split(r'</think.*?>', raw_text, maxsplit=1, flags=re.IGNORECASE | re.DOTALL)
+    if len(parts) > 1:
+        return parts[-1].strip()
+    return raw_text # No think tag found, use the whole response
+
+def _stream_ollama_response(api_url: str, payload: dict, on_sentence) -> str:
+    """
+    Consumes Ollama's NDJSON token stream, calling on_sentence with each sentence of
+    the answer (think blocks removed) as soon as it is complete. Returns the raw text.
+    """
+    think_filter = ThinkFilter()
+    splitter = SentenceSplitter()
+    raw_parts = []
+    # The timeout applies between chunks, not to the whole answer.
+    with http_client.post(f"{api_url}/api/generate", json=dict(payload, stream=True), stream=True, timeout=60) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("error"):
+                raise requests.exceptions.RequestException(chunk["error"])
+            token = chunk.get("response", "")
+            raw_parts.append(token)
+            if on_sentence:
+                for sentence in splitter.feed(think_filter.feed(token)):
+                    on_sentence(sentence)
+            if chunk.get("done"):
+                break
+    if on_sentence:
+        for sentence in splitter.feed(think_filter.flush()) + [splitter.flush()]:
+            if sentence:
+                on_sentence(sentence)
+    return "".join(raw_parts).strip()
+
+def get_ai_response(prompt: str, mode: str, on_sentence=None) -> str:
     """
     Sends a prompt to the configured Ollama server and returns ONLY the final, clean response.
+    With streaming enabled, on_sentence (if given) is called with each sentence of the
+    answer while it is being generated, so it can be spoken before the answer is complete.
     """
-    config = load_config()
+    config = get_config()
     ollama_config = config.get('ai_providers', {}).get('Ollama', {})
 
     if not ollama_config.get('enabled'):
@@ -62,25 +247,22 @@ def get_ai_response(prompt: str, mode: str) -> str:
     payload = {
         "model": model,
         "prompt": full_prompt,
-        "stream": False
+        "stream": False,
+        "keep_alive": _get_keep_alive(ollama_config)
     }
 
     try:
-        response = requests.post(f"{api_url}/api/generate", json=payload, timeout=60)
-        response.raise_for_status()
+        if ollama_config.get('stream_response', True):
+            raw_text = _stream_ollama_response(api_url, payload, on_sentence)
+        else:
+            response = http_client.post(f"{api_url}/api/generate", json=payload, timeout=60)
+            response.raise_for_status()
 
-        response_data = response.json()
-        raw_text = response_data.get("response", "").strip()
+            response_data = response.json()
+            raw_text = response_data.get("response", "").strip()
 
-        # --- DEFINITIVE FIX: Process and clean the text HERE, at the source ---
-        # This robustly finds the closing think tag and takes only the text after it.
-        # This is the only way to guarantee that the rest of the application
-        # NEVER sees the AI's internal monologue.
-        parts = re.split(r'</think.*?>', raw_text, maxsplit=1, flags=re.IGNORECASE | re.DOTALL)
-        if len(parts) > 1:
-            final_text = parts[-1].strip()
-        else:
-            final_text = raw_text # No think tag found, use the whole response
+        _note_request()
+        final_text = _strip_thinking(raw_text)
 
         post_to_webhook(final_text, source=f"AI Response ({mode})")
         return final_text
@@ -90,33 +272,30 @@ def get_ai_response(prompt: str, mode: str) -> str:
         print(error_message)
         return error_message
     except json.JSONDecodeError as e:
-        error_message = f"Failed to decode Ollama response: {e}\nResponse text: {response.text}"
+        error_message = f"Failed to decode Ollama response: {e}"
         print(error_message)
         return error_message
 
 def test_ollama_connection(api_url: str):
-    """Tests the connection to the Ollama API server."""
-    config = load_config()
-    if config.get('privacy', {}).get('local_only_mode', False):
-        messagebox.showinfo("Local-Only Mode", "Network requests are disabled in Local-Only Mode.")
-        return
-
+    """Tests the connection to the Ollama API server. A local server can be tested in Local-Only Mode."""
     if not api_url:
         messagebox.showerror("Error", "Ollama API URL is not set.")
         return
 
     try:
-        response = requests.get(api_url)
+        response = http_client.get(api_url, timeout=5)
         if response.status_code == 200:
             messagebox.showinfo("Success", f"Successfully connected to Ollama at {api_url}.")
         else:
             messagebox.showwarning("Warning", f"Connected to {api_url}, but received status code: {response.status_code}. Ollama may not be running.")
+    except http_client.LocalOnlyModeError as e:
+        messagebox.showinfo("Local-Only Mode", str(e))
     except requests.exceptions.RequestException as e:
         messagebox.showerror("Connection Error", f"Failed to connect to Ollama at {api_url}.\n\nError: {e}")
 
 def send_webhook_test(webhook_url: str):
     """Sends a test payload to the configured webhook URL."""
-    config = load_config()
+    config = get_config()
     if config.get('privacy', {}).get('local_only_mode', False):
         messagebox.showinfo("Local-Only Mode", "Network requests are disabled in Local-Only Mode.")
         return
@@ -132,7 +311,7 @@ def send_webhook_test(webhook_url: str):
     }
 
     try:
-        response = requests.post(webhook_url, headers=headers, data=json.dumps(payload), timeout=10)
+        response = http_client.post(webhook_url, headers=headers, data=json.dumps(payload), timeout=10)
         if 200 <= response.status_code < 300:
             messagebox.showinfo("Success", f"Successfully sent test payload to {webhook_url}.\n\nStatus Code: {response.status_code}")
         else:
@@ -142,7 +321,7 @@ def send_webhook_test(webhook_url: str):
 
 def post_to_webhook(text: str, source: str = "AI Response"):
     """Posts the given text to the user-configured webhook if enabled."""
-    config = load_config()
+    config = get_config()
     if config.get('privacy', {}).get('local_only_mode', False):
         print("Local-Only Mode is enabled. Skipping webhook.")
         return
@@ -164,9 +343,8 @@ def post_to_webhook(text: str, source: str = "AI Response"):
     }
 
     try:
-        with requests.Session() as session:
-            response = session.post(webhook_url, headers=headers, data=json.dumps(payload), timeout=10)
-            if not (200 <= response.status_code < 300):
-                print(f"Webhook call to {webhook_url} failed with status {response.status_code}: {response.text}")
+        response = http_client.post(webhook_url, headers=headers, data=json.dumps(payload), timeout=10)
+        if not (200 <= response.status_code < 300):
+            print(f"Webhook call to {webhook_url} failed with status {response.status_code}: {response.text}")
     except requests.exceptions.RequestException as e:
         print(f"Error sending to webhook at {webhook_url}: {e}")
\ No newline at end of file
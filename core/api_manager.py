@@ -3,7 +3,7 @@
 import multiprocessing
 import time
 import os
-from core.config_manager import load_config
+from core.config_manager import get_config
 
 # --- Globals for managing the server process ---
 api_process = None
@@ -15,7 +15,7 @@ def start_api_server():
         print("API server is already running.")
         return
 
-    config = load_config()
+    config = get_config()
     api_config = config.get('api', {})
     port = api_config.get('port', 5000)
 
@@ -13,12 +13,19 @@ import core.clipboard_manager
 import core.transcript_saver
 import core.tts
 import core.ai
-from core.config_manager import load_config
+import core.incremental_transcription
+import core.two_pass_transcription
+import core.jobs
+import core.dictation_session
+from core.dictation_session import DictationSession
+from core.audio_buffer import release_recording
+from core.config_manager import get_config
 from core.analytics import increment_usage
 
 # --- State & Command Queue ---
 is_recording = False
-is_ai_dictation_session = False
+recording_session = None # DictationSession being recorded; earlier ones may still be processing
+_dictation_lock = threading.Lock() # a hotkey press and an auto-stop can race
 command_queue = None  # The GUI will set this queue.
 status_callback = None # For tray icon updates
 
@@ -60,62 +67,153 @@ def _update_status(status: str):
     if status_callback:
         status_callback(f"VibeType - {status}")
 
-def _submit_to_ai(text: str, mode: str):
-    """Helper function to handle the common logic of sending text to the AI and processing the response."""
-    config = load_config()
+def _submit_to_ai(text: str, mode: str, two_pass=None, session: DictationSession = None):
+    """
+    Helper function to handle the common logic of sending text to the AI and processing the response.
+    With a two-pass draft, the AI works on the draft while the refined transcript is produced, and is
+    asked again only if the refined transcript differs materially. For a dictation session, the
+    response is delivered only after the results of earlier sessions.
+    """
+    config = get_config()
     _update_status("AI Processing")
     active_provider = config.get('active_ai_provider', 'Unknown')
     increment_usage("ai_provider_usage", active_provider)
     increment_usage("ai_mode_usage", mode)
 
+    active_tts_provider = config.get('active_tts_provider', 'Unknown')
+    # Use the 'speak_response' setting from the Ollama provider config
+    speak_response = config.get('ai_providers', {}).get('Ollama', {}).get('speak_response', True) \
+        and config.get('tts_providers', {}).get(active_tts_provider, {}).get('enabled')
+
+    if speak_response and two_pass is None and core.ai.is_streaming_enabled():
+        # Sentences are spoken while the answer streams in. The request goes out right away;
+        # sentences that arrive before this session's delivery turn are held until then.
+        # (With a two-pass draft the answer may be redone, so it isn't streamed.)
+        def speak_sentence(sentence: str):
+            if not spoken:
+                _update_status("Speaking")
+                increment_usage("tts_engine_usage", active_tts_provider)
+            spoken.append(sentence)
+            core.tts.speak_text(_strip_markdown_for_speech(sentence))
+        spoken = []
+        streamed = []
+        sentences = core.dictation_session.DeliveryQueue(session, speak_sentence)
+        def on_sentence(sentence: str):
+            core.jobs.check_cancelled()
+            streamed.append(sentence)
+            sentences.put(sentence)
+        final_text = core.ai.get_ai_response(text, mode=mode, on_sentence=on_sentence)
+        core.jobs.check_cancelled()
+        print(f"Final text after AI processing: {final_text}")
+        with core.dictation_session.delivery_turn(session):
+            sentences.join()
+            _deliver_ai_response(text, final_text, config, speak=not streamed) # errors are spoken whole
+        return
+
     final_text = core.ai.get_ai_response(text, mode=mode)
+    core.jobs.check_cancelled()
+    refined_text = two_pass.refined() if two_pass else None
+    if refined_text and "error" not in refined_text.lower() \
+            and core.two_pass_transcription.differs_materially(text, refined_text):
+        print(f"Refined transcript differs from the draft; asking the AI again: {refined_text}")
+        text = refined_text
+        final_text = core.ai.get_ai_response(text, mode=mode)
+        core.jobs.check_cancelled()
     print(f"Final text after AI processing: {final_text}")
 
+    with core.dictation_session.delivery_turn(session):
+        _deliver_ai_response(text, final_text, config, speak=speak_response)
+
+def _deliver_ai_response(text: str, final_text: str, config, speak: bool):
+    """Injects, copies and saves an AI response, and speaks it if asked to."""
     if config.get('enable_text_injection', True):
         core.text_injection.inject_text(final_text)
 
     core.clipboard_manager.copy_to_clipboard(final_text)
     core.transcript_saver.save_transcript(f"Original: {text}\nAI: {final_text}")
 
-    # Use the 'speak_response' setting from the Ollama provider config
-    if config.get('ai_providers', {}).get('Ollama', {}).get('speak_response', True):
+    if speak:
         active_tts_provider = config.get('active_tts_provider', 'Unknown')
-        if config.get('tts_providers', {}).get(active_tts_provider, {}).get('enabled'):
-            _update_status("Speaking")
-            increment_usage("tts_engine_usage", active_tts_provider)
-            text_for_speech = _strip_markdown_for_speech(final_text)
-            core.tts.speak_text(text_for_speech)
+        _update_status("Speaking")
+        increment_usage("tts_engine_usage", active_tts_provider)
+        text_for_speech = _strip_markdown_for_speech(final_text)
+        core.tts.speak_text(text_for_speech)
+
+def _processing_task(session: DictationSession, audio):
+    """
+    Transcribes and delivers one dictation inside its job, so interrupting can cancel it.
+    Runs concurrently with the recording and processing of other sessions.
+    """
+    try:
+        with core.jobs.activate(session.job):
+            _process_dictation(session, audio)
+    except core.jobs.JobCancelled:
+        print(f"Dictation {session.id} processing cancelled.")
+    finally:
+        session.complete()
+    if not is_recording and not core.dictation_session.has_pending():
+        _update_status("Idle")
+    print(f"Processing thread for dictation {session.id} finished.")
 
-def _processing_task(is_ai_task: bool, mode_override: str = None):
-    _update_status("Transcribing")
-    transcribed_text = core.transcription.transcribe_audio("temp_recording.wav")
-    print(f"Transcription result: {transcribed_text}")
+def _process_dictation(session: DictationSession, audio):
+    if not is_recording:
+        _update_status("Transcribing")
+    two_pass = None
+    try:
+        if session.transcriber:
+            transcribed_text = session.transcriber.finish(audio)
+        elif core.two_pass_transcription.is_enabled(session.action):
+            # The refining pass keeps using the recording and releases it when done.
+            two_pass = core.two_pass_transcription.TwoPassTranscriber(audio)
+            transcribed_text = two_pass.draft()
+        else:
+            transcribed_text = core.transcription.transcribe_audio(audio)
+    finally:
+        if two_pass is None:
+            release_recording(audio)
+    print(f"Transcription result (dictation {session.id}): {transcribed_text}")
 
     if transcribed_text and "error" not in transcribed_text.lower():
-        config = load_config()
+        config = get_config()
         final_text = transcribed_text
 
-        if is_ai_task:
-            mode = mode_override if mode_override else config.get('active_prompt', 'Chat')
-            _submit_to_ai(transcribed_text, mode)
+        if session.is_ai:
+            mode = session.mode_override if session.mode_override else config.get('active_prompt', 'Chat')
+            _submit_to_ai(transcribed_text, mode, two_pass, session)
         else:
-            # Standard dictation: just inject/copy/save/speak the transcript
-            if config.get('enable_text_injection', True):
-                core.text_injection.inject_text(final_text)
-            
-            core.clipboard_manager.copy_to_clipboard(final_text)
-            core.transcript_saver.save_transcript(f"Original: {transcribed_text}")
-
-            if config.get('audio', {}).get('speak_transcription_result', True):
-                active_tts_provider = config.get('active_tts_provider', 'Unknown')
-                if config.get('tts_providers', {}).get(active_tts_provider, {}).get('enabled'):
-                    _update_status("Speaking")
-                    increment_usage("tts_engine_usage", active_tts_provider)
-                    text_for_speech = _strip_markdown_for_speech(final_text)
-                    core.tts.speak_text(text_for_speech)
-    
-    _update_status("Idle")
-    print("Processing thread finished.")
+            # Standard dictation: just inject/copy/save/speak the transcript, after earlier sessions
+            with core.dictation_session.delivery_turn(session):
+                if config.get('enable_text_injection', True):
+                    core.text_injection.inject_text(final_text, replaceable=two_pass is not None)
+
+                core.clipboard_manager.copy_to_clipboard(final_text)
+                if two_pass is None:
+                    _save_and_speak_transcript(final_text, config)
+            if two_pass is not None:
+                # Later sessions can deliver while the refining pass runs.
+                session.finish_delivery()
+                refined_text = two_pass.refined()
+                core.jobs.check_cancelled()
+                if refined_text and "error" not in refined_text.lower() \
+                        and core.two_pass_transcription.differs_materially(final_text, refined_text):
+                    print(f"Refined transcript differs from the draft: {refined_text}")
+                    # The injected draft is only swapped if the user hasn't typed, clicked or switched windows since.
+                    if config.get('enable_text_injection', True):
+                        core.text_injection.replace_injected_text(final_text, refined_text)
+                    core.clipboard_manager.copy_to_clipboard(refined_text)
+                    final_text = refined_text
+                _save_and_speak_transcript(final_text, config)
+
+def _save_and_speak_transcript(text: str, config):
+    core.transcript_saver.save_transcript(f"Original: {text}")
+
+    if config.get('audio', {}).get('speak_transcription_result', True):
+        active_tts_provider = config.get('active_tts_provider', 'Unknown')
+        if config.get('tts_providers', {}).get(active_tts_provider, {}).get('enabled'):
+            _update_status("Speaking")
+            increment_usage("tts_engine_usage", active_tts_provider)
+            text_for_speech = _strip_markdown_for_speech(text)
+            core.tts.speak_text(text_for_speech)
 
 def _read_smart_task():
     """Saves clipboard, copies selected text, speaks it. If no text is selected, it speaks the original clipboard content."""
@@ -143,7 +241,7 @@ def _read_smart_task():
             source = "clipboard"
         # Sanitize selection before speaking
         if text_to_speak:
-            config = load_config()
+            config = get_config()
             active_tts_provider = config.get('active_tts_provider', 'Unknown')
             increment_usage("tts_engine_usage", active_tts_provider)
             sanitized = _strip_logs_for_speech(text_to_speak)
@@ -170,6 +268,7 @@ def _read_smart_task():
 
 def _process_text_from_selection_or_clipboard_task(mode_override: str = None):
     """Task to get text from selection or clipboard and process it with AI."""
+    core.ai.note_user_activity()
     try:
         # 1. Get text to process
         original_clipboard = core.clipboard_manager.get_clipboard_content()
@@ -195,7 +294,7 @@ def _process_text_from_selection_or_clipboard_task(mode_override: str = None):
 
         # 2. Process it
         print(f"Processing {source} with AI...")
-        config = load_config()
+        config = get_config()
         mode = mode_override if mode_override else config.get('active_prompt', 'Chat')
         _submit_to_ai(text_to_process, mode)
         
@@ -204,22 +303,59 @@ def _process_text_from_selection_or_clipboard_task(mode_override: str = None):
         print(f"Error in _process_text_from_selection_or_clipboard_task: {e}")
         _update_status("Idle")
 
+def _stop_dictation(mode_override: str = None):
+    """
+    Stops the recording and hands the session to its own processing thread, so the next
+    dictation can start right away. Must be called with _dictation_lock held.
+    """
+    global is_recording, recording_session
+    session, recording_session = recording_session, None
+    print(f"Stopping dictation {session.id}...")
+    audio = core.audio_capture.stop_capture()
+    is_recording = False
+    session.mode_override = mode_override
+    session.stop_recording()
+    if audio is None:
+        if session.transcriber:
+            session.transcriber.cancel()
+        session.complete()
+        if not core.dictation_session.has_pending():
+            _update_status("Idle")
+        return
+    processing_thread = threading.Thread(target=_processing_task, args=(session, audio))
+    processing_thread.start()
+
+def _on_speech_ended():
+    """Endpoint callback from core.audio_capture: the user stopped talking, so stop without waiting for the hotkey."""
+    with _dictation_lock:
+        if is_recording:
+            _stop_dictation(recording_session.mode_override)
+
+core.audio_capture.register_endpoint_callback(_on_speech_ended)
+
 # --- Public Functions ---
-def toggle_dictation(is_ai_dictation: bool = False, mode_override: str = None):
-    global is_recording, is_ai_dictation_session
+def toggle_dictation(is_ai_dictation: bool = False, mode_override: str = None, action: str = None):
+    """Starts or stops dictation. action names the hotkey action (defaults to toggle_dictation/ai_dictation)."""
+    global is_recording, recording_session
     increment_usage("hotkey_usage", "toggle_dictation")
-    if not is_recording:
-        print("Starting dictation...")
-        is_ai_dictation_session = is_ai_dictation
-        core.audio_capture.start_capture()
-        is_recording = True
-        _update_status("Listening")
-    else:
-        print("Stopping dictation...")
-        core.audio_capture.stop_capture()
-        is_recording = False
-        processing_thread = threading.Thread(target=_processing_task, args=(is_ai_dictation_session, mode_override))
-        processing_thread.start()
+    core.ai.note_user_activity()
+    with _dictation_lock:
+        if not is_recording:
+            if get_config().get('transcription', {}).get('cancel_previous_on_new_dictation', False):
+                # Drop dictations still being processed instead of delivering them after this one.
+                core.jobs.cancel_all_jobs()
+            session = DictationSession(is_ai_dictation, mode_override, action)
+            print(f"Starting dictation {session.id}...")
+            core.audio_capture.start_capture()
+            if core.incremental_transcription.is_enabled() and core.audio_capture.get_recording_buffer() is not None:
+                with core.jobs.activate(session.job):
+                    session.transcriber = core.incremental_transcription.IncrementalTranscriber(core.audio_capture.get_recording_buffer())
+                session.transcriber.start()
+            recording_session = session
+            is_recording = True
+            _update_status("Listening")
+        else:
+            _stop_dictation(mode_override)
 
 def speak_from_clipboard():
     increment_usage("hotkey_usage", "speak_from_clipboard")
@@ -252,11 +388,12 @@ def read_selected_text():
 def start_voice_conversation():
     """Starts a voice conversation using the 'Chat' AI prompt."""
     increment_usage("hotkey_usage", "start_voice_conversation")
-    toggle_dictation(is_ai_dictation=True, mode_override="Chat")
+    toggle_dictation(is_ai_dictation=True, mode_override="Chat", action="voice_conversation")
 
 def interrupt_speech():
-    """Interrupts any ongoing or queued speech."""
+    """Interrupts any ongoing or queued speech and cancels dictations that are still being processed."""
     increment_usage("hotkey_usage", "interrupt_speech")
+    core.jobs.cancel_all_jobs()
     core.tts.stop_speech()
 
 def register_command_queue(q):
@@ -0,0 +1,160 @@
+# core/audio_buffer.py
+
+import io
+import os
+import tempfile
+import wave
+import numpy as np
+
+SAMPLE_WIDTH = 2 # int16
+
+def pcm_to_wav_bytes(samples: np.ndarray, sample_rate: int = 16000, channels: int = 1) -> bytes:
+    """Encodes int16 PCM samples as an in-memory WAV file."""
+    wav_io = io.BytesIO()
+    with wave.open(wav_io, 'wb') as wave_file:
+        wave_file.setnchannels(channels)
+        wave_file.setsampwidth(SAMPLE_WIDTH)
+        wave_file.setframerate(sample_rate)
+        wave_file.writeframes(np.ascontiguousarray(samples, dtype=np.int16).tobytes())
+    return wav_io.getvalue()
+
+def read_wav_file(file_path: str) -> tuple[np.ndarray, int]:
+    """Reads a 16-bit WAV file into an int16 array (mono files only). Returns (samples, sample_rate)."""
+    with wave.open(file_path, 'rb') as wave_file:
+        if wave_file.getsampwidth() != SAMPLE_WIDTH:
+            raise ValueError(f"Unsupported sample width {wave_file.getsampwidth()} in {file_path}")
+        sample_rate = wave_file.getframerate()
+        channels = wave_file.getnchannels()
+        samples = np.frombuffer(wave_file.readframes(wave_file.getnframes()), dtype=np.int16)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples, sample_rate
+
+class PcmBuffer:
+    """
+    A growable in-memory buffer of int16 PCM samples for one recording.
+
+    Storage is preallocated and doubled as needed, so appending a chunk is a
+    single memcpy. Once the recording grows past max_in_memory_bytes, the buffer
+    spills its contents to a temporary WAV file and keeps appending there.
+    """
+    def __init__(self, sample_rate: int = 16000, initial_seconds: float = 30.0, max_in_memory_bytes: int | None = None):
+        self.sample_rate = sample_rate
+        self.max_in_memory_bytes = max_in_memory_bytes
+        self._data = np.empty(max(1, int(sample_rate * initial_seconds)), dtype=np.int16)
+        self._length = 0
+        self._spill_path = None
+        self._spill_file = None
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def duration_seconds(self) -> float:
+        return self._length / self.sample_rate
+
+    @property
+    def spilled(self) -> bool:
+        return self._spill_path is not None
+
+    def append(self, pcm):
+        """Appends raw int16 bytes or an int16 array."""
+        samples = np.frombuffer(pcm, dtype=np.int16) if isinstance(pcm, (bytes, bytearray, memoryview)) else pcm
+        if samples.size == 0:
+            return
+        if self._spill_file is not None:
+            self._spill_file.writeframes(samples.astype(np.int16, copy=False).tobytes())
+            self._length += samples.size
+            return
+
+        needed = self._length + samples.size
+        if self.max_in_memory_bytes is not None and needed * SAMPLE_WIDTH > self.max_in_memory_bytes:
+            self._spill()
+            self.append(samples)
+            return
+        if needed > self._data.size:
+            grown = np.empty(max(needed, self._data.size * 2), dtype=np.int16)
+            grown[:self._length] = self._data[:self._length]
+            self._data = grown
+        self._data[self._length:needed] = samples
+        self._length = needed
+
+    def _spill(self):
+        """Moves the recording to a temporary WAV file; later appends go straight to disk."""
+        fd, self._spill_path = tempfile.mkstemp(prefix="vibetype_recording_", suffix=".wav")
+        os.close(fd)
+        print(f"Recording exceeded {self.max_in_memory_bytes} bytes; spilling to {self._spill_path}")
+        self._spill_file = wave.open(self._spill_path, 'wb')
+        self._spill_file.setnchannels(1)
+        self._spill_file.setsampwidth(SAMPLE_WIDTH)
+        self._spill_file.setframerate(self.sample_rate)
+        self._spill_file.writeframes(self._data[:self._length].tobytes())
+        self._data = np.empty(0, dtype=np.int16)
+
+    def get_samples(self, start: int = 0, end: int | None = None) -> np.ndarray:
+        """Returns a copy of the in-memory samples in [start, end). Not available once spilled."""
+        if self.spilled:
+            raise RuntimeError("Recording has been spilled to disk.")
+        end = self._length if end is None else min(end, self._length)
+        return self._data[start:end].copy()
+
+    def finalize(self):
+        """
+        Ends the recording. Returns an int16 NumPy array of the samples, or the path
+        of the temporary WAV file if the recording was spilled to disk.
+        """
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+        if self.spilled:
+            return self._spill_path
+        return self._data[:self._length]
+
+class RingBuffer:
+    """A fixed-size circular buffer holding the most recent int16 samples."""
+    def __init__(self, capacity: int):
+        self._data = np.zeros(max(0, capacity), dtype=np.int16)
+        self._write_pos = 0
+        self._filled = 0
+
+    def __len__(self):
+        return self._filled
+
+    @property
+    def capacity(self) -> int:
+        return self._data.size
+
+    def append(self, pcm):
+        """Appends raw int16 bytes or an int16 array, overwriting the oldest samples."""
+        capacity = self._data.size
+        if capacity == 0:
+            return
+        samples = np.frombuffer(pcm, dtype=np.int16) if isinstance(pcm, (bytes, bytearray, memoryview)) else pcm
+        if samples.size >= capacity:
+            self._data[:] = samples[-capacity:]
+            self._write_pos = 0
+            self._filled = capacity
+            return
+        first = min(samples.size, capacity - self._write_pos)
+        self._data[self._write_pos:self._write_pos + first] = samples[:first]
+        self._data[:samples.size - first] = samples[first:]
+        self._write_pos = (self._write_pos + samples.size) % capacity
+        self._filled = min(capacity, self._filled + samples.size)
+
+    def get(self) -> np.ndarray:
+        """Returns a copy of the buffered samples, oldest first."""
+        if self._filled < self._data.size:
+            return self._data[:self._filled].copy()
+        return np.concatenate((self._data[self._write_pos:], self._data[:self._write_pos]))
+
+    def clear(self):
+        self._write_pos = 0
+        self._filled = 0
+
+def release_recording(recording):
+    """Deletes the temporary file behind a spilled recording. In-memory recordings need no cleanup."""
+    if isinstance(recording, str) and os.path.basename(recording).startswith("vibetype_recording_"):
+        try:
+            os.remove(recording)
+        except OSError as e:
+            print(f"Could not remove temporary recording {recording}: {e}")
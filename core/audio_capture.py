@@ -1,87 +1,417 @@
 # core/audio_capture.py
 
 import pyaudio
-import wave
+import queue
 import threading
-from core.config_manager import load_config
+import time
+from core.config_manager import get_config, subscribe
+from core import audio_devices
+from core.audio_buffer import PcmBuffer, RingBuffer
+from core.vad import SilenceEndpointer
+from core.resample import StreamingResampler
+
+# Recordings are always stored as 16 kHz mono, the format whisper expects.
+TARGET_RATE = 16000
 
 # --- Globals ---
 stop_recording_event = threading.Event()
 recording_thread = None
+recording_buffer = None # PcmBuffer of the current/last recording
+
+# --- Warm Input Stream ---
+# With audio.keep_input_stream_open enabled, one input stream stays open for the
+# configured device and a reader thread discards its audio until a recording
+# starts. start_capture() then only has to flip _capture_gate, instead of
+# initializing PortAudio and opening a stream (150-400 ms on some audio stacks).
+_buffer_lock = threading.Lock()
+_capture_gate = threading.Event()
+_warm_stop_event = threading.Event()
+_warm_thread = None
+WARM_STREAM_MAX_BACKOFF_SECONDS = 5.0
+
+# --- Pre-roll ---
+# With audio.pre_roll_ms > 0 the warm stream keeps the last few hundred milliseconds
+# of microphone audio while idle, and start_capture() prepends them to the new
+# recording so words spoken while pressing the hotkey aren't clipped.
+_pre_roll = None # RingBuffer, owned by the warm stream thread and guarded by _buffer_lock
+_warm_queue = None # queue of the open warm stream, guarded by _buffer_lock
+
+# --- Endpointing ---
+# With audio.auto_stop_silence_ms > 0, each recording is watched for trailing
+# silence after speech. When it is reached, the registered endpoint callback
+# (app_state's stop handler) is run on its own thread, so it can call
+# stop_capture() without waiting on the thread that detected the endpoint.
+_endpointer = None # SilenceEndpointer of the current recording, if enabled
+_endpoint_callback = None
+
+# --- Capture Statistics ---
+# Audio is delivered by PortAudio callbacks into a queue.SimpleQueue and appended to
+# the recording by a consumer thread, so a busy GIL (Kokoro G2P, ONNX inference)
+# delays the consumer instead of the device read. These counters show whether
+# that is enough: input overflows reported by PortAudio, frames missing from the
+# ADC timeline, and how far callbacks drift from their expected period.
+# They are only written from the callback thread of the stream that is open.
+_capture_stats = {
+    "callbacks": 0,
+    "frames": 0,
+    "overflows": 0,
+    "dropped_frames": 0,
+    "max_queue_depth": 0,
+    "jitter_total_ms": 0.0,
+    "max_jitter_ms": 0.0,
+}
+QUEUE_POLL_SECONDS = 0.05
 
 # --- Private Functions ---
 def _get_audio_parameters():
-    """Loads audio parameters from the config."""
-    config = load_config()
+    """
+    Loads audio parameters from the config. The stream is opened at the device's
+    native rate and channel count; chunks are converted to TARGET_RATE mono as
+    they arrive.
+    """
+    config = get_config()
+    device_index = config.get('input_device_index')
+    if device_index is not None and not audio_devices.is_input_device(device_index):
+        print(f"Input device {device_index} is not available. Using the system default.")
+        device_index = audio_devices.get_default_input_device_index()
+    device_info = audio_devices.get_device_info(
+        device_index if device_index is not None else audio_devices.get_default_input_device_index())
+    if device_info and device_info['default_sample_rate'] > 0:
+        rate = device_info['default_sample_rate']
+        # Interfaces can expose many inputs; anything past stereo is not needed for a downmix.
+        channels = max(1, min(2, device_info['max_input_channels']))
+    else:
+        rate, channels = TARGET_RATE, 1
+    audio_config = config.get('audio', {})
+    max_in_memory_mb = audio_config.get('max_in_memory_recording_mb', 32)
+    pre_roll_ms = audio_config.get('pre_roll_ms', 0)
+    auto_stop_silence_ms = audio_config.get('auto_stop_silence_ms', 0)
     return {
         "format": pyaudio.paInt16,
-        "channels": 1,
-        "rate": 16000,
-        "chunk_size": 1024,
-        "device_index": config.get('input_device_index')
+        "channels": channels,
+        "rate": rate,
+        # Roughly 64 ms per chunk at any rate
+        "chunk_size": max(256, int(rate * 0.064)),
+        "device_index": device_index,
+        "max_in_memory_bytes": int(max_in_memory_mb * 1024 * 1024) if max_in_memory_mb else None,
+        "pre_roll_samples": int(TARGET_RATE * max(0, pre_roll_ms) / 1000),
+        "auto_stop_silence_ms": auto_stop_silence_ms,
+        "silence_threshold_db": config.get('vad', {}).get('threshold_db', -45.0)
     }
 
-def _record_audio_task(output_filename: str):
+def _is_warm_stream_enabled() -> bool:
+    # The pre-roll buffer can only be filled while the microphone is open.
+    audio_config = get_config().get('audio', {})
+    return audio_config.get('keep_input_stream_open', False) or audio_config.get('pre_roll_ms', 0) > 0
+
+def _make_stream_callback(frame_queue: queue.SimpleQueue, rate: int):
+    """
+    Returns a PortAudio stream callback that pushes each chunk onto frame_queue and
+    updates _capture_stats. It does no other work, so it returns to PortAudio quickly.
+    """
+    last_call = None
+    last_adc_time = None
+
+    def callback(in_data, frame_count, time_info, status_flags):
+        nonlocal last_call, last_adc_time
+        now = time.perf_counter()
+        expected_period = frame_count / rate
+        stats = _capture_stats
+        stats["callbacks"] += 1
+        stats["frames"] += frame_count
+        if status_flags & pyaudio.paInputOverflow:
+            stats["overflows"] += 1
+        if last_call is not None:
+            jitter_ms = abs(now - last_call - expected_period) * 1000
+            stats["jitter_total_ms"] += jitter_ms
+            if jitter_ms > stats["max_jitter_ms"]:
+                stats["max_jitter_ms"] = jitter_ms
+        last_call = now
+
+        # Not every host API fills in the ADC time; a zero means "unknown".
+        adc_time = (time_info or {}).get('input_buffer_adc_time', 0)
+        if adc_time and last_adc_time:
+            gap = adc_time - last_adc_time - expected_period
+            if gap > expected_period / 2:
+                stats["dropped_frames"] += int(round(gap * rate))
+        last_adc_time = adc_time
+
+        frame_queue.put(in_data)
+        depth = frame_queue.qsize()
+        if depth > stats["max_queue_depth"]:
+            stats["max_queue_depth"] = depth
+        return (None, pyaudio.paContinue)
+
+    return callback
+
+def _open_input_stream(audio: pyaudio.PyAudio, params: dict, frame_queue: queue.SimpleQueue):
+    return audio.open(
+        format=params["format"],
+        channels=params["channels"],
+        rate=params["rate"],
+        input=True,
+        frames_per_buffer=params["chunk_size"],
+        input_device_index=params["device_index"],
+        stream_callback=_make_stream_callback(frame_queue, params["rate"])
+    )
+
+def _feed_endpointer(data):
+    """Passes a recorded chunk to the endpointer and fires the endpoint callback when it triggers."""
+    endpointer = _endpointer
+    if endpointer is not None and endpointer.feed(data):
+        print("Trailing silence detected; ending the recording.")
+        if _endpoint_callback:
+            threading.Thread(target=_endpoint_callback, daemon=True).start()
+
+def _make_resampler(params: dict) -> StreamingResampler:
+    if params["rate"] != TARGET_RATE or params["channels"] != 1:
+        print(f"Capturing at {params['rate']} Hz, {params['channels']} channel(s); converting to {TARGET_RATE} Hz mono.")
+    return StreamingResampler(params["rate"], TARGET_RATE, params["channels"])
+
+def _drain(frame_queue: queue.SimpleQueue, buffer: PcmBuffer, resampler: StreamingResampler):
+    """Appends every chunk still waiting in frame_queue to buffer."""
+    while True:
+        try:
+            buffer.append(resampler.process(frame_queue.get_nowait()))
+        except queue.Empty:
+            return
+
+def _record_audio_task(params: dict, buffer: PcmBuffer):
     """The actual recording task, run in a separate thread."""
-    params = _get_audio_parameters()
     audio = pyaudio.PyAudio()
     stream = None
-    wave_file = None
+    frame_queue = queue.SimpleQueue()
+    resampler = _make_resampler(params)
 
     try:
         print(f"Starting recording on device index: {params['device_index']}")
-        stream = audio.open(
-            format=params["format"],
-            channels=params["channels"],
-            rate=params["rate"],
-            input=True,
-            frames_per_buffer=params["chunk_size"],
-            input_device_index=params["device_index"]
-        )
-        
-        wave_file = wave.open(output_filename, 'wb')
-        wave_file.setnchannels(params["channels"])
-        wave_file.setsampwidth(audio.get_sample_size(params["format"]))
-        wave_file.setframerate(params["rate"])
+        stream = _open_input_stream(audio, params, frame_queue)
 
         print("Recording started.")
         while not stop_recording_event.is_set():
-            data = stream.read(params["chunk_size"])
-            wave_file.writeframes(data)
+            try:
+                data = resampler.process(frame_queue.get(timeout=QUEUE_POLL_SECONDS))
+                buffer.append(data)
+                _feed_endpointer(data)
+            except queue.Empty:
+                if not stream.is_active():
+                    raise IOError("Input stream stopped unexpectedly.")
 
         print("Recording stopped.")
 
     except Exception as e:
         print(f"An error occurred during recording: {e}")
+        audio_devices.report_device_error(params["device_index"], e)
     finally:
         if stream:
             stream.stop_stream()
             stream.close()
         if audio:
             audio.terminate()
-        if wave_file:
-            wave_file.close()
-        print(f"Recording saved to {output_filename}")
+        # Chunks delivered before the stream stopped still belong to the recording,
+        # and so does the output the resampler's filter still holds back.
+        _drain(frame_queue, buffer, resampler)
+        buffer.append(resampler.flush())
+        print(f"Recorded {buffer.duration_seconds:.1f}s of audio.")
+
+def _warm_stream_task():
+    """Keeps an input stream open, reopening it if the device errors or disappears."""
+    global _pre_roll
+    backoff = 0.5
+    while not _warm_stop_event.is_set():
+        params = _get_audio_parameters()
+        with _buffer_lock:
+            _pre_roll = RingBuffer(params["pre_roll_samples"]) if params["pre_roll_samples"] else None
+        audio = pyaudio.PyAudio()
+        stream = None
+        frame_queue = queue.SimpleQueue()
+        resampler = _make_resampler(params)
+        try:
+            stream = _open_input_stream(audio, params, frame_queue)
+            print(f"Warm input stream open on device index: {params['device_index']}")
+            backoff = 0.5
+            _set_warm_queue(frame_queue)
+            while not _warm_stop_event.is_set():
+                try:
+                    item = frame_queue.get(timeout=QUEUE_POLL_SECONDS)
+                except queue.Empty:
+                    if not stream.is_active():
+                        raise IOError("Input stream stopped unexpectedly.")
+                    continue
+                if not isinstance(item, threading.Event):
+                    item = resampler.process(item)
+                with _buffer_lock:
+                    if isinstance(item, threading.Event):
+                        # Stop marker from stop_capture(): every chunk recorded
+                        # before it has been appended, so once the resampler's
+                        # held-back output is added the recording is complete.
+                        if _capture_gate.is_set() and recording_buffer is not None:
+                            recording_buffer.append(resampler.flush())
+                        _capture_gate.clear()
+                        item.set()
+                    elif _capture_gate.is_set() and recording_buffer is not None:
+                        recording_buffer.append(item)
+                        _feed_endpointer(item)
+                    elif _pre_roll is not None:
+                        _pre_roll.append(item)
+        except Exception as e:
+            print(f"Warm input stream error: {e}. Reopening in {backoff:.1f}s...")
+            audio_devices.report_device_error(params["device_index"], e)
+        finally:
+            _set_warm_queue(None)
+            if stream:
+                try:
+                    stream.stop_stream()
+                    stream.close()
+                except Exception:
+                    pass
+            audio.terminate()
+        # PortAudio has been released above, so the registry can see newly attached devices.
+        if _warm_stop_event.wait(backoff):
+            break
+        backoff = min(backoff * 2, WARM_STREAM_MAX_BACKOFF_SECONDS)
+    print("Warm input stream closed.")
+
+def _set_warm_queue(frame_queue):
+    global _warm_queue
+    with _buffer_lock:
+        _warm_queue = frame_queue
+
+def _start_warm_stream():
+    global _warm_thread
+    if _warm_thread and _warm_thread.is_alive():
+        return
+    _warm_stop_event.clear()
+    _warm_thread = threading.Thread(target=_warm_stream_task, daemon=True)
+    _warm_thread.start()
+
+def _stop_warm_stream():
+    global _warm_thread
+    if not (_warm_thread and _warm_thread.is_alive()):
+        return
+    _warm_stop_event.set()
+    _warm_thread.join(timeout=2.0)
+    if _warm_thread.is_alive():
+        print("Warning: Warm input stream thread did not terminate cleanly.")
+    _warm_thread = None
+
+def _on_input_config_changed(diff: dict):
+    """Reopens (or closes) the warm stream when the input device or the mode changes."""
+    if not any(key in diff for key in ('', 'keep_input_stream_open', 'pre_roll_ms')):
+        return
+    def restart():
+        _stop_warm_stream()
+        if _is_warm_stream_enabled():
+            _start_warm_stream()
+    threading.Thread(target=restart, daemon=True).start()
+
+subscribe('input_device_index', _on_input_config_changed)
+subscribe('audio', _on_input_config_changed)
 
 # --- Public Functions ---
-def start_capture(output_filename: str = "temp_recording.wav"):
-    """Starts the audio recording in a separate thread."""
-    global recording_thread
-    if recording_thread and recording_thread.is_alive():
+def warm_up():
+    """Opens the persistent input stream at startup if audio.keep_input_stream_open is enabled."""
+    if _is_warm_stream_enabled():
+        _start_warm_stream()
+
+def shutdown():
+    """Closes the persistent input stream, if any."""
+    _stop_warm_stream()
+
+def register_endpoint_callback(callback):
+    """Registers the function to call when endpointing decides the user has stopped talking."""
+    global _endpoint_callback
+    _endpoint_callback = callback
+
+def get_recording_buffer() -> PcmBuffer | None:
+    """Returns the PcmBuffer of the current (or last) recording, for readers that follow it live."""
+    return recording_buffer
+
+def get_capture_stats() -> dict:
+    """
+    Returns capture health counters since startup (or the last reset_capture_stats()):
+    callbacks, frames, overflows, dropped_frames, max_queue_depth, mean_jitter_ms
+    and max_jitter_ms.
+    """
+    stats = dict(_capture_stats)
+    jitter_total_ms = stats.pop("jitter_total_ms")
+    intervals = max(1, stats["callbacks"] - 1)
+    stats["mean_jitter_ms"] = jitter_total_ms / intervals
+    return stats
+
+def reset_capture_stats():
+    """Zeroes the capture counters."""
+    for key in _capture_stats:
+        _capture_stats[key] = 0.0 if isinstance(_capture_stats[key], float) else 0
+
+def _print_capture_stats():
+    stats = get_capture_stats()
+    print(f"Capture stats: {stats['overflows']} overflows, {stats['dropped_frames']} dropped frames, "
+          f"jitter mean {stats['mean_jitter_ms']:.1f} ms / max {stats['max_jitter_ms']:.1f} ms, "
+          f"max queue depth {stats['max_queue_depth']}.")
+
+def start_capture():
+    """Starts recording into a fresh in-memory buffer."""
+    global recording_thread, recording_buffer, _endpointer
+    if _capture_gate.is_set() or (recording_thread and recording_thread.is_alive()):
         print("Recording is already in progress.")
         return
 
+    params = _get_audio_parameters()
+    buffer = PcmBuffer(sample_rate=TARGET_RATE, max_in_memory_bytes=params["max_in_memory_bytes"])
+    if params["auto_stop_silence_ms"] > 0:
+        _endpointer = SilenceEndpointer(TARGET_RATE, params["auto_stop_silence_ms"], params["silence_threshold_db"])
+    else:
+        _endpointer = None
+
+    if _is_warm_stream_enabled():
+        _start_warm_stream()
+        with _buffer_lock:
+            if _pre_roll is not None:
+                buffer.append(_pre_roll.get())
+                _pre_roll.clear()
+            recording_buffer = buffer
+            _capture_gate.set()
+        print(f"Recording started on warm input stream with {buffer.duration_seconds * 1000:.0f} ms of pre-roll.")
+        return
+
+    recording_buffer = buffer
     stop_recording_event.clear()
-    recording_thread = threading.Thread(target=_record_audio_task, args=(output_filename,), daemon=True)
+    recording_thread = threading.Thread(target=_record_audio_task, args=(params, buffer), daemon=True)
     recording_thread.start()
 
 def stop_capture():
-    """Stops the audio recording."""
+    """
+    Stops the audio recording and returns it: a 16 kHz mono int16 NumPy array, or the
+    path of a temporary WAV file for recordings too long to keep in memory (see
+    core.audio_buffer.release_recording). Returns None if nothing was recording.
+    """
+    global _endpointer
+    _endpointer = None
+    if _capture_gate.is_set():
+        # Queue a marker behind the chunks already captured and let the warm stream
+        # thread close the gate when it reaches it, so the tail isn't cut off.
+        done = threading.Event()
+        with _buffer_lock:
+            frame_queue = _warm_queue
+        if frame_queue is not None:
+            frame_queue.put(done)
+        if not done.wait(timeout=1.0):
+            with _buffer_lock:
+                _capture_gate.clear()
+        with _buffer_lock:
+            buffer = recording_buffer
+        print(f"Recorded {buffer.duration_seconds:.1f}s of audio.")
+        _print_capture_stats()
+        return buffer.finalize()
+
     if not (recording_thread and recording_thread.is_alive()):
         print("No recording is currently in progress.")
-        return
+        return None
 
     stop_recording_event.set()
     recording_thread.join(timeout=2.0) # Wait for the thread to finish
     if recording_thread.is_alive():
         print("Warning: Recording thread did not terminate cleanly.")
+    _print_capture_stats()
+    return recording_buffer.finalize()
@@ -0,0 +1,104 @@
+# core/audio_devices.py
+
+import threading
+import pyaudio
+
+# --- Globals ---
+# Device enumeration is slow on machines with many endpoints (every PyAudio()
+# instance re-initializes PortAudio), so the device list is built once and shared
+# by capture, playback and the settings UI. It is only rebuilt on an explicit
+# rescan() or after a device error has been reported.
+_registry_lock = threading.Lock()
+_devices = None              # {index: device info dict}
+_default_input_index = None
+_default_output_index = None
+
+def _enumerate_devices():
+    """Queries PortAudio for all devices. Returns (devices, default_input, default_output)."""
+    devices = {}
+    default_input = None
+    default_output = None
+    pa = pyaudio.PyAudio()
+    try:
+        for i in range(pa.get_device_count()):
+            dev_info = pa.get_device_info_by_index(i)
+            devices[i] = {
+                "index": i,
+                "name": dev_info['name'],
+                "host_api": dev_info.get('hostApi'),
+                "max_input_channels": int(dev_info['maxInputChannels']),
+                "max_output_channels": int(dev_info['maxOutputChannels']),
+                "default_sample_rate": int(dev_info['defaultSampleRate']),
+            }
+        try:
+            default_input = pa.get_default_input_device_info()['index']
+        except (IOError, KeyError):
+            print("Could not determine default input device.")
+        try:
+            default_output = pa.get_default_output_device_info()['index']
+        except (IOError, KeyError):
+            print("Could not determine default output device.")
+    except Exception as e:
+        print(f"Could not query audio devices: {e}")
+    finally:
+        pa.terminate()
+    return devices, default_input, default_output
+
+def _ensure_devices():
+    """Returns the cached device table, enumerating devices on first use."""
+    global _devices, _default_input_index, _default_output_index
+    with _registry_lock:
+        if _devices is None:
+            _devices, _default_input_index, _default_output_index = _enumerate_devices()
+            print(f"Audio device registry loaded {len(_devices)} devices.")
+        return _devices
+
+# --- Public Functions ---
+def rescan():
+    """Discards the cached device list and enumerates devices again (e.g., after a hot-plug)."""
+    global _devices
+    with _registry_lock:
+        _devices = None
+    return _ensure_devices()
+
+def report_device_error(device_index=None, error=None):
+    """
+    Called when opening or using a device fails. The device list is marked stale so
+    the next lookup re-enumerates, picking up unplugged or newly attached devices.
+    """
+    global _devices
+    print(f"Audio device error on device {device_index}: {error}. Device list will be refreshed.")
+    with _registry_lock:
+        _devices = None
+
+def get_device_info(device_index):
+    """Returns the cached info dict for a device, or None if the index is unknown."""
+    if device_index is None:
+        return None
+    return _ensure_devices().get(device_index)
+
+def get_input_devices() -> dict:
+    """Returns a {"<index>: <name>": index} map of devices that can record."""
+    return {f"{i}: {d['name']}": i for i, d in _ensure_devices().items() if d['max_input_channels'] > 0}
+
+def get_output_devices() -> dict:
+    """Returns a {"<index>: <name>": index} map of devices that can play audio."""
+    return {f"{i}: {d['name']}": i for i, d in _ensure_devices().items() if d['max_output_channels'] > 0}
+
+def is_input_device(device_index) -> bool:
+    info = get_device_info(device_index)
+    return bool(info and info['max_input_channels'] > 0)
+
+def is_output_device(device_index) -> bool:
+    info = get_device_info(device_index)
+    return bool(info and info['max_output_channels'] > 0)
+
+def get_default_input_device_index():
+    """Returns the index of the system default input device, or None if there is none."""
+    _ensure_devices()
+    return _default_input_index
+
+def get_default_output_device_index():
+    """Returns the index of the system default output device, or None if there is none."""
+    _ensure_devices()
+    return _default_output_index
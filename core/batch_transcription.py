@@ -0,0 +1,226 @@
+# core/batch_transcription.py
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import util
+import core.transcription
+from core import vad
+from core.audio_buffer import read_wav_file
+from core.config_manager import get_config
+from core.resample import resample
+
+# Headless transcription of folders of WAV files with the app's models and
+# settings: python -m core.batch_transcription <directory or glob> -o out.jsonl
+#
+# Files are spread over a pool of worker processes. Each worker keeps its own
+# copy of the model resident with the first backend in transcription.backend
+# order that can (in-process when pywhispercpp is installed, otherwise its own
+# whisper-server; failing both, every file is a whisper-cli run) and gets its
+# share of the cores. Results are written as they arrive, and a manifest of
+# content hashes lets a re-run skip files that were already transcribed with
+# the same model.
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_SAVE_SECONDS = 10.0 # the manifest is rewritten at most this often, and at the end
+HASH_CHUNK_BYTES = 1024 * 1024
+
+# --- Worker process state ---
+_worker_backend = None
+_worker_config = None  # (model_name, execution_provider, threads)
+
+def _init_worker(model_name: str, execution_provider: str, threads: int):
+    """Picks this worker's backend and loads the model once, before the first file."""
+    global _worker_backend, _worker_config
+    preferred = get_config().get('transcription', {}).get('backend', 'auto')
+    _worker_backend = core.transcription.SubprocessBackend()
+    for backend in core.transcription.get_backends(preferred):
+        if backend.load(model_name, execution_provider, threads):
+            _worker_backend = backend
+            break
+    if _worker_backend.name == core.transcription.ServerBackend.name:
+        # Pool workers exit without running atexit handlers; stop this worker's server with it.
+        util.Finalize(None, _worker_backend.shutdown, exitpriority=10)
+    _worker_config = (model_name, execution_provider, threads)
+
+def _transcribe_file(path: str) -> dict:
+    """Worker entry point: transcribes one WAV file. Returns a result record."""
+    model_name, execution_provider, threads = _worker_config
+    started = time.perf_counter()
+    result = {"file": path, "text": None, "error": None, "duration_seconds": 0.0}
+    try:
+        samples, sample_rate = read_wav_file(path)
+        if sample_rate != core.transcription.WHISPER_SAMPLE_RATE:
+            samples = resample(samples, sample_rate, core.transcription.WHISPER_SAMPLE_RATE)
+        result["duration_seconds"] = len(samples) / core.transcription.WHISPER_SAMPLE_RATE
+        speech, _ = vad.trim_with_config(samples, core.transcription.WHISPER_SAMPLE_RATE, get_config().get('vad', {}))
+        if not len(speech):
+            result["text"] = ""
+        else:
+            decoding = core.transcription.get_decoding_params(model_name, result["duration_seconds"])
+            decoding["threads"] = threads
+            text = _worker_backend.transcribe(speech, model_name, execution_provider, decoding)
+            if text is None: # e.g. the worker's server died
+                text = core.transcription.SubprocessBackend().transcribe(speech, model_name, execution_provider, decoding)
+            if text is None or text.startswith("Error") or text.startswith("An unexpected error"):
+                result["error"] = text or "Transcription failed."
+            else:
+                result["text"] = text
+    except Exception as e:
+        result["error"] = str(e)
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+# --- Input, manifest and output ---
+def find_audio_files(pattern: str) -> list[str]:
+    """Expands a directory (its .wav files, recursively) or a glob pattern into a sorted list of files."""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "**", "*.wav")
+    return sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(path: str) -> dict:
+    """Returns {content hash: {"file", "model", "text"}} from a previous run, or an empty manifest."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Could not read manifest {path}, starting a new one: {e}")
+        return {}
+
+def save_manifest(path: str, manifest: dict):
+    """Writes the manifest atomically, so an interrupted run never leaves it half written."""
+    fd, temp_path = tempfile.mkstemp(prefix=".manifest-", suffix=".tmp", dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=4)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def _write_result(result: dict, output: str, output_format: str, jsonl_file=None, input_root: str = "."):
+    if output_format == "jsonl":
+        jsonl_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+        jsonl_file.flush()
+    else:
+        # Mirror the input tree, so a/x.wav and b/x.wav don't overwrite each other's transcript.
+        relative_path = os.path.relpath(os.path.abspath(result["file"]), input_root)
+        text_path = os.path.join(output, os.path.splitext(relative_path)[0] + ".txt")
+        os.makedirs(os.path.dirname(text_path), exist_ok=True)
+        with open(text_path, 'w', encoding='utf-8') as f:
+            f.write(result["text"] + "\n")
+
+# --- Public Functions ---
+def transcribe_files(files: list[str], output: str, output_format: str = "jsonl", workers: int | None = None,
+                     manifest_path: str | None = None) -> dict:
+    """
+    Transcribes files with a pool of worker processes and writes the results to
+    output: a JSONL file (one record per file) or, for the "text" format, a
+    directory of .txt files laid out like the input files below their common
+    directory. Files whose content hash is in the manifest for the
+    configured model are skipped. Returns throughput statistics.
+    """
+    config = get_config()
+    transcription_config = config.get('transcription', {})
+    model_name = config.get('whisper_model', 'base')
+    execution_provider = config.get('hardware', {}).get('whisper_execution_provider', 'CPU')
+
+    output_dir = output if output_format == "text" else (os.path.dirname(output) or ".")
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = manifest_path or os.path.join(output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+
+    pending = {}
+    skipped = 0
+    for path in files:
+        content_hash = file_hash(path)
+        if manifest.get(content_hash, {}).get("model") == model_name:
+            skipped += 1
+        else:
+            pending[path] = content_hash
+
+    input_root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in files]) if files else "."
+
+    cpu_count = os.cpu_count() or 4
+    workers = max(1, min(len(pending) or 1, workers or transcription_config.get('parallel_workers') or max(1, cpu_count // 2)))
+    threads = max(1, cpu_count // workers)
+    print(f"Transcribing {len(pending)} files with model '{model_name}' on {workers} workers "
+          f"({threads} threads each); {skipped} already done.")
+
+    stats = {"files": 0, "skipped": skipped, "failed": 0, "audio_seconds": 0.0}
+    started = time.perf_counter()
+    jsonl_file = open(output, 'a', encoding='utf-8') if output_format == "jsonl" else None
+    manifest_changed = False
+    last_manifest_save = time.monotonic()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_name, execution_provider, threads)) as executor:
+            futures = [executor.submit(_transcribe_file, path) for path in pending]
+            for future in as_completed(futures):
+                result = future.result()
+                result["model"] = model_name
+                if result["error"]:
+                    stats["failed"] += 1
+                    print(f"Failed: {result['file']}: {result['error']}")
+                    continue
+                _write_result(result, output, output_format, jsonl_file, input_root)
+                manifest[pending[result["file"]]] = {"file": result["file"], "model": model_name, "text": result["text"]}
+                manifest_changed = True
+                if time.monotonic() - last_manifest_save >= MANIFEST_SAVE_SECONDS:
+                    save_manifest(manifest_path, manifest)
+                    manifest_changed, last_manifest_save = False, time.monotonic()
+                stats["files"] += 1
+                stats["audio_seconds"] += result["duration_seconds"]
+                print(f"[{stats['files'] + stats['failed']}/{len(pending)}] {result['file']} "
+                      f"({result['duration_seconds']:.1f}s audio in {result['seconds']:.1f}s)")
+    finally:
+        if jsonl_file:
+            jsonl_file.close()
+        if manifest_changed:
+            save_manifest(manifest_path, manifest)
+
+    stats["wall_seconds"] = time.perf_counter() - started
+    stats["files_per_minute"] = stats["files"] * 60 / stats["wall_seconds"] if stats["wall_seconds"] else 0.0
+    stats["realtime_factor"] = stats["audio_seconds"] / stats["wall_seconds"] if stats["wall_seconds"] else 0.0
+    return stats
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m core.batch_transcription",
+                                     description="Transcribe a directory or glob of WAV files with the configured Whisper model.")
+    parser.add_argument("input", help="directory (searched recursively for .wav files) or glob pattern")
+    parser.add_argument("-o", "--output", default=None,
+                        help="JSONL file to append to, or a directory for --format text (default: transcripts.jsonl / transcripts)")
+    parser.add_argument("-f", "--format", choices=("jsonl", "text"), default="jsonl", dest="output_format")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="worker processes (default: transcription.parallel_workers or half the cores)")
+    parser.add_argument("--manifest", default=None, help=f"manifest path (default: {MANIFEST_NAME} next to the output)")
+    args = parser.parse_args(argv)
+
+    files = find_audio_files(args.input)
+    if not files:
+        print(f"No WAV files found for '{args.input}'.")
+        return 1
+    output = args.output or ("transcripts.jsonl" if args.output_format == "jsonl" else "transcripts")
+    stats = transcribe_files(files, output, args.output_format, args.workers, args.manifest)
+    print(f"Done: {stats['files']} transcribed, {stats['skipped']} skipped, {stats['failed']} failed in "
+          f"{stats['wall_seconds']:.1f}s ({stats['files_per_minute']:.1f} files/min, "
+          f"{stats['audio_seconds']:.0f}s audio, {stats['realtime_factor']:.1f}x realtime).")
+    return 1 if stats["failed"] else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,13 +1,13 @@
 # core/clipboard_manager.py
 
 import pyperclip
-from .config_manager import load_config
+from .config_manager import get_config
 
 def copy_to_clipboard(text: str):
     """
     Copies the given text to the system clipboard, if not disabled by privacy settings.
     """
-    config = load_config()
+    config = get_config()
     if config.get('privacy', {}).get('clipboard_privacy', False):
         print("Clipboard access is disabled in settings.")
         return
@@ -23,7 +23,7 @@ def get_clipboard_content() -> str | None:
     Reads text from the system clipboard, if not disabled by privacy settings.
     Returns the clipboard text or None if access is disabled or clipboard is empty.
     """
-    config = load_config()
+    config = get_config()
     if config.get('privacy', {}).get('clipboard_privacy', False):
         print("Clipboard access is disabled in settings.")
         return None
@@ -1,8 +1,13 @@
 import json
-import pyaudio
+import os
+import atexit
+import tempfile
+import threading
+from types import MappingProxyType
 from core.utils import get_config_path
 import collections.abc
 from core.encryption import encrypt, decrypt
+from core import audio_devices
 import copy
 
 # Define which fields in the config should be encrypted.
@@ -13,6 +18,26 @@ SENSITIVE_FIELDS = {
     ('ai_providers', 'Cohere', 'api_key'),
 }
 
+# --- Config Snapshot Cache ---
+# The merged, decrypted config is kept in memory and only rebuilt when config.json
+# changes on disk (detected via mtime/size) or when save_config() is called.
+_config_lock = threading.RLock()
+_config_snapshot = None   # Private merged config; never handed out directly.
+_config_view = None       # Read-only view of _config_snapshot.
+_config_signature = None  # (mtime_ns, size) of config.json when the snapshot was built.
+_published_config = None  # Last snapshot subscribers were notified about.
+_subscribers = []         # [(path_keys, callback)]
+
+# --- Persistence ---
+# save_config() updates the snapshot immediately and writes config.json shortly
+# afterwards, so a burst of saves (e.g. from the settings window) becomes one write.
+# A failed write is retried with exponential backoff, up to SAVE_RETRY_MAX_SECONDS apart.
+SAVE_DEBOUNCE_SECONDS = 0.3
+SAVE_RETRY_MAX_SECONDS = 30
+_write_timer = None
+_write_pending = False
+_write_failures = 0
+
 def _traverse_and_apply(config, func):
     """Traverses the config and applies the function to sensitive fields."""
     for path in SENSITIVE_FIELDS:
@@ -28,16 +53,47 @@ def _traverse_and_apply(config, func):
             # Path doesn't exist in this config, skip.
             continue
 
-def get_default_input_device_index():
-    """Gets the index of the default input device using PyAudio."""
-    pa = pyaudio.PyAudio()
+def _with_encrypted_secrets(config: dict) -> dict:
+    """
+    Returns a copy of the config with sensitive fields encrypted. Only the dicts on
+    the path to a secret are copied. encrypt() is memoized, so a secret whose
+    plaintext hasn't changed reuses the ciphertext it was read or written with.
+    """
+    config_to_save = dict(config)
+    for path in SENSITIVE_FIELDS:
+        parent = config_to_save
+        try:
+            for key in path[:-1]:
+                parent[key] = dict(parent[key])
+                parent = parent[key]
+        except (KeyError, TypeError):
+            continue # Path doesn't exist in this config, skip.
+
+        if parent.get(path[-1]):
+            parent[path[-1]] = encrypt(parent[path[-1]])
+    return config_to_save
+
+def _write_config_atomically(config_path: str, config_to_save: dict):
+    """Writes to a temp file in the same directory, then renames it over config.json."""
+    config_dir = os.path.dirname(config_path)
+    fd, temp_path = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=config_dir)
     try:
-        return pa.get_default_input_device_info()['index']
-    except (IOError, KeyError):
-        print("Could not determine default input device.")
+        with os.fdopen(fd, 'w') as f:
+            json.dump(config_to_save, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, config_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def get_default_input_device_index():
+    """Gets the index of the default input device from the shared device registry."""
+    index = audio_devices.get_default_input_device_index()
+    if index is None:
         return 0 # Fallback if no default device is found
-    finally:
-        pa.terminate()
+    return index
 
 def deep_update(d, u):
     """Recursively update a dictionary with values from another, creating keys if they don't exist."""
@@ -48,9 +104,8 @@ def deep_update(d, u):
             d[k] = v
     return d
 
-def load_config():
-    """Loads configuration, applying defaults and decrypting sensitive fields."""
-    config_path = get_config_path()
+def _read_config_from_disk(config_path: str) -> dict:
+    """Reads config.json, applying defaults and decrypting sensitive fields."""
     defaults = {
         "hotkeys": {
             "toggle_dictation": ["<alt>+<caps_lock>"],
@@ -67,7 +122,8 @@ def load_config():
         
         "active_ai_provider": "Ollama",
         "ai_providers": {
-            "Ollama": {"enabled": True, "api_url": "http://localhost:11434", "model": "llama2", "webhook_url": ""},
+            "Ollama": {"enabled": True, "api_url": "http://localhost:11434", "model": "llama2", "webhook_url": "", "stream_response": True,
+                       "keep_alive": "30m", "warm_up": True, "rewarm_when_active": False},
             "Cohere": {"enabled": False, "api_key": "", "model": "command-r"}
         },
         
@@ -95,6 +151,37 @@ def load_config():
         "history": {
             "transcript_limit": 100
         },
+        "audio": {
+            "max_in_memory_recording_mb": 32,
+            "keep_input_stream_open": False,
+            "pre_roll_ms": 0,
+            "auto_stop_silence_ms": 0
+        },
+        "transcription": {
+            "backend": "auto",
+            "max_resident_models": 2,
+            "incremental": False,
+            "incremental_min_window_seconds": 4.0,
+            "incremental_pause_ms": 300,
+            "short_utterance_seconds": 8.0,
+            "tuning": {},
+            "max_wer": 0.15,
+            "parallel_long_audio": True,
+            "long_audio_seconds": 60.0,
+            "long_audio_segment_seconds": 30.0,
+            "parallel_workers": 0,
+            "draft_model": "tiny",
+            "two_pass_min_difference": 0.15,
+            "two_pass_actions": {"toggle_dictation": False, "ai_dictation": False, "voice_conversation": False},
+            "cancel_previous_on_new_dictation": False
+        },
+        "vad": {
+            "enabled": True,
+            "threshold_db": -45.0,
+            "frame_ms": 30,
+            "padding_ms": 200,
+            "max_pause_ms": 600
+        },
         "user_experience": {
             "show_status_overlay": True
         },
@@ -105,7 +192,6 @@ def load_config():
 
         "enable_text_injection": True,
         "language": "en", 
-        "input_device_index": get_default_input_device_index(),
         "theme": "System",
         "whisper_model": "base"
     }
@@ -125,18 +211,176 @@ def load_config():
     for action, hotkey in config.get("hotkeys", {}).items():
         if isinstance(hotkey, str):
             config["hotkeys"][action] = [hotkey]
-            
+
+    # Only probe the audio system when the user hasn't picked a device yet.
+    if config.get("input_device_index") is None:
+        config["input_device_index"] = get_default_input_device_index()
+
     return config
 
-def save_config(config):
-    """Saves the configuration, encrypting sensitive fields before writing."""
+def _file_signature(path: str):
+    """Returns a cheap fingerprint of the file used to detect external edits."""
+    try:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+def _freeze(value):
+    """Recursively wraps dicts and lists so the result cannot be mutated."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def _get_subtree(config, keys):
+    """Walks a tuple of keys into the config. Returns None if the path doesn't exist."""
+    current_level = config
+    for key in keys:
+        if not isinstance(current_level, collections.abc.Mapping) or key not in current_level:
+            return None
+        current_level = current_level[key]
+    return current_level
+
+def diff_config(old, new, prefix: str = "") -> dict:
+    """
+    Returns the changes between two config (sub-)trees as a flat dict of
+    {"dotted.key": (old_value, new_value)}. Keys that were added or removed use None.
+    """
+    if not (isinstance(old, collections.abc.Mapping) and isinstance(new, collections.abc.Mapping)):
+        return {} if old == new else {prefix: (old, new)}
+
+    changes = {}
+    for key in old.keys() | new.keys():
+        key_path = f"{prefix}.{key}" if prefix else str(key)
+        changes.update(diff_config(old.get(key), new.get(key), key_path))
+    return changes
+
+def _set_snapshot(config: dict, signature) -> list:
+    """Replaces the snapshot and returns the (callback, diff) notifications it triggers."""
+    global _config_snapshot, _config_view, _config_signature, _published_config
+    _config_snapshot = config
+    _config_view = _freeze(config)
+    _config_signature = signature
+
+    if config is None:
+        return []
+    previous, _published_config = _published_config, config
+    if previous is None:
+        return [] # First load, nothing has changed yet.
+
+    notifications = []
+    for keys, callback in _subscribers:
+        diff = diff_config(_get_subtree(previous, keys), _get_subtree(config, keys))
+        if diff:
+            notifications.append((callback, diff))
+    return notifications
+
+def _dispatch(notifications: list):
+    """Calls subscriber callbacks. Must be called without holding _config_lock."""
+    for callback, diff in notifications:
+        try:
+            callback(diff)
+        except Exception as e:
+            print(f"Error in config change subscriber {getattr(callback, '__name__', callback)}: {e}")
+
+def _get_snapshot():
+    """Returns the cached (snapshot, view) pair, reloading it if config.json changed."""
     config_path = get_config_path()
-    
-    # Create a deep copy to avoid encrypting the live config object
-    config_to_save = copy.deepcopy(config)
-    
-    # Encrypt sensitive fields before saving
-    _traverse_and_apply(config_to_save, encrypt)
-    
-    with open(config_path, 'w') as f:
-        json.dump(config_to_save, f, indent=4)
+    signature = _file_signature(config_path)
+    notifications = []
+    with _config_lock:
+        # While a save is waiting to be written, the in-memory snapshot is authoritative.
+        stale = _config_snapshot is None or (signature != _config_signature and not _write_pending)
+        if stale:
+            notifications = _set_snapshot(_read_config_from_disk(config_path), signature)
+        snapshot = _config_snapshot, _config_view
+    _dispatch(notifications)
+    return snapshot
+
+def subscribe(path: str, callback):
+    """
+    Registers callback(diff) to be called whenever the config sub-tree at the dotted
+    path (e.g. "tts_providers.Kokoro TTS" or "hardware") changes, either through
+    save_config() or an external edit of config.json. An empty path watches the
+    whole config. The diff is in the format returned by diff_config().
+    """
+    keys = tuple(path.split('.')) if path else ()
+    with _config_lock:
+        _subscribers.append((keys, callback))
+
+def unsubscribe(path: str, callback):
+    """Removes a callback registered with subscribe()."""
+    keys = tuple(path.split('.')) if path else ()
+    with _config_lock:
+        if (keys, callback) in _subscribers:
+            _subscribers.remove((keys, callback))
+
+def get_config():
+    """
+    Returns a read-only view of the current configuration.
+    This is cheap enough to call on every hot path; use load_config() when the
+    result needs to be modified and passed back to save_config().
+    """
+    return _get_snapshot()[1]
+
+def load_config():
+    """Returns a mutable copy of the current configuration."""
+    return copy.deepcopy(_get_snapshot()[0])
+
+def invalidate_config_cache():
+    """Forces the next get_config()/load_config() call to re-read config.json."""
+    flush_config() # Don't lose a save that hasn't been written yet.
+    with _config_lock:
+        _set_snapshot(None, None)
+
+def _schedule_write(delay: float):
+    """Arms the timer that calls flush_config(), unless one is already armed. Call with _config_lock held."""
+    global _write_timer
+    if _write_timer is None:
+        _write_timer = threading.Timer(delay, flush_config)
+        _write_timer.daemon = True
+        _write_timer.start()
+
+def flush_config():
+    """
+    Writes any pending config changes to disk immediately. If the write fails the
+    changes stay pending and another attempt is scheduled, backing off each time.
+    """
+    global _write_timer, _write_pending, _write_failures, _config_signature
+    config_path = get_config_path()
+    with _config_lock:
+        if _write_timer is not None:
+            _write_timer.cancel()
+            _write_timer = None
+        if not _write_pending or _config_snapshot is None:
+            return
+        try:
+            _write_config_atomically(config_path, _with_encrypted_secrets(_config_snapshot))
+            _write_pending = False
+            _write_failures = 0
+            _config_signature = _file_signature(config_path)
+        except Exception as e:
+            _write_failures += 1
+            delay = min(SAVE_DEBOUNCE_SECONDS * 2 ** _write_failures, SAVE_RETRY_MAX_SECONDS)
+            print(f"Error saving config to {config_path}: {e}. Retrying in {delay:g}s.")
+            _schedule_write(delay)
+
+def save_config(config):
+    """
+    Saves the configuration. The in-memory config is updated immediately; the file
+    write (with sensitive fields encrypted) is coalesced with any other saves made
+    within SAVE_DEBOUNCE_SECONDS and done atomically by flush_config().
+    """
+    global _write_pending
+    with _config_lock:
+        # The caller's config is already merged and decrypted, so it becomes the new snapshot.
+        # Copy it so later edits by the caller don't leak into the snapshot.
+        notifications = _set_snapshot(copy.deepcopy(config), _config_signature)
+        _write_pending = True
+        _schedule_write(SAVE_DEBOUNCE_SECONDS)
+    _dispatch(notifications)
+
+# Make sure a save made just before exit still reaches the disk.
+atexit.register(flush_config)
@@ -0,0 +1,141 @@
+# core/dictation_session.py
+
+import itertools
+import threading
+from contextlib import contextmanager
+from core import jobs
+
+# Dictations are pipelined: a new one can be recorded while earlier ones are
+# still being transcribed or processed by the AI. Each dictation is a
+# DictationSession with its own id, recording and job, and results are handed
+# to the user strictly in the order the sessions were started: a session
+# waits for its delivery turn (see delivery_turn()) until every earlier session
+# has delivered its result or finished without one.
+
+class DictationSession:
+    """One dictation, from the hotkey press that starts the recording to the delivery of its result."""
+
+    def __init__(self, is_ai: bool, mode_override: str | None = None, action: str | None = None):
+        with _turns:
+            self.id = next(_session_ids)
+            _pending.add(self.id)
+        self.is_ai = is_ai
+        self.mode_override = mode_override
+        self.action = action or ("ai_dictation" if is_ai else "toggle_dictation")
+        # Not registered until the recording stops, so an interrupt (cancel_all_jobs())
+        # doesn't cancel the dictation the user is still speaking.
+        self.job = jobs.Job(f"dictation {self.id}")
+        self.transcriber = None # IncrementalTranscriber, if enabled
+
+    def stop_recording(self):
+        """Called when the recording stops: from now on cancel_all_jobs() cancels the session."""
+        jobs.register_job(self.job)
+
+    def finish_delivery(self):
+        """
+        Lets later sessions deliver while this one keeps working on what it already
+        delivered (e.g. refining an injected transcript). Safe to call twice.
+        """
+        global _next_delivery_id
+        with _turns:
+            if self.id not in _pending:
+                return
+            _pending.discard(self.id)
+            _completed.add(self.id)
+            while _next_delivery_id in _completed:
+                _completed.discard(_next_delivery_id)
+                _next_delivery_id += 1
+            _turns.notify_all()
+
+    def complete(self):
+        """Marks the session as done, delivered or not, letting later sessions deliver. Safe to call twice."""
+        self.job.finish()
+        self.finish_delivery()
+
+# --- Globals ---
+_turns = threading.Condition()
+_session_ids = itertools.count(1)
+_next_delivery_id = 1  # id of the session whose result is delivered next
+_completed = set()     # ids of sessions that completed out of order
+_pending = set()       # ids of sessions that haven't completed
+
+def _wake_waiters():
+    with _turns:
+        _turns.notify_all()
+
+# --- Public Functions ---
+@contextmanager
+def delivery_turn(session: DictationSession | None):
+    """
+    Waits until every earlier session has completed, so this session's result is
+    delivered in order. Raises JobCancelled if the session is cancelled while
+    waiting. The turn is held until session.complete(). None is allowed (work that
+    isn't a dictation is delivered right away).
+    """
+    if session is not None:
+        unregister = session.job.on_cancel(_wake_waiters)
+        try:
+            with _turns:
+                while _next_delivery_id != session.id:
+                    session.job.check()
+                    _turns.wait()
+            session.job.check()
+        finally:
+            unregister()
+    yield session
+
+class DeliveryQueue:
+    """
+    Passes items (e.g. the sentences of a streamed AI answer) to deliver during a
+    session's delivery turn. Items that arrive before the turn are held back and
+    delivered in order as soon as the turn is reached, so the work producing them
+    doesn't have to wait for earlier sessions. Nothing is delivered if the session
+    is cancelled or completes first.
+    """
+
+    def __init__(self, session: DictationSession | None, deliver):
+        self._session = session
+        self._deliver = deliver
+        self._lock = threading.Lock()
+        self._held = []
+        self._has_turn = session is None
+        self._waiter = None
+        if session is not None:
+            self._waiter = threading.Thread(target=self._wait_for_turn, daemon=True)
+            self._waiter.start()
+
+    def _wait_for_turn(self):
+        unregister = self._session.job.on_cancel(_wake_waiters)
+        try:
+            with _turns:
+                while _next_delivery_id != self._session.id:
+                    if self._session.job.cancelled or self._session.id not in _pending:
+                        return
+                    _turns.wait()
+        finally:
+            unregister()
+        with self._lock:
+            if self._session.job.cancelled:
+                return
+            self._has_turn = True
+            held, self._held = self._held, []
+            for item in held:
+                self._deliver(item)
+
+    def put(self, item):
+        """Delivers item now if the session has its turn, otherwise once it gets it."""
+        with self._lock:
+            if not self._has_turn:
+                self._held.append(item)
+                return
+            self._deliver(item)
+
+    def join(self):
+        """Waits until the held items are delivered. Call it during the session's delivery turn."""
+        if self._waiter is not None:
+            self._waiter.join()
+
+def has_pending() -> bool:
+    """True while any session is still recording, transcribing or delivering."""
+    with _turns:
+        return bool(_pending)
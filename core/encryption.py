@@ -2,11 +2,22 @@
 
 from cryptography.fernet import Fernet
 import os
+import hashlib
+import threading
+from collections import OrderedDict
 from .utils import get_config_path
 
 # Get the path for the encryption key, storing it alongside the config file.
 KEY_PATH = os.path.join(os.path.dirname(get_config_path()), "vibetype.key")
 
+# Fernet does an HMAC check plus AES for every call, but the handful of secrets in
+# the config almost never change. Results are memoized in small LRU caches whose
+# entries include a fingerprint of the key, so a new key never hits old entries.
+CACHE_SIZE = 64
+_cache_lock = threading.Lock()
+_decrypt_cache = OrderedDict()  # (key_id, ciphertext) -> plaintext
+_encrypt_cache = OrderedDict()  # (key_id, plaintext) -> ciphertext
+
 def _generate_key():
     """Generates a new encryption key and saves it to the key path."""
     key = Fernet.generate_key()
@@ -21,31 +32,77 @@ def _load_key():
     with open(KEY_PATH, "rb") as key_file:
         return key_file.read()
 
+def _key_fingerprint(key: bytes) -> str:
+    return hashlib.sha256(key).hexdigest()[:16]
+
 # Load the key on module import
 _key = _load_key()
 _fernet = Fernet(_key)
+_key_id = _key_fingerprint(_key)
+
+def _cache_get(cache: OrderedDict, cache_key):
+    with _cache_lock:
+        value = cache.get(cache_key)
+        if value is not None:
+            cache.move_to_end(cache_key)
+        return value
+
+def _cache_put(cache: OrderedDict, cache_key, value):
+    with _cache_lock:
+        cache[cache_key] = value
+        cache.move_to_end(cache_key)
+        while len(cache) > CACHE_SIZE:
+            cache.popitem(last=False)
+
+def set_key(key: bytes):
+    """Switches to a new encryption key (e.g., after a key rotation). Cached results for the old key are dropped."""
+    global _key, _fernet, _key_id
+    _key = key
+    _fernet = Fernet(key)
+    _key_id = _key_fingerprint(key)
+    clear_cache()
+
+def clear_cache():
+    """Empties the memoized encrypt/decrypt results."""
+    with _cache_lock:
+        _decrypt_cache.clear()
+        _encrypt_cache.clear()
 
 def encrypt(data: str) -> str:
     """Encrypts a string and returns it as a string."""
     if not data:
         return data
+    key_id = _key_id
+    cached = _cache_get(_encrypt_cache, (key_id, data))
+    if cached is not None:
+        return cached
     try:
         # The data needs to be in bytes
-        encrypted_data = _fernet.encrypt(data.encode('utf-8'))
-        return encrypted_data.decode('utf-8')
+        encrypted_data = _fernet.encrypt(data.encode('utf-8')).decode('utf-8')
     except Exception as e:
         print(f"Encryption failed: {e}")
         return data # Return original data if encryption fails
+    _cache_put(_encrypt_cache, (key_id, data), encrypted_data)
+    _cache_put(_decrypt_cache, (key_id, encrypted_data), data)
+    return encrypted_data
 
 def decrypt(encrypted_data: str) -> str:
     """Decrypts a string and returns it."""
     if not encrypted_data:
         return encrypted_data
+    key_id = _key_id
+    cached = _cache_get(_decrypt_cache, (key_id, encrypted_data))
+    if cached is not None:
+        return cached
     try:
         # The data needs to be in bytes
-        decrypted_data = _fernet.decrypt(encrypted_data.encode('utf-8'))
-        return decrypted_data.decode('utf-8')
+        decrypted_data = _fernet.decrypt(encrypted_data.encode('utf-8')).decode('utf-8')
     except Exception as e:
         # This can happen if the data is not valid encrypted data (e.g., old config)
-        # or if the key is wrong. We return the data as is.
+        # or if the key is wrong. We return the data as is, and remember that.
+        _cache_put(_decrypt_cache, (key_id, encrypted_data), encrypted_data)
         return encrypted_data # Return original data if decryption fails
+    _cache_put(_decrypt_cache, (key_id, encrypted_data), decrypted_data)
+    # Re-saving an unchanged secret should reuse the ciphertext already on disk.
+    _cache_put(_encrypt_cache, (key_id, decrypted_data), encrypted_data)
+    return decrypted_data
@@ -5,7 +5,7 @@ import threading
 import traceback
 
 # Import from core
-from core.config_manager import load_config
+from core.config_manager import get_config, subscribe
 from core.app_state import (
     toggle_dictation, 
     speak_from_clipboard, 
@@ -16,6 +16,8 @@ from core.app_state import (
 )
 
 listener_thread = None
+hotkey_listener = None
+_subscribed_to_config = False
 
 def _sanitize_hotkey_string(hotkey_string: str) -> str:
     """
@@ -42,8 +44,9 @@ def _sanitize_hotkey_string(hotkey_string: str) -> str:
 
 def _start_listener():
     """Initializes the pynput listener with all configured hotkeys from the config file."""
+    global hotkey_listener
     try:
-        config = load_config()
+        config = get_config()
         
         action_map = {
             "toggle_dictation": lambda: toggle_dictation(is_ai_dictation=False),
@@ -75,15 +78,39 @@ def _start_listener():
         print(f"Attempting to start GlobalHotKeys listener for: {list(hotkeys_to_listen.keys())}")
         
         with keyboard.GlobalHotKeys(hotkeys_to_listen) as h:
+            hotkey_listener = h
             h.join()
             
     except Exception as e:
         print(f"FATAL ERROR in hotkey listener thread: {e}")
         traceback.print_exc()
 
+def _on_hotkeys_changed(diff: dict):
+    """Rebinds the global hotkeys when the hotkey config changes."""
+    print(f"Hotkey configuration changed ({', '.join(sorted(diff))}). Restarting listener...")
+    # Subscribers run on the thread that saved the config (often the UI thread), so don't block it.
+    threading.Thread(target=restart_hotkey_listener, daemon=True).start()
+
+def stop_hotkey_listener():
+    """Stops the global hotkey listener and waits for its thread to exit."""
+    global hotkey_listener
+    if hotkey_listener is not None:
+        hotkey_listener.stop()
+        hotkey_listener = None
+    if listener_thread is not None and listener_thread.is_alive():
+        listener_thread.join(timeout=2.0)
+
+def restart_hotkey_listener():
+    """Restarts the listener so it picks up the current hotkey configuration."""
+    stop_hotkey_listener()
+    start_hotkey_listener()
+
 def start_hotkey_listener():
     """Starts the global hotkey listener in a separate daemon thread."""
-    global listener_thread
+    global listener_thread, _subscribed_to_config
+    if not _subscribed_to_config:
+        subscribe('hotkeys', _on_hotkeys_changed)
+        _subscribed_to_config = True
     if listener_thread is None or not listener_thread.is_alive():
         print("Starting hotkey listener thread...")
         listener_thread = threading.Thread(target=_start_listener, daemon=True)
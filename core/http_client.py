@@ -0,0 +1,111 @@
+# core/http_client.py
+
+import ipaddress
+import threading
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from core.config_manager import get_config
+
+# All outbound HTTP goes through one requests.Session, so connections are kept
+# alive and reused: repeated calls to a local Ollama or whisper-server skip the
+# TCP setup. Each host gets at most POOL_CONNECTIONS_PER_HOST connections;
+# further concurrent requests wait for one to be free. Every request gets a
+# connect and a read timeout, and Local-Only Mode (privacy.local_only_mode) is
+# enforced here: only loopback hosts and the configured Ollama server (which
+# may run elsewhere on the LAN) can be reached while it is on. OpenAI clients
+# (which pool connections themselves) are cached per API key for the same reason.
+
+CONNECT_TIMEOUT_SECONDS = 5.0
+READ_TIMEOUT_SECONDS = 60.0
+POOL_HOSTS = 10             # hosts whose connection pools are kept
+POOL_CONNECTIONS_PER_HOST = 8  # connections per host, kept alive between requests
+
+class LocalOnlyModeError(requests.exceptions.RequestException):
+    """Raised for a request to a non-local host while Local-Only Mode is enabled."""
+
+# --- Globals ---
+_session = None
+_session_lock = threading.Lock()
+_openai_clients = {}  # api_key -> OpenAI client
+_openai_lock = threading.Lock()
+
+def _is_loopback(host: str | None) -> bool:
+    if not host:
+        return False
+    if host.lower() == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+def _ollama_host(config) -> str | None:
+    api_url = config.get('ai_providers', {}).get('Ollama', {}).get('api_url')
+    return urlparse(api_url).hostname if api_url else None
+
+def _check_local_only(url: str):
+    config = get_config()
+    if not config.get('privacy', {}).get('local_only_mode', False):
+        return
+    host = urlparse(url).hostname
+    if not _is_loopback(host) and (host is None or host != _ollama_host(config)):
+        raise LocalOnlyModeError(f"Local-Only Mode is enabled; not connecting to {host}.")
+
+# --- Public Functions ---
+def get_session() -> requests.Session:
+    """Returns the shared session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_CONNECTIONS_PER_HOST, pool_block=True)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+def request(method: str, url: str, timeout=None, **kwargs) -> requests.Response:
+    """
+    Sends a request with the shared session. timeout is a read timeout in seconds
+    (or a (connect, read) tuple) and defaults to READ_TIMEOUT_SECONDS. Raises
+    LocalOnlyModeError for non-local hosts in Local-Only Mode.
+    """
+    _check_local_only(url)
+    if timeout is None:
+        timeout = READ_TIMEOUT_SECONDS
+    if not isinstance(timeout, tuple):
+        timeout = (CONNECT_TIMEOUT_SECONDS, timeout)
+    return get_session().request(method, url, timeout=timeout, **kwargs)
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+def get_openai_client(api_key: str):
+    """Returns a cached OpenAI client for api_key. Raises LocalOnlyModeError in Local-Only Mode."""
+    _check_local_only("https://api.openai.com")
+    with _openai_lock:
+        client = _openai_clients.get(api_key)
+        if client is None:
+            from openai import OpenAI
+            client = OpenAI(api_key=api_key, timeout=READ_TIMEOUT_SECONDS)
+            _openai_clients[api_key] = client
+        return client
+
+def close():
+    """Closes pooled connections. Called on shutdown."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+    with _openai_lock:
+        for client in _openai_clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        _openai_clients.clear()
@@ -0,0 +1,111 @@
+# core/incremental_transcription.py
+
+import threading
+import numpy as np
+import core.transcription
+from core import jobs
+from core.config_manager import get_config
+from core.transcript_stitching import stitch_all
+from core.vad import frame_energy_db
+
+# With transcription.incremental enabled, dictation is transcribed while it is
+# still being recorded: whenever at least incremental_min_window_seconds of new
+# audio has been captured and the user pauses, the audio up to the middle of the
+# pause is transcribed in the background. At stop time only the remaining tail
+# is left, so the wait after releasing the hotkey no longer grows with the
+# length of the dictation.
+
+POLL_SECONDS = 0.25
+FRAME_MS = 30
+
+def _is_error(text: str) -> bool:
+    return text.startswith("Error") or text.startswith("An unexpected error")
+
+def is_enabled() -> bool:
+    return get_config().get('transcription', {}).get('incremental', False)
+
+class IncrementalTranscriber:
+    """Transcribes a PcmBuffer window by window while it is being recorded."""
+
+    def __init__(self, buffer, sample_rate: int = 16000):
+        config = get_config()
+        transcription_config = config.get('transcription', {})
+        self._buffer = buffer
+        self._sample_rate = sample_rate
+        self._min_window = int(sample_rate * transcription_config.get('incremental_min_window_seconds', 4.0))
+        self._frame_length = int(sample_rate * FRAME_MS / 1000)
+        self._pause_frames = max(1, int(transcription_config.get('incremental_pause_ms', 300) / FRAME_MS))
+        self._threshold_db = config.get('vad', {}).get('threshold_db', -45.0)
+        self._cut = 0       # samples before this index have been transcribed
+        self._parts = []    # transcripts of the finished windows, in order
+        self._failed = False
+        self._stop_event = threading.Event()
+        self._job = jobs.current_job() # the dictation's job, if the transcriber is created inside one
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _find_cut(self) -> int | None:
+        """Returns the sample index of the middle of the first long enough pause past the minimum window, if any."""
+        search_start = self._cut + self._min_window
+        if len(self._buffer) - search_start < self._pause_frames * self._frame_length:
+            return None
+        energy = frame_energy_db(self._buffer.get_samples(search_start), self._frame_length)
+        silent = (energy <= self._threshold_db).astype(np.int32)
+        # Number of silent frames in each run of _pause_frames consecutive frames
+        silent_run = np.convolve(silent, np.ones(self._pause_frames, dtype=np.int32), mode='valid')
+        pauses = np.flatnonzero(silent_run == self._pause_frames)
+        if pauses.size == 0:
+            return None
+        return search_start + (int(pauses[0]) + self._pause_frames // 2) * self._frame_length
+
+    def _transcribe_next_window(self) -> bool:
+        """Transcribes the next finished window, if there is one. Returns False once incremental transcription has given up."""
+        try:
+            cut = self._find_cut()
+            if cut is None:
+                return True
+            text = core.transcription.transcribe_audio(self._buffer.get_samples(self._cut, cut))
+        except RuntimeError as e:
+            # The recording was spilled to disk; finish() transcribes it in one go.
+            print(f"Incremental transcription stopped: {e}")
+            self._failed = True
+            return False
+        except jobs.JobCancelled:
+            return False
+        if _is_error(text):
+            print(f"Incremental transcription failed: {text}")
+            self._failed = True
+            return False
+        print(f"Transcribed {(cut - self._cut) / self._sample_rate:.1f}s window while recording.")
+        self._parts.append(text)
+        self._cut = cut
+        return True
+
+    def _run(self):
+        with jobs.activate(self._job):
+            while not self._stop_event.wait(POLL_SECONDS):
+                if not self._transcribe_next_window():
+                    return
+
+    def cancel(self):
+        """Stops the background work without producing a transcript."""
+        self._stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def finish(self, recording) -> str:
+        """
+        Stops the background work and returns the transcript of the whole recording
+        (the value returned by stop_capture()), transcribing only what is left.
+        """
+        self.cancel()
+        if self._failed or not isinstance(recording, np.ndarray):
+            return core.transcription.transcribe_audio(recording)
+        tail = recording[self._cut:]
+        print(f"Transcribing the last {len(tail) / self._sample_rate:.1f}s ({len(self._parts)} windows already done).")
+        tail_text = core.transcription.transcribe_audio(tail) if len(tail) else ""
+        if _is_error(tail_text):
+            return tail_text
+        return stitch_all(self._parts + [tail_text])
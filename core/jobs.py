@@ -0,0 +1,124 @@
+# core/jobs.py
+
+import subprocess
+import threading
+from contextlib import contextmanager
+
+# A dictation's transcription (and AI processing) runs as a cancellable job.
+# The job is made current on every thread that works for it (see activate()),
+# so code deep in the transcription stack can register a whisper process to be
+# killed or check whether it should stop, without threading the job through
+# every call. Cancelling kills the registered processes at once, so the CPU is
+# free for the next request, and makes check() raise JobCancelled on the
+# job's threads so nothing it was going to deliver ends up on screen.
+
+class JobCancelled(Exception):
+    """Raised on a job's threads once the job has been cancelled."""
+
+class Job:
+    """A cancellable unit of work and the child processes working for it."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._cancel_callbacks = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check(self):
+        """Raises JobCancelled if the job has been cancelled."""
+        if self.cancelled:
+            raise JobCancelled(self.name)
+
+    def on_cancel(self, callback):
+        """Calls callback when the job is cancelled (immediately if it already is). Returns a function that unregisters it."""
+        with self._lock:
+            if not self.cancelled:
+                self._cancel_callbacks.append(callback)
+                return lambda: self._remove_callback(callback)
+        callback()
+        return lambda: None
+
+    def _remove_callback(self, callback):
+        with self._lock:
+            if callback in self._cancel_callbacks:
+                self._cancel_callbacks.remove(callback)
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self._cancelled.set()
+            callbacks, self._cancel_callbacks = self._cancel_callbacks, []
+        print(f"Cancelling job '{self.name}'.")
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error while cancelling job '{self.name}': {e}")
+
+    def finish(self):
+        """Marks the job as done; it is no longer affected by cancel_all_jobs()."""
+        with _jobs_lock:
+            _active_jobs.discard(self)
+
+# --- Globals ---
+_jobs_lock = threading.Lock()
+_active_jobs = set()
+_local = threading.local()
+
+# --- Public Functions ---
+def register_job(job: Job):
+    """Puts job under cancel_all_jobs() until it finishes."""
+    with _jobs_lock:
+        _active_jobs.add(job)
+
+def start_job(name: str) -> Job:
+    job = Job(name)
+    register_job(job)
+    return job
+
+def current_job() -> Job | None:
+    """The job the calling thread is working for, if any."""
+    return getattr(_local, 'job', None)
+
+@contextmanager
+def activate(job: Job | None):
+    """Makes job the current job of the calling thread for the duration of the block. None is allowed."""
+    previous = current_job()
+    _local.job = job
+    try:
+        yield job
+    finally:
+        _local.job = previous
+
+def check_cancelled():
+    """Raises JobCancelled if the current job has been cancelled."""
+    job = current_job()
+    if job:
+        job.check()
+
+@contextmanager
+def track_process(process: subprocess.Popen):
+    """Kills process if the current job is cancelled while the block runs, then raises JobCancelled."""
+    job = current_job()
+    if job is None:
+        yield process
+        return
+    unregister = job.on_cancel(process.kill)
+    try:
+        yield process
+    finally:
+        unregister()
+    job.check()
+
+def cancel_all_jobs():
+    """Cancels every job that hasn't finished. Called when a new dictation starts, on interrupt and on shutdown."""
+    with _jobs_lock:
+        jobs = list(_active_jobs)
+        _active_jobs.clear()
+    for job in jobs:
+        job.cancel()
@@ -0,0 +1,130 @@
+# core/long_audio.py
+
+import os
+import sys
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+import numpy as np
+import core.transcription
+from core import jobs
+from core.audio_buffer import read_wav_file
+from core.config_manager import get_config
+from core.resample import resample
+from core.transcript_stitching import stitch_all
+from core.vad import frame_energy_db
+
+# A single whisper-cli run over a multi-minute recording leaves most cores
+# idle. Long audio is cut into segments of about target_seconds at pauses, the
+# segments are transcribed concurrently by whisper-cli processes (each with its
+# share of the cores, started from a pool of threads working for the current
+# job, so cancelling the job kills them), and the pieces are stitched back
+# together in order. Where no pause can be found, the cut is forced and the
+# next segment starts overlap_seconds earlier; the stitcher removes the words
+# that end up in both.
+
+FRAME_MS = 30
+
+def split_at_silence(samples: np.ndarray, sample_rate: int = 16000, target_seconds: float = 30.0,
+                     max_seconds: float = 45.0, pause_ms: int = 300, threshold_db: float = -45.0,
+                     overlap_seconds: float = 1.0) -> list[tuple[int, int]]:
+    """
+    Returns (start, end) sample ranges covering the audio. Each cut is made in the
+    middle of the pause closest to target_seconds into the segment, within
+    [target_seconds / 2, max_seconds]; without such a pause, the segment is cut at
+    max_seconds and the next one overlaps it by overlap_seconds.
+    """
+    frame_length = int(sample_rate * FRAME_MS / 1000)
+    pause_frames = max(1, int(pause_ms / FRAME_MS))
+    silent = (frame_energy_db(samples, frame_length) <= threshold_db).astype(np.int32)
+    if silent.size >= pause_frames:
+        fully_silent = np.convolve(silent, np.ones(pause_frames, dtype=np.int32), mode='valid') == pause_frames
+        candidates = (np.flatnonzero(fully_silent) + pause_frames // 2) * frame_length
+    else:
+        candidates = np.empty(0, dtype=np.int64)
+
+    target = int(target_seconds * sample_rate)
+    longest = int(max_seconds * sample_rate)
+    overlap = int(overlap_seconds * sample_rate)
+    segments = []
+    start = 0
+    while len(samples) - start > longest:
+        in_range = candidates[(candidates >= start + target // 2) & (candidates <= start + longest)]
+        if in_range.size:
+            cut = int(in_range[np.argmin(np.abs(in_range - (start + target)))])
+            segments.append((start, cut))
+            start = cut
+        else:
+            cut = start + longest
+            segments.append((start, cut))
+            start = cut - overlap
+    segments.append((start, len(samples)))
+    return segments
+
+def _transcribe_segment(job, samples, model_name, execution_provider, decoding) -> str:
+    """Transcribes one segment with whisper-cli on a pool thread, working for job."""
+    with jobs.activate(job):
+        jobs.check_cancelled()
+        return core.transcription.SubprocessBackend().transcribe(samples, model_name, execution_provider, decoding)
+
+def _load_audio(audio) -> np.ndarray:
+    if isinstance(audio, str):
+        samples, sample_rate = read_wav_file(audio)
+        if sample_rate != core.transcription.WHISPER_SAMPLE_RATE:
+            samples = resample(samples, sample_rate, core.transcription.WHISPER_SAMPLE_RATE)
+        return samples
+    return np.frombuffer(audio, dtype=np.int16) if isinstance(audio, (bytes, bytearray)) else audio
+
+def is_long(duration_seconds: float) -> bool:
+    """True if parallel long-audio transcription is enabled and applies to audio of this length (with whisper-cli)."""
+    transcription_config = get_config().get('transcription', {})
+    return (transcription_config.get('parallel_long_audio', True)
+            and duration_seconds >= transcription_config.get('long_audio_seconds', 60.0))
+
+def transcribe_long_audio(audio, workers: int | None = None, model_name: str | None = None) -> str:
+    """
+    Transcribes a long recording (a WAV path or 16 kHz mono int16 samples) in
+    parallel segments and returns the stitched transcript. model_name defaults
+    to the configured whisper_model.
+    """
+    config = get_config()
+    transcription_config = config.get('transcription', {})
+    model_name = model_name or config.get('whisper_model', 'base')
+    execution_provider = config.get('hardware', {}).get('whisper_execution_provider', 'CPU')
+    samples = _load_audio(audio)
+    sample_rate = core.transcription.WHISPER_SAMPLE_RATE
+
+    segments = split_at_silence(samples, sample_rate,
+                                target_seconds=transcription_config.get('long_audio_segment_seconds', 30.0),
+                                threshold_db=config.get('vad', {}).get('threshold_db', -45.0))
+    cpu_count = os.cpu_count() or 4
+    workers = max(1, min(len(segments), workers or transcription_config.get('parallel_workers') or max(1, cpu_count // 2)))
+    # Split the cores between the workers instead of letting every whisper-cli use all of them.
+    decoding = core.transcription.get_decoding_params(model_name, transcription_config.get('long_audio_segment_seconds', 30.0))
+    decoding["threads"] = max(1, cpu_count // workers)
+    print(f"Transcribing {len(samples) / sample_rate:.0f}s of audio as {len(segments)} segments with {workers} whisper-cli processes.")
+
+    job = jobs.current_job()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Cancelling the job kills the running whisper-cli processes (see
+        # jobs.track_process) and drops the segments still queued.
+        unregister = job.on_cancel(lambda: executor.shutdown(wait=False, cancel_futures=True)) if job else None
+        try:
+            futures = [executor.submit(_transcribe_segment, job, samples[start:end], model_name, execution_provider, decoding)
+                       for start, end in segments]
+            pieces = [future.result() for future in futures] # in segment order
+        except (CancelledError, RuntimeError):
+            # RuntimeError: the job was cancelled (and the executor shut down) while segments were being submitted.
+            jobs.check_cancelled()
+            raise
+        finally:
+            if unregister:
+                unregister()
+    jobs.check_cancelled()
+    for piece in pieces:
+        if piece.startswith("Error") or piece.startswith("An unexpected error"):
+            return piece
+    return stitch_all(pieces)
+
+if __name__ == "__main__":
+    # Transcribes existing WAV files: python -m core.long_audio recording.wav [...]
+    for wav_path in sys.argv[1:]:
+        print(transcribe_long_audio(wav_path))
@@ -0,0 +1,115 @@
+# core/resample.py
+
+import functools
+import math
+import numpy as np
+
+# Whisper wants 16 kHz mono, but many USB and Bluetooth microphones only run at
+# 44.1/48 kHz stereo, and asking PortAudio for 16 kHz on those either fails or
+# goes through a poor host-API resampler. Capture therefore opens the device at
+# its native format and converts each chunk here as it arrives, so the 16 kHz
+# recording is complete as soon as the stream stops.
+
+# The low-pass filter spans FILTER_ZERO_CROSSINGS zero crossings of its sinc on
+# each side, so it gets longer as the rate ratio grows and keeps the same
+# sharpness: at 48 kHz -> 16 kHz it is flat to 6 kHz, -2 dB at 7 kHz and more
+# than 90 dB down from 8 kHz. Long inputs are filtered OUTPUT_BLOCK outputs at a
+# time to bound the temporary (outputs x taps) matrix.
+FILTER_ZERO_CROSSINGS = 32
+CUTOFF_FRACTION = 0.9 # of the lower Nyquist frequency
+KAISER_BETA = 10.0
+OUTPUT_BLOCK = 8192
+
+@functools.lru_cache(maxsize=8)
+def _polyphase_filter(up: int, down: int) -> np.ndarray:
+    """
+    Designs a Kaiser-windowed sinc low-pass filter for resampling by up/down and
+    returns it split into its polyphase components, shape (up, taps_per_phase).
+    Row p holds the taps applied for output phase p, with tap j multiplying the
+    input sample j steps in the past.
+    """
+    # Cut off below the lower of the two Nyquist frequencies (in cycles per upsampled sample).
+    cutoff = 0.5 / max(up, down) * CUTOFF_FRACTION
+    taps_per_phase = math.ceil(2 * FILTER_ZERO_CROSSINGS * max(up, down) / up)
+    length = up * taps_per_phase
+    m = np.arange(length) - (length - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * m) * np.kaiser(length, KAISER_BETA)
+    taps *= up / taps.sum() # unity DC gain after zero-stuffing by `up`
+    return np.ascontiguousarray(taps.reshape(taps_per_phase, up).T.astype(np.float32))
+
+class StreamingResampler:
+    """
+    Converts interleaved int16 audio at in_rate with `channels` channels to mono
+    int16 at out_rate, one chunk at a time. The filter state carries over between
+    chunks, so the result is the same as resampling the whole recording at once.
+    Output lags input by half the filter length; call flush() at the end of the
+    recording to get the last samples.
+    """
+    def __init__(self, in_rate: int, out_rate: int = 16000, channels: int = 1):
+        divisor = math.gcd(in_rate, out_rate)
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+        self.channels = channels
+        self.passthrough = self.up == self.down
+        self._filters = None if self.passthrough else _polyphase_filter(self.up, self.down)
+        self._taps_per_phase = 1 if self.passthrough else self._filters.shape[1]
+        self._history = np.zeros(self._taps_per_phase - 1, dtype=np.float32)
+        self._inputs_seen = 0  # input samples consumed so far
+        self._outputs_made = 0 # output samples produced so far
+
+    def _downmix(self, pcm) -> np.ndarray:
+        samples = np.frombuffer(pcm, dtype=np.int16) if isinstance(pcm, (bytes, bytearray, memoryview)) else pcm
+        if self.channels > 1:
+            usable = samples.size - samples.size % self.channels
+            samples = samples[:usable].reshape(-1, self.channels).mean(axis=1)
+        return samples
+
+    def process(self, pcm) -> np.ndarray:
+        """Converts one chunk of interleaved int16 audio (bytes or array) and returns the mono int16 output."""
+        mono = self._downmix(pcm)
+        if self.passthrough:
+            return mono.astype(np.int16, copy=False)
+        return self._filter(mono.astype(np.float32, copy=False))
+
+    def flush(self) -> np.ndarray:
+        """
+        Returns the output still held back by the filter delay, as if the input
+        ended with silence. The resampler's state is left unchanged, so a
+        continuous stream can keep being processed afterwards.
+        """
+        if self.passthrough:
+            return np.empty(0, dtype=np.int16)
+        state = self._history, self._inputs_seen, self._outputs_made
+        tail = self._filter(np.zeros(-(-self._history.size // 2), dtype=np.float32))
+        self._history, self._inputs_seen, self._outputs_made = state
+        return tail
+
+    def _filter(self, mono: np.ndarray) -> np.ndarray:
+        history_length = self._history.size
+        window = np.concatenate((self._history, mono))
+        window_start = self._inputs_seen - history_length # input index of window[0]
+        self._inputs_seen += mono.size
+
+        # Output k reads input samples up to index (k * down) // up, so every
+        # output whose newest input has arrived can be computed now.
+        last_output = (self._inputs_seen * self.up - 1) // self.down + 1
+        first_output = self._outputs_made
+        self._outputs_made = last_output
+        self._history = window[-history_length:]
+
+        taps = np.arange(self._taps_per_phase)
+        result = np.empty(max(0, last_output - first_output), dtype=np.float32)
+        for block_start in range(first_output, last_output, OUTPUT_BLOCK):
+            outputs = np.arange(block_start, min(block_start + OUTPUT_BLOCK, last_output), dtype=np.int64)
+            position = outputs * self.down
+            newest = position // self.up - window_start
+            phase = position % self.up
+            indices = newest[:, None] - taps[None, :]
+            result[block_start - first_output:outputs[-1] - first_output + 1] = \
+                np.einsum('ij,ij->i', window[indices], self._filters[phase])
+        return np.clip(np.rint(result), -32768, 32767).astype(np.int16)
+
+def resample(samples, in_rate: int, out_rate: int = 16000, channels: int = 1) -> np.ndarray:
+    """Converts a whole recording of interleaved int16 audio to mono int16 at out_rate."""
+    resampler = StreamingResampler(in_rate, out_rate, channels)
+    return np.concatenate((resampler.process(samples), resampler.flush()))
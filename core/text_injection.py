@@ -1,18 +1,79 @@
 # core/text_injection.py
 
-from pynput.keyboard import Controller, Key
+import threading
+from pynput.keyboard import Controller, Key, Listener as KeyboardListener
+from pynput.mouse import Listener as MouseListener
 import pyperclip
 import time
 
-def inject_text(text: str):
+# replace_injected_text() deletes the last injection with backspaces, which is
+# only safe while the cursor is still right after it. Injections that may be
+# replaced later (the two-pass draft) start counting key presses and mouse
+# clicks, and record the count and the foreground window, so a replacement is
+# refused once the user has typed, clicked or switched windows.
+
+# --- Globals ---
+_input_lock = threading.Lock()
+_input_events = 0
+_input_listeners = None
+_last_injection = None # (text, foreground window, _input_events) after the last inject_text()
+
+def _count_input_event(*args):
+    global _input_events
+    with _input_lock:
+        _input_events += 1
+
+def _start_input_tracking():
+    global _input_listeners
+    with _input_lock:
+        if _input_listeners is not None:
+            return
+        _input_listeners = (KeyboardListener(on_press=_count_input_event), MouseListener(on_click=_count_input_event))
+    for listener in _input_listeners:
+        listener.daemon = True
+        listener.start()
+
+def _foreground_window():
+    """The focused window's handle, or None where it can't be determined."""
+    try:
+        import win32gui
+        return win32gui.GetForegroundWindow()
+    except Exception:
+        return None
+
+def _injection_is_untouched(text: str) -> bool:
+    """True if text was the last injection and there was no input or focus change since."""
+    with _input_lock:
+        injection, input_events = _last_injection, _input_events
+    return injection is not None and injection == (text, _foreground_window(), input_events)
+
+def _backspace_count(text: str):
+    """
+    How many backspaces delete text once it has been pasted, or None if that
+    depends on the target. A line break is one keystroke whether it is \\r\\n or
+    \\n; characters outside the BMP are deleted as one or two UTF-16 units
+    depending on the application.
+    """
+    if any(ord(char) > 0xFFFF for char in text):
+        return None
+    return len(text.replace('\r\n', '\n'))
+
+def inject_text(text: str, replaceable: bool = False):
     """
     Injects text using pynput for keyboard control, which can be more reliable
-    than pyautogui on some systems.
+    than pyautogui on some systems. Pass replaceable=True for text that
+    replace_injected_text() may swap out later.
     """
+    global _last_injection
     if not text:
         print("No text to inject.")
         return
 
+    if replaceable:
+        _start_input_tracking()
+    with _input_lock:
+        _last_injection = None
+
     print(f"Injecting text via pynput and clipboard: '{text}'")
     keyboard = Controller()
 
@@ -38,6 +99,42 @@ def inject_text(text: str):
         pyperclip.copy(original_clipboard)
         print("Original clipboard content restored.")
 
+        # Recorded after the delay, so the paste keystrokes themselves are already counted.
+        if replaceable:
+            window = _foreground_window()
+            with _input_lock:
+                _last_injection = (text, window, _input_events)
+
     except Exception as e:
         print(f"An error occurred during pynput text injection: {e}")
         print("This could be a permissions issue with pynput.")
+
+def replace_injected_text(old_text: str, new_text: str) -> bool:
+    """
+    Replaces text that was just injected by deleting it with backspaces and
+    injecting the new text. Returns False without touching anything if old_text
+    wasn't the last replaceable injection, if a key was pressed, the mouse
+    clicked or the foreground window changed since it was injected, or if the
+    number of backspaces needed can't be known.
+    """
+    if not old_text or old_text == new_text:
+        return True
+    if not _injection_is_untouched(old_text):
+        print("Input or focus changed since the text was injected; not replacing it.")
+        return False
+    backspaces = _backspace_count(old_text)
+    if backspaces is None:
+        print("The injected text can't be reliably deleted with backspaces; not replacing it.")
+        return False
+
+    print(f"Replacing injected text with: '{new_text}'")
+    keyboard = Controller()
+    try:
+        for _ in range(backspaces):
+            keyboard.press(Key.backspace)
+            keyboard.release(Key.backspace)
+        inject_text(new_text)
+        return True
+    except Exception as e:
+        print(f"An error occurred while replacing injected text: {e}")
+        return False
@@ -0,0 +1,96 @@
+# core/text_stream.py
+
+import re
+
+# Helpers for text that arrives a few tokens at a time (e.g. a streamed Ollama
+# response): ThinkFilter drops <think>...</think> blocks, and SentenceSplitter
+# turns the remaining text into complete sentences that can be spoken while
+# the rest of the answer is still being generated. Both hold back only as much
+# text as they need to decide.
+
+THINK_OPEN = "<think"
+THINK_CLOSE = "</think"
+
+# Words ending in a period that don't end a sentence
+ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "approx", "no"}
+
+def _partial_tag_length(text: str, tags: tuple[str, ...]) -> int:
+    """Length of the longest suffix of text that could be the start of one of tags."""
+    lowered = text.lower()
+    for length in range(min(len(lowered), max(len(tag) for tag in tags)), 0, -1):
+        if any(tag.startswith(lowered[-length:]) for tag in tags):
+            return length
+    return 0
+
+class ThinkFilter:
+    """Removes <think>...</think> blocks (and stray closing tags) from a stream of text chunks."""
+
+    def __init__(self):
+        self._pending = ""
+        self._in_think = False
+
+    def feed(self, chunk: str) -> str:
+        """Adds a chunk and returns the text that is now known to be outside think blocks."""
+        self._pending += chunk
+        visible = []
+        while self._pending:
+            lowered = self._pending.lower()
+            tags = (THINK_CLOSE,) if self._in_think else (THINK_OPEN, THINK_CLOSE)
+            found = [(index, tag) for tag in tags if (index := lowered.find(tag)) != -1]
+            if not found:
+                keep = _partial_tag_length(self._pending, tags)
+                if not self._in_think:
+                    visible.append(self._pending[:len(self._pending) - keep])
+                self._pending = self._pending[len(self._pending) - keep:]
+                break
+            index, tag = min(found)
+            if not self._in_think:
+                visible.append(self._pending[:index])
+            tag_end = self._pending.find(">", index)
+            if tag_end == -1:
+                self._pending = self._pending[index:] # wait for the rest of the tag
+                break
+            self._pending = self._pending[tag_end + 1:]
+            self._in_think = tag == THINK_OPEN
+        return "".join(visible)
+
+    def flush(self) -> str:
+        """Returns whatever visible text is still held back at the end of the stream."""
+        text, self._pending = ("" if self._in_think else self._pending), ""
+        return text
+
+class SentenceSplitter:
+    """Collects streamed text and returns it one complete sentence at a time."""
+
+    # Sentence-ending punctuation (plus closing quotes/brackets) followed by whitespace, or a line break
+    _BOUNDARY = re.compile(r'[.!?]+["\')\]]*(?=\s)|\n')
+
+    def __init__(self):
+        self._pending = ""
+
+    def _ends_with_abbreviation(self, text: str) -> bool:
+        words = text.split()
+        return bool(words) and words[-1].rstrip(".").lower() in ABBREVIATIONS
+
+    def feed(self, text: str) -> list[str]:
+        """Adds text and returns the sentences it completed."""
+        self._pending += text
+        sentences = []
+        start = 0
+        for match in self._BOUNDARY.finditer(self._pending):
+            # A boundary needs the whitespace after it to be known; the last character may still grow.
+            if match.end() >= len(self._pending) and match.group() != "\n":
+                break
+            candidate = self._pending[start:match.end()]
+            if match.group() != "\n" and self._ends_with_abbreviation(candidate):
+                continue
+            if candidate.strip():
+                sentences.append(candidate.strip())
+            start = match.end()
+        self._pending = self._pending[start:]
+        return sentences
+
+    def flush(self) -> str:
+        """Returns the unfinished last sentence, if any, at the end of the stream."""
+        text, self._pending = self._pending.strip(), ""
+        return text
@@ -4,7 +4,7 @@ import os
 from datetime import datetime
 from tkinter import messagebox
 from core.utils import get_config_path
-from core.config_manager import load_config
+from core.config_manager import get_config
 
 def _get_log_dir():
     """Returns the directory where transcripts are stored."""
@@ -14,7 +14,7 @@ def _get_log_dir():
 def _enforce_transcript_limit():
     """Deletes the oldest transcripts if the total number exceeds the configured limit."""
     try:
-        config = load_config()
+        config = get_config()
         limit = config.get('history', {}).get('transcript_limit', 100) # Default to 100
         if limit <= 0: # 0 or less means no limit
             return
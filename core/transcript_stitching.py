@@ -0,0 +1,44 @@
+# core/transcript_stitching.py
+
+import re
+
+# Incremental transcription produces one transcript per window of audio. Windows
+# are cut at pauses, but whisper still sometimes repeats the last words of one
+# window at the start of the next (or hallucinates them from the trailing
+# silence), so consecutive pieces are joined with any word overlap removed.
+
+MAX_OVERLAP_WORDS = 8
+
+def _normalize(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+def stitch(previous: str, addition: str, max_overlap_words: int = MAX_OVERLAP_WORDS) -> str:
+    """
+    Appends `addition` to `previous`, dropping the longest run of leading words of
+    `addition` that repeats the trailing words of `previous` (ignoring case and
+    punctuation).
+    """
+    previous = previous.strip()
+    addition = addition.strip()
+    if not previous:
+        return addition
+    if not addition:
+        return previous
+
+    previous_words = [_normalize(w) for w in previous.split()[-max_overlap_words:]]
+    addition_words = addition.split()
+    normalized_addition = [_normalize(w) for w in addition_words[:max_overlap_words]]
+    for overlap in range(min(len(previous_words), len(normalized_addition)), 0, -1):
+        if previous_words[-overlap:] == normalized_addition[:overlap]:
+            addition_words = addition_words[overlap:]
+            break
+    if not addition_words:
+        return previous
+    return f"{previous} {' '.join(addition_words)}"
+
+def stitch_all(parts) -> str:
+    """Stitches a sequence of transcript pieces, in order."""
+    text = ""
+    for part in parts:
+        text = stitch(text, part)
+    return text
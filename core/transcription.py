@@ -1,8 +1,18 @@
 # core/transcription.py
+import abc
 import subprocess
 import os
-import json
-from core.utils import get_resource_path, get_config_path
+import threading
+import wave
+from collections import OrderedDict
+import numpy as np
+from core.utils import get_resource_path, get_default_whisper_threads
+from core.config_manager import get_config, subscribe
+from core.audio_buffer import pcm_to_wav_bytes, read_wav_file
+from core import vad, whisper_server, long_audio, jobs
+from core.jobs import JobCancelled
+
+WHISPER_SAMPLE_RATE = 16000
 
 def _find_executable(directory: str) -> str | None:
     """Searches for a whisper executable in the given directory."""
@@ -13,80 +23,368 @@ def _find_executable(directory: str) -> str | None:
             return exe_path
     return None
 
-def transcribe_audio(audio_file_path: str) -> str:
+def _get_model_path(model_name: str) -> str:
+    return get_resource_path(os.path.join("models", f"ggml-{model_name}.bin"))
+
+def get_decoding_params(model_name: str, duration_seconds: float) -> dict:
+    """
+    Picks whisper decoding parameters for one utterance. The beam size for long
+    utterances and the thread count for each decoding mode come from the
+    per-model tuning stored by core.whisper_benchmark; short utterances always
+    use greedy decoding (beam_size 1). A beam_size of None leaves whisper's default.
+    """
+    transcription_config = get_config().get('transcription', {})
+    tuning = transcription_config.get('tuning', {}).get(model_name, {})
+    if duration_seconds < transcription_config.get('short_utterance_seconds', 8.0):
+        beam_size = 1
+    else:
+        beam_size = tuning.get('beam_size')
+    mode_threads = tuning.get('beam_threads') if beam_size and beam_size > 1 else tuning.get('greedy_threads')
+    # 'threads' is the single thread count stored by earlier versions.
+    threads = mode_threads or tuning.get('threads') or get_default_whisper_threads()
+    return {"threads": threads, "beam_size": beam_size}
+
+def _get_duration_seconds(audio) -> float:
+    if isinstance(audio, str):
+        try:
+            with wave.open(audio, 'rb') as wave_file:
+                return wave_file.getnframes() / wave_file.getframerate()
+        except (OSError, wave.Error):
+            return 0.0
+    return len(audio) / WHISPER_SAMPLE_RATE
+
+# --- Backends ---
+# A backend turns audio (a WAV path or 16 kHz mono int16 samples) into text,
+# using the decoding parameters from get_decoding_params() where it can.
+# transcribe() returns None when the backend can't handle the request right now,
+# so transcribe_audio() can move on to the next one; the subprocess backend is
+# the last resort and reports problems as "Error: ..." strings instead.
+
+class TranscriptionBackend(abc.ABC):
+    """Interface for the engines transcribe_audio() can use."""
+    name = "base"
+
+    @abc.abstractmethod
+    def is_available(self) -> bool:
+        """True if the backend can be used on this machine with the current settings."""
+
+    @abc.abstractmethod
+    def transcribe(self, audio, model_name: str, execution_provider: str, decoding: dict | None = None) -> str | None:
+        """Returns the transcript, or None if the next backend should be tried."""
+
+    def load(self, model_name: str, execution_provider: str, threads: int | None = None) -> bool:
+        """
+        Loads the model now and returns True if the backend keeps it resident for
+        the following transcriptions. threads is the thread count to load it with,
+        where that is fixed at load time.
+        """
+        return False
+
+    def preload(self, model_name: str, execution_provider: str):
+        """Loads the model ahead of the first transcription, if the backend keeps models resident."""
+
+    def shutdown(self):
+        """Releases processes or models held by the backend."""
+
+class SubprocessBackend(TranscriptionBackend):
+    """Runs whisper-cli once per utterance. Always works, but reloads the model every time."""
+    name = "subprocess"
+
+    def is_available(self) -> bool:
+        return True
+
+    @staticmethod
+    def build_command(whisper_executable: str, model_path: str, audio_input: str, execution_provider: str,
+                      decoding: dict | None = None) -> list[str]:
+        # The transcript is read from stdout (-nt: plain text without timestamps)
+        # instead of an -otxt output file.
+        command = [
+            whisper_executable,
+            "-m", model_path,
+            "-f", audio_input,
+            "-l", "en",
+            "-nt"
+        ]
+        if decoding:
+            command += ["-t", str(decoding["threads"])]
+            if decoding.get("beam_size"):
+                command += ["-bs", str(decoding["beam_size"])] # 1 selects greedy decoding
+
+        # Add execution provider argument
+        if execution_provider == "GPU":
+            command.append("--gpu") # Assuming --gpu is the correct flag for GPU execution
+        # No special flag needed for CPU, as it's usually the default
+        return command
+
+    def transcribe(self, audio, model_name: str, execution_provider: str, decoding: dict | None = None) -> str | None:
+        # --- Path Setup ---
+        whisper_dir = get_resource_path("bin/whisper_new")
+        whisper_executable = _find_executable(whisper_dir)
+
+        if not whisper_executable:
+            return f"Error: Could not find whisper-cli.exe, whisper.exe, or main.exe in '{whisper_dir}'"
+
+        model_path = _get_model_path(model_name)
+
+        # --- Pre-flight Checks ---
+        if not os.path.exists(model_path):
+            return f"Error: Model file not found at {model_path}"
+        if isinstance(audio, str):
+            audio_input = os.path.abspath(audio)
+            stdin_data = None
+            if not os.path.exists(audio_input):
+                return f"Error: Audio file not found at {audio_input}"
+        else:
+            audio_input = "-" # whisper.cpp reads WAV data from stdin
+            stdin_data = pcm_to_wav_bytes(audio, WHISPER_SAMPLE_RATE)
+
+        # --- Command Execution ---
+        command = self.build_command(whisper_executable, model_path, audio_input, execution_provider, decoding)
+        try:
+            print(f"Executing Whisper from directory: {whisper_dir}")
+            # Popen rather than subprocess.run, so a cancelled job can kill whisper mid-run.
+            process = subprocess.Popen(command, stdin=subprocess.PIPE if stdin_data is not None else None,
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=whisper_dir,
+                                       startupinfo=_get_startup_info())
+            with jobs.track_process(process):
+                stdout, stderr = process.communicate(stdin_data)
+            if process.returncode != 0:
+                raise subprocess.CalledProcessError(process.returncode, command, stdout, stderr)
+
+            transcribed_text = _clean_transcript(stdout.decode('utf-8', errors='replace'))
+            print("Transcription successful.")
+            return transcribed_text
+
+        except subprocess.CalledProcessError as e:
+            error_msg = f"Whisper failed with exit code {e.returncode}.\\nStderr: {e.stderr.decode('utf-8', errors='replace').strip()}"
+            print(error_msg)
+            return "Error during transcription. See console for details."
+        except FileNotFoundError:
+            return "Error: Could not run the Whisper executable."
+        except JobCancelled:
+            raise
+        except Exception as e:
+            return f"An unexpected error occurred: {e}"
+
+class ServerBackend(TranscriptionBackend):
+    """Sends in-memory WAV data to the resident whisper-server (see core.whisper_server)."""
+    name = "server"
+
+    def is_available(self) -> bool:
+        return whisper_server.is_available()
+
+    def transcribe(self, audio, model_name: str, execution_provider: str, decoding: dict | None = None) -> str | None:
+        # The server tracks the configured model and provider itself, and its
+        # thread count is fixed when it starts (only the beam size is sent per
+        # request). Other models (e.g. a two-pass draft model) go to the next backend.
+        if model_name != get_config().get('whisper_model', 'base'):
+            return None
+        if isinstance(audio, str):
+            with open(audio, 'rb') as f:
+                wav_bytes = f.read()
+        else:
+            wav_bytes = pcm_to_wav_bytes(audio, WHISPER_SAMPLE_RATE)
+        # The shared server is not killed for one cancelled job; its result is dropped instead.
+        text = whisper_server.transcribe(wav_bytes, beam_size=(decoding or {}).get("beam_size"))
+        jobs.check_cancelled()
+        return text
+
+    def load(self, model_name: str, execution_provider: str, threads: int | None = None) -> bool:
+        if model_name != get_config().get('whisper_model', 'base'):
+            return False
+        if threads:
+            whisper_server.set_threads(threads)
+        return whisper_server.start()
+
+    def preload(self, model_name: str, execution_provider: str):
+        whisper_server.warm_up()
+
+    def shutdown(self):
+        whisper_server.shutdown()
+
+class InProcessBackend(TranscriptionBackend):
     """
-    Transcribes an audio file using the whisper.cpp executable and returns the text.
+    Runs whisper.cpp inside this process through the optional pywhispercpp bindings.
+    Loaded models stay in memory, keyed by model name, and up to
+    transcription.max_resident_models of them are kept, so switching whisper_model
+    back and forth doesn't reload anything. Audio is passed as a NumPy array.
     """
-    print(f"Attempting to transcribe audio file: {audio_file_path}")
+    name = "in_process"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = OrderedDict() # model_name -> (model, lock); the GPU/CPU choice is fixed by how pywhispercpp was built
+        self._model_class = None
+        self._import_failed = False
+
+    def _get_model_class(self):
+        if self._model_class is None and not self._import_failed:
+            try:
+                from pywhispercpp.model import Model
+                self._model_class = Model
+            except ImportError:
+                self._import_failed = True
+        return self._model_class
+
+    def is_available(self) -> bool:
+        return self._get_model_class() is not None
+
+    def _get_model(self, model_name: str):
+        """Returns (model, lock) for the given model, loading it and evicting the least recently used one if needed."""
+        with self._lock:
+            if model_name in self._models:
+                self._models.move_to_end(model_name)
+                return self._models[model_name]
+            model_path = _get_model_path(model_name)
+            if not os.path.exists(model_path):
+                print(f"Model file not found at {model_path}")
+                return None
+            print(f"Loading Whisper model '{model_name}' in-process...")
+            model = self._get_model_class()(model_path, print_progress=False, print_realtime=False)
+            # A whisper.cpp context is not safe to use from two threads at once.
+            self._models[model_name] = (model, threading.Lock())
+            limit = max(1, get_config().get('transcription', {}).get('max_resident_models', 2))
+            while len(self._models) > limit:
+                evicted, _ = self._models.popitem(last=False)
+                print(f"Unloading Whisper model '{evicted}'.")
+            return self._models[model_name]
 
+    def transcribe(self, audio, model_name: str, execution_provider: str, decoding: dict | None = None) -> str | None:
+        try:
+            entry = self._get_model(model_name)
+            if entry is None:
+                return None
+            model, model_lock = entry
+            if isinstance(audio, str):
+                audio, _ = read_wav_file(audio)
+            samples = audio.astype(np.float32) / 32768.0
+            params = {"language": "en"}
+            if decoding:
+                # The sampling strategy is fixed when the model is created, so only threads apply here.
+                params["n_threads"] = decoding["threads"]
+            with model_lock:
+                jobs.check_cancelled()
+                segments = model.transcribe(samples, **params)
+            jobs.check_cancelled()
+            transcribed_text = " ".join(segment.text.strip() for segment in segments if segment.text.strip())
+            print("Transcription successful (in-process).")
+            return transcribed_text
+        except JobCancelled:
+            raise
+        except Exception as e:
+            print(f"In-process transcription failed: {e}")
+            return None
+
+    def load(self, model_name: str, execution_provider: str, threads: int | None = None) -> bool:
+        return self.is_available() and self._get_model(model_name) is not None
+
+    def preload(self, model_name: str, execution_provider: str):
+        if self.is_available():
+            threading.Thread(target=self.load, args=(model_name, execution_provider), daemon=True).start()
+
+    def shutdown(self):
+        with self._lock:
+            self._models.clear()
+
+BACKENDS = OrderedDict((backend.name, backend) for backend in (InProcessBackend(), ServerBackend(), SubprocessBackend()))
+
+def get_backends(preferred: str = "auto") -> list[TranscriptionBackend]:
+    """
+    Returns the available backends to try, in order. "auto" prefers a resident
+    model (in-process, then server) over spawning whisper-cli; naming a backend
+    uses it with whisper-cli as the only fallback.
+    """
+    if preferred in BACKENDS:
+        order = [BACKENDS[preferred], BACKENDS["subprocess"]]
+    else:
+        order = list(BACKENDS.values())
+    return [backend for backend in dict.fromkeys(order) if backend.is_available()]
+
+def _on_model_config_changed(diff: dict):
+    """Loads the newly selected model in the background so the next dictation doesn't wait for it."""
+    config = _load_config()
+    backends = get_backends(config["backend"])
+    if backends:
+        backends[0].preload(config["whisper_model"], config["whisper_execution_provider"])
+
+subscribe('whisper_model', _on_model_config_changed)
+
+# --- Public Functions ---
+def warm_up():
+    """Loads the Whisper model in the preferred backend at startup."""
     config = _load_config()
-    model_name = config.get('whisper_model', 'base')
-    execution_provider = config.get('whisper_execution_provider', 'CPU')
-
-    # --- Path Setup ---
-    whisper_dir = get_resource_path("bin/whisper_new")
-    whisper_executable = _find_executable(whisper_dir)
-
-    if not whisper_executable:
-        return f"Error: Could not find whisper-cli.exe, whisper.exe, or main.exe in '{whisper_dir}'"
-
-    model_path = get_resource_path(os.path.join("models", f"ggml-{model_name}.bin"))
-    absolute_audio_path = os.path.abspath(audio_file_path)
-    output_file_path = os.path.join(os.path.dirname(absolute_audio_path), "transcription_output")
-
-    # --- Pre-flight Checks ---
-    if not os.path.exists(model_path):
-        return f"Error: Model file not found at {model_path}"
-    if not os.path.exists(absolute_audio_path):
-        return f"Error: Audio file not found at {absolute_audio_path}"
-
-    # --- Command Execution ---
-    command = [
-        whisper_executable,
-        "-m", model_path,
-        "-f", absolute_audio_path,
-        "-l", "en",
-        "-otxt",
-        "-of", output_file_path
-    ]
-
-    # Add execution provider argument
-    if execution_provider == "GPU":
-        command.append("--gpu") # Assuming --gpu is the correct flag for GPU execution
-    # No special flag needed for CPU, as it's usually the default
-
-    try:
-        print(f"Executing Whisper from directory: {whisper_dir}")
-        subprocess.run(command, capture_output=True, text=True, check=True, cwd=whisper_dir, startupinfo=_get_startup_info())
-
-        transcript_filepath = output_file_path + ".txt"
-        with open(transcript_filepath, 'r', encoding='utf-8') as f:
-            transcribed_text = f.read().strip()
-
-        os.remove(transcript_filepath)
-
-        print("Transcription successful.")
-        return transcribed_text
-
-    except subprocess.CalledProcessError as e:
-        error_msg = f"Whisper failed with exit code {e.returncode}.\\nStderr: {e.stderr.strip()}"
-        print(error_msg)
-        return "Error during transcription. See console for details."
-    except FileNotFoundError:
-        return "Error: Could not find the transcription output file. Did Whisper run correctly?"
-    except Exception as e:
-        return f"An unexpected error occurred: {e}"
+    backends = get_backends(config["backend"])
+    if backends:
+        print(f"Transcription backend: {backends[0].name}")
+        backends[0].preload(config["whisper_model"], config["whisper_execution_provider"])
+
+def shutdown():
+    jobs.cancel_all_jobs()
+    for backend in BACKENDS.values():
+        backend.shutdown()
+
+def transcribe_audio(audio, model_name: str | None = None) -> str:
+    """
+    Transcribes audio with whisper.cpp and returns the text, using the first
+    available backend (see get_backends()), or split into parallel whisper-cli
+    segments when it is long and no resident model is available (see core.long_audio). `audio` is either a path to a WAV file
+    or 16 kHz mono int16 samples (a NumPy array or raw bytes), which never touch
+    the disk. In-memory audio is trimmed of silence first (see core.vad); if no
+    speech is found, an empty transcript is returned. model_name overrides the
+    configured whisper_model. Raises JobCancelled if the current job (see
+    core.jobs) is cancelled.
+    """
+    jobs.check_cancelled()
+    config = _load_config()
+    if model_name:
+        config["whisper_model"] = model_name
+    if isinstance(audio, str):
+        print(f"Attempting to transcribe audio file: {audio}")
+    else:
+        audio = np.frombuffer(audio, dtype=np.int16) if isinstance(audio, (bytes, bytearray)) else audio
+        if len(audio):
+            audio, report = vad.trim_with_config(audio, WHISPER_SAMPLE_RATE, config["vad"])
+            if report:
+                print(f"VAD removed {report['removed_seconds']:.1f}s of silence from {report['original_seconds']:.1f}s of audio.")
+                if len(audio) == 0:
+                    print("No speech detected; skipping transcription.")
+                    return ""
+        if len(audio) == 0:
+            return "Error: No audio was recorded."
+        print(f"Attempting to transcribe {len(audio) / WHISPER_SAMPLE_RATE:.1f}s of in-memory audio")
+
+    duration_seconds = _get_duration_seconds(audio)
+    backends = get_backends(config["backend"])
+    # Splitting only pays off for whisper-cli, which loads the model for every run anyway;
+    # a resident model (in-process or server) transcribes long audio in one pass.
+    if long_audio.is_long(duration_seconds) and backends and backends[0].name == SubprocessBackend.name:
+        transcribed_text = long_audio.transcribe_long_audio(audio, model_name=config["whisper_model"])
+        if not _is_error(transcribed_text):
+            return transcribed_text
+        print(f"Parallel long-audio transcription failed ({transcribed_text}); transcribing in one pass.")
+
+    decoding = get_decoding_params(config["whisper_model"], duration_seconds)
+    for backend in backends:
+        transcribed_text = backend.transcribe(audio, config["whisper_model"], config["whisper_execution_provider"], decoding)
+        if transcribed_text is not None:
+            return transcribed_text
+        print(f"Transcription backend '{backend.name}' unavailable; trying the next one.")
+    return "Error: No transcription backend is available."
+
+def _is_error(text: str) -> bool:
+    return text.startswith("Error") or text.startswith("An unexpected error")
+
+def _clean_transcript(output: str) -> str:
+    """Joins whisper's per-segment stdout lines into a single transcript."""
+    return " ".join(line.strip() for line in output.splitlines() if line.strip())
 
 def _load_config():
-    config_path = get_config_path()
-    try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        config = {}
+    config = get_config()
     return {
         "whisper_model": config.get("whisper_model", "base"),
-        "whisper_execution_provider": config.get("hardware", {}).get("whisper_execution_provider", "CPU")
+        "whisper_execution_provider": config.get("hardware", {}).get("whisper_execution_provider", "CPU"),
+        "backend": config.get("transcription", {}).get("backend", "auto"),
+        "vad": config.get("vad", {})
     }
 
 def _get_startup_info():
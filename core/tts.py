@@ -4,9 +4,7 @@ import threading
 import pythoncom
 import win32com.client
 import simpleaudio as sa
-from openai import OpenAI
 import subprocess
-import pyaudio
 import numpy as np
 import wave
 import os
@@ -18,8 +16,10 @@ import re
 import queue
 import sounddevice as sd
 
-from core.config_manager import load_config, save_config
+from core.config_manager import get_config, save_config, subscribe
 from core.utils import get_resource_path
+from core import audio_devices, http_client
+from core.audio_buffer import pcm_to_wav_bytes
 from kokoro_tts.kokoro_tts import KokoroTTS, SAMPLE_RATE as KOKORO_SAMPLE_RATE
 from piper_tts.piper_tts import PiperTTS
 
@@ -61,6 +61,7 @@ def _play_audio(audio_data, sample_rate, sample_width):
         current_playback.wait_done()
     except Exception as e:
         logger.error(f"Error playing audio: {e}")
+        audio_devices.report_device_error(None, e) # simpleaudio plays on the default device
     finally:
         current_playback = None
 
@@ -74,7 +75,7 @@ def _initialize_kokoro_tts():
 
     logger.info("Attempting to initialize Kokoro TTS...")
     try:
-        config = load_config()
+        config = get_config()
         kokoro_config = config.get('tts_providers', {}).get('Kokoro TTS', {})
         hardware_config = config.get('hardware', {})
         kokoro_tts_instance = KokoroTTS(
@@ -94,7 +95,7 @@ def _initialize_piper_tts():
         return
 
     logger.info("Attempting to initialize Piper TTS...")
-    config = load_config()
+    config = get_config()
     piper_config = config.get('tts_providers', {}).get('Piper TTS', {})
     hardware_config = config.get('hardware', {})
     model_file = piper_config.get('model')
@@ -129,6 +130,20 @@ def _initialize_piper_tts():
         else:
             piper_tts_instance = None
 
+def _on_kokoro_config_changed(diff: dict):
+    """Drops the Kokoro engine when a setting baked into the instance changes; it is re-created lazily."""
+    global kokoro_tts_instance
+    if kokoro_tts_instance is not None and ('model_file' in diff or 'kokoro_execution_provider' in diff):
+        logger.info("Kokoro TTS model or execution provider changed. Engine will be reloaded on next use.")
+        kokoro_tts_instance = None
+
+def _on_piper_config_changed(diff: dict):
+    """Drops the Piper engine when its model or execution provider changes; it is re-created lazily."""
+    global piper_tts_instance
+    if piper_tts_instance is not None and ('model' in diff or 'piper_execution_provider' in diff):
+        logger.info("Piper TTS model or execution provider changed. Engine will be reloaded on next use.")
+        piper_tts_instance = None
+
 def _sapi_worker():
     """A dedicated worker for caching SAPI voices."""
     global available_sapi_voices_cache
@@ -184,20 +199,16 @@ def get_voices_for_piper_model(model_file: str):
         return []
 
 def get_output_devices():
-    pa = pyaudio.PyAudio()
-    devices = {}
-    try:
-        for i in range(pa.get_device_count()):
-            dev_info = pa.get_device_info_by_index(i)
-            if dev_info['maxOutputChannels'] > 0:
-                devices[f"{i}: {dev_info['name']}"] = i
-    except Exception as e:
-        logger.error(f"Could not query audio devices: {e}")
+    devices = audio_devices.get_output_devices()
+    if not devices:
         return {"No devices found": -1}
-    finally:
-        pa.terminate()
     return devices
 
+def rescan_output_devices():
+    """Re-enumerates audio devices (e.g., after plugging in a headset) and returns the output devices."""
+    audio_devices.rescan()
+    return get_output_devices()
+
 def play_test_sound(device_index=None):
     speak_text("This is a test of the text to speech system.", override_device_index=device_index)
 
@@ -312,7 +323,7 @@ def test_openai_voice(text: str, voice: str, api_key: str, speed: float):
             
         logger.info(f"Testing OpenAI voice '{voice}': '{text[:50]}...'")
         try:
-            client = OpenAI(api_key=api_key)
+            client = http_client.get_openai_client(api_key)
             
             response = client.audio.speech.create(
                 model="tts-1",
@@ -359,6 +370,8 @@ def test_kokoro_voice(text: str, kokoro_config: dict, device_index: int = None):
             logger.info(f"Kokoro TTS using providers: {kokoro_tts_instance.kokoro.sess.get_providers()}")
             sentences = re.split(r'(?<=[.!?])\s+', text.replace('\n', ' '))
             kokoro_tts_instance.stream(sentences, language, voice_or_embedding, 1.0, device_index=device_index, interrupt_event=tts_interrupt_event)
+        except sd.PortAudioError as e:
+            audio_devices.report_device_error(device_index, e)
         except Exception as e:
             logger.error(f"An unexpected error occurred during Kokoro voice test: {e}")
 
@@ -369,7 +382,7 @@ def test_piper_voice(text: str, model_file: str, voice_name: str = None, length_
     def task():
         logger.info(f"Testing Piper model '{model_file}' with voice '{voice_name}' on device {device_index}...")
         try:
-            config = load_config()
+            config = get_config()
             hardware_config = config.get('hardware', {})
             model_path = get_resource_path(os.path.join("models", "piper", model_file))
             
@@ -384,6 +397,8 @@ def test_piper_voice(text: str, model_file: str, voice_name: str = None, length_
                 if tts_interrupt_event.is_set():
                     break
                 piper_instance.stream(sentence, speaker_name=voice_name, length_scale=length_scale)
+        except sd.PortAudioError as e:
+            audio_devices.report_device_error(None, e)
         except Exception as e:
             logger.error(f"An unexpected error occurred during Piper voice test: {e}")
     threading.Thread(target=task, daemon=True).start()
@@ -422,7 +437,7 @@ def _speak_openai(text: str, config: dict, device_index: int = None):
             logger.error("OpenAI API key is not configured.")
             return
 
-        client = OpenAI(api_key=api_key)
+        client = http_client.get_openai_client(api_key)
         voice = openai_config.get('voice', 'alloy')
         speed = openai_config.get('speed', 1.0)
         
@@ -463,6 +478,8 @@ def _speak_kokoro(text: str, config: dict, device_index: int = None):
 
         sentences = re.split(r'(?<=[.!?])\s+', text.replace('\n', ' '))
         kokoro_tts_instance.stream(sentences, language, voice_or_embedding, speed, device_index=device_index, interrupt_event=tts_interrupt_event)
+    except sd.PortAudioError as e:
+        audio_devices.report_device_error(device_index, e)
     except Exception as e:
         logger.error(f"An unexpected error occurred with Kokoro TTS: {e}")
 
@@ -482,11 +499,69 @@ def _speak_piper(text: str, config: dict, device_index: int = None):
         for sentence in sentences:
             if tts_interrupt_event.is_set():
                 break
-            piper_instance.stream(sentence, speaker_name=speaker_name, length_scale=length_scale)
+            piper_tts_instance.stream(sentence, speaker_name=speaker_name, length_scale=length_scale)
 
+    except sd.PortAudioError as e:
+        audio_devices.report_device_error(None, e) # Piper plays on the default device
     except Exception as e:
         logger.error(f"An unexpected error occurred with Piper TTS: {e}")
 
+def _synthesize_sapi_to_file(text: str, output_path: str, config: dict) -> bool:
+    try:
+        sapi_config = config.get('tts_providers', {}).get('Windows SAPI', {})
+        voice_index = sapi_config.get('voice_index', 0)
+
+        pythoncom.CoInitializeEx(pythoncom.COINIT_APARTMENTTHREADED)
+        speaker = win32com.client.Dispatch("SAPI.SpVoice")
+        voices = speaker.GetVoices()
+        if voice_index is not None and 0 <= voice_index < voices.Count:
+            speaker.Voice = voices.Item(voice_index)
+        speaker.Rate = sapi_config.get('rate', 0)
+
+        file_stream = win32com.client.Dispatch("SAPI.SpFileStream")
+        file_stream.Open(os.path.abspath(output_path), 3) # SSFMCreateForWrite
+        try:
+            speaker.AudioOutputStream = file_stream
+            speaker.Speak(text)
+        finally:
+            file_stream.Close()
+        return True
+    except Exception as e:
+        logger.error(f"Could not synthesize speech to {output_path} with SAPI: {e}")
+        return False
+    finally:
+        pythoncom.CoUninitialize()
+
+def synthesize_to_file(text: str, output_path: str) -> bool:
+    """
+    Writes text, spoken by the active TTS provider, to a WAV file instead of
+    playing it. Providers that can't synthesize to a file (OpenAI) and providers
+    that fail fall back to Windows SAPI. Returns True if the file was written.
+    """
+    config = get_config()
+    provider = config.get('active_tts_provider', 'Windows SAPI')
+    try:
+        if provider == 'Piper TTS':
+            _initialize_piper_tts()
+            if piper_tts_instance:
+                piper_config = config.get('tts_providers', {}).get('Piper TTS', {})
+                piper_tts_instance.save_to_wav(text, output_path, speaker_name=piper_config.get('voice'),
+                                               length_scale=piper_config.get('length_scale', 1.0))
+                return True
+        elif provider == 'Kokoro TTS':
+            kokoro_config = config.get('tts_providers', {}).get('Kokoro TTS', {})
+            voice_or_embedding = _get_kokoro_voice_or_embedding_from_config(kokoro_config)
+            if voice_or_embedding is not None:
+                samples = kokoro_tts_instance.synthesize_to_memory(text, kokoro_config.get('language', 'English (US)'),
+                                                                   voice_or_embedding, kokoro_config.get('speed', 1.0))
+                pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+                with open(output_path, 'wb') as f:
+                    f.write(pcm_to_wav_bytes(pcm, KOKORO_SAMPLE_RATE))
+                return True
+    except Exception as e:
+        logger.error(f"{provider} could not synthesize speech to a file: {e}. Using Windows SAPI.")
+    return _synthesize_sapi_to_file(text, output_path, config)
+
 def extract_quoted_text(text: str) -> str:
     match = re.search(r'"([^"]+)"|\'([^\']+)\'', text)
     if match:
@@ -507,7 +582,7 @@ def _tts_worker():
             text, override_device_index = tts_queue.get()
             tts_interrupt_event.clear()
 
-            config = load_config()
+            config = get_config()
             provider = config.get('active_tts_provider', 'Windows SAPI')
             provider_config = config.get('tts_providers', {}).get(provider, {})
 
@@ -518,6 +593,9 @@ def _tts_worker():
             device_index = override_device_index
             if device_index is None:
                 device_index = config.get('audio', {}).get('output_device_index')
+            if device_index is not None and not audio_devices.is_output_device(device_index):
+                logger.warning(f"Output device {device_index} is not available. Using the system default.")
+                device_index = None
 
             logger.info(f"Speaking via {provider} on device {device_index}: '{text[:50]}...'")
 
@@ -539,6 +617,14 @@ def _tts_worker():
         except Exception as e:
             logger.error(f"Error in TTS worker thread: {e}")
 
+# --- Config Change Subscriptions ---
+# Voices, speed and other per-utterance settings are read from the cached config
+# view on each utterance; only settings that require a new engine instance are watched.
+subscribe('tts_providers.Kokoro TTS', _on_kokoro_config_changed)
+subscribe('tts_providers.Piper TTS', _on_piper_config_changed)
+subscribe('hardware', _on_kokoro_config_changed)
+subscribe('hardware', _on_piper_config_changed)
+
 # --- Start SAPI and TTS Worker Initialization ---
 sapi_init_thread = threading.Thread(target=_sapi_worker, daemon=True)
 sapi_init_thread.start()
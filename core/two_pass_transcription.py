@@ -0,0 +1,77 @@
+# core/two_pass_transcription.py
+
+import threading
+import core.transcription
+from core import jobs
+from core.audio_buffer import release_recording
+from core.config_manager import get_config
+from core.whisper_benchmark import word_error_rate
+
+# With two-pass transcription enabled for a hotkey action
+# (transcription.two_pass_actions), a recording is first transcribed with the
+# small transcription.draft_model so the text can be injected or sent to the AI
+# right away. The configured whisper_model then transcribes the same audio in
+# the background, and its result replaces the draft when the two differ by more
+# than transcription.two_pass_min_difference (word error rate between them).
+
+def _is_error(text: str) -> bool:
+    return text.startswith("Error") or text.startswith("An unexpected error")
+
+def is_enabled(action: str | None) -> bool:
+    """True if two-pass transcription is turned on for the hotkey action and would use a different model."""
+    config = get_config()
+    transcription_config = config.get('transcription', {})
+    draft_model = transcription_config.get('draft_model', 'tiny')
+    return (bool(action) and transcription_config.get('two_pass_actions', {}).get(action, False)
+            and bool(draft_model) and draft_model != config.get('whisper_model', 'base'))
+
+def differs_materially(draft: str, refined: str) -> bool:
+    """True if the refined transcript should replace the draft."""
+    threshold = get_config().get('transcription', {}).get('two_pass_min_difference', 0.15)
+    return word_error_rate(refined, draft) > threshold
+
+class TwoPassTranscriber:
+    """Transcribes one recording with the draft model, then again with the configured model in the background."""
+
+    def __init__(self, audio):
+        self._audio = audio
+        self._draft_model = get_config().get('transcription', {}).get('draft_model', 'tiny')
+        self._refined = None
+        self._job = jobs.current_job()
+        self._thread = threading.Thread(target=self._refine, daemon=True)
+
+    def _refine(self):
+        try:
+            with jobs.activate(self._job):
+                self._refined = core.transcription.transcribe_audio(self._audio)
+        except jobs.JobCancelled:
+            pass # The processing thread notices the cancellation itself.
+        finally:
+            release_recording(self._audio)
+
+    def draft(self) -> str:
+        """
+        Returns the draft transcript and starts the refining pass. If the draft
+        model fails (e.g. it isn't installed), the configured model's transcript is
+        returned instead and there is nothing left to refine.
+        """
+        try:
+            text = core.transcription.transcribe_audio(self._audio, model_name=self._draft_model)
+        except jobs.JobCancelled:
+            release_recording(self._audio)
+            raise
+        if _is_error(text):
+            print(f"Draft transcription with '{self._draft_model}' failed ({text}); using the configured model.")
+            self._refine()
+            jobs.check_cancelled()
+            return self._refined
+        print(f"Draft transcript ({self._draft_model}): {text}")
+        self._thread.start()
+        return text
+
+    def refined(self) -> str | None:
+        """Waits for the refining pass and returns its transcript, or None if draft() already returned it."""
+        if not self._thread.is_alive() and self._thread.ident is None:
+            return None
+        self._thread.join()
+        return self._refined
@@ -28,3 +28,7 @@ def get_config_path() -> str:
     config_dir = os.path.join(home_dir, ".VibeType")
     os.makedirs(config_dir, exist_ok=True)
     return os.path.normpath(os.path.join(config_dir, "config.json"))
+
+def get_default_whisper_threads() -> int:
+    """Thread count for whisper when no tuning is stored for the model: every core, up to 8."""
+    return min(os.cpu_count() or 4, 8)
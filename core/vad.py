@@ -0,0 +1,117 @@
+# core/vad.py
+
+import numpy as np
+
+# Whisper's cost grows with the length of the audio it is given, and dictation
+# recordings carry a lot of silence: the gap before the user starts talking, the
+# tail before the hotkey is released, and every pause in between. This is a
+# simple energy detector (no model) that frames the signal, marks frames above a
+# dBFS threshold as speech, and cuts everything else except a little padding.
+
+DEFAULTS = {
+    "enabled": True,
+    "threshold_db": -45.0,   # frames quieter than this (dBFS RMS) are silence
+    "frame_ms": 30,
+    "padding_ms": 200,       # silence kept around speech so word edges aren't clipped
+    "max_pause_ms": 600      # internal pauses longer than this are shortened to it
+}
+
+def frame_energy_db(samples: np.ndarray, frame_length: int) -> np.ndarray:
+    """Returns the RMS level in dBFS of each complete frame of int16 samples."""
+    frame_count = len(samples) // frame_length
+    if frame_count == 0:
+        return np.empty(0)
+    frames = samples[:frame_count * frame_length].astype(np.float32).reshape(frame_count, frame_length)
+    rms = np.sqrt(np.mean(frames * frames, axis=1)) / 32768.0
+    return 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+def _runs(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the start and end (exclusive) indices of the True runs in a boolean array."""
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+def trim_silence(samples: np.ndarray, sample_rate: int = 16000, threshold_db: float = DEFAULTS["threshold_db"],
+                 frame_ms: int = DEFAULTS["frame_ms"], padding_ms: int = DEFAULTS["padding_ms"],
+                 max_pause_ms: int = DEFAULTS["max_pause_ms"]) -> tuple[np.ndarray, dict]:
+    """
+    Removes leading and trailing silence from int16 samples and shortens internal
+    pauses to at most max_pause_ms. Returns (trimmed samples, report), where the
+    report holds original_seconds, trimmed_seconds and removed_seconds. If no frame
+    reaches the threshold, the trimmed audio is empty.
+    """
+    frame_length = max(1, int(sample_rate * frame_ms / 1000))
+    energy = frame_energy_db(samples, frame_length)
+    speech = energy > threshold_db
+
+    if speech.any():
+        # Dilate the speech frames by the padding on both sides.
+        padding_frames = int(np.ceil(padding_ms / frame_ms))
+        if padding_frames:
+            speech = np.convolve(speech, np.ones(2 * padding_frames + 1), mode='same') > 0
+
+        # Keep at most max_pause frames of every gap between speech runs, split
+        # evenly between its two ends.
+        keep = speech.copy()
+        max_pause_frames = int(max_pause_ms / frame_ms)
+        starts, ends = _runs(~speech)
+        for start, end in zip(starts, ends):
+            if start == 0 or end == len(speech):
+                continue # leading/trailing silence is dropped entirely
+            if end - start <= max_pause_frames:
+                keep[start:end] = True
+            else:
+                half = max_pause_frames // 2
+                keep[start:start + half] = True
+                keep[end - (max_pause_frames - half):end] = True
+
+        kept_samples = np.repeat(keep, frame_length)
+        # A partial frame at the end is kept only if the last full frame was.
+        tail = np.full(len(samples) - len(kept_samples), bool(keep[-1]))
+        trimmed = samples[np.concatenate((kept_samples, tail))]
+    else:
+        trimmed = samples[:0]
+
+    original_seconds = len(samples) / sample_rate
+    trimmed_seconds = len(trimmed) / sample_rate
+    report = {
+        "original_seconds": original_seconds,
+        "trimmed_seconds": trimmed_seconds,
+        "removed_seconds": original_seconds - trimmed_seconds
+    }
+    return trimmed, report
+
+def trim_with_config(samples: np.ndarray, sample_rate: int, vad_config) -> tuple[np.ndarray, dict | None]:
+    """Applies trim_silence with the settings from config['vad']. Returns (samples, None) when VAD is disabled."""
+    settings = {**DEFAULTS, **(vad_config or {})}
+    if not settings["enabled"]:
+        return samples, None
+    return trim_silence(samples, sample_rate, threshold_db=settings["threshold_db"], frame_ms=settings["frame_ms"],
+                        padding_ms=settings["padding_ms"], max_pause_ms=settings["max_pause_ms"])
+
+class SilenceEndpointer:
+    """
+    Watches a live stream chunk by chunk and reports the moment speech has been
+    followed by silence_ms of silence. Silence before the first speech never
+    triggers it, so the user can take a moment before starting to talk.
+    """
+    def __init__(self, sample_rate: int, silence_ms: int, threshold_db: float = DEFAULTS["threshold_db"]):
+        self.threshold_db = threshold_db
+        self.silence_samples = int(sample_rate * silence_ms / 1000)
+        self.heard_speech = False
+        self.triggered = False
+        self._silent_samples = 0
+
+    def feed(self, pcm) -> bool:
+        """Processes one chunk of int16 audio. Returns True once, when the endpoint is reached."""
+        samples = np.frombuffer(pcm, dtype=np.int16) if isinstance(pcm, (bytes, bytearray, memoryview)) else pcm
+        if self.triggered or samples.size == 0:
+            return False
+        if frame_energy_db(samples, samples.size)[0] > self.threshold_db:
+            self.heard_speech = True
+            self._silent_samples = 0
+        elif self.heard_speech:
+            self._silent_samples += samples.size
+            if self._silent_samples >= self.silence_samples:
+                self.triggered = True
+                return True
+        return False
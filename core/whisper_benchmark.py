@@ -0,0 +1,291 @@
+# core/whisper_benchmark.py
+
+import glob
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+from datetime import datetime
+import psutil
+import core.transcription
+from core.audio_buffer import pcm_to_wav_bytes, read_wav_file
+from core.config_manager import get_config, load_config, save_config
+from core.resample import resample
+from core.utils import get_resource_path
+
+# Tunes whisper's thread count and decoding mode for the machine it runs on.
+# Every combination of thread count and beam size is timed on a set of
+# reference clips with the whisper-cli backend. The fastest thread count wins.
+# Beam search is kept for long utterances only if it still runs well below
+# real time; short utterances always decode greedily (see
+# core.transcription.get_decoding_params).
+#
+# It also compares the installed models (every models/ggml-*.bin, including
+# quantized q5/q8 variants) on real-time factor, load time, peak memory and word
+# error rate, and can pick the fastest model that is accurate enough.
+#
+# Reference clips are WAV files in benchmarks/clips/, each with a .txt file of
+# the same name holding the expected transcript (needed for WER only). Only the
+# transcripts are shipped: the audio is generated on first use by speaking them
+# with the app's TTS (see ensure_reference_clips()).
+
+REFERENCE_CLIPS_DIR = get_resource_path(os.path.join("benchmarks", "clips"))
+RESULTS_DIR = get_resource_path("benchmarks")
+MODELS_DIR = get_resource_path("models")
+BEAM_SIZES = (1, 5)
+BEAM_RTF_BUDGET = 0.5 # beam search must run at least 2x faster than real time
+DEFAULT_MAX_WER = 0.15
+
+def find_reference_clips(directory: str = REFERENCE_CLIPS_DIR) -> list[str]:
+    """Returns the WAV files in the reference clip directory, sorted by name."""
+    return sorted(glob.glob(os.path.join(directory, "*.wav")))
+
+def _synthesize_clip(text: str, path: str) -> bool:
+    import core.tts # only needed to generate the clips once
+    return core.tts.synthesize_to_file(text, path)
+
+def ensure_reference_clips(directory: str | None = None, progress_callback=None) -> list[str]:
+    """
+    Returns the reference clips in directory (default: REFERENCE_CLIPS_DIR), first
+    generating the audio for every shipped transcript (<name>.txt) that has no
+    <name>.wav yet. Raises FileNotFoundError if there are no clips and none could
+    be generated.
+    """
+    directory = directory or REFERENCE_CLIPS_DIR
+    for transcript_path in sorted(glob.glob(os.path.join(directory, "*.txt"))):
+        clip_path = os.path.splitext(transcript_path)[0] + ".wav"
+        if os.path.exists(clip_path):
+            continue
+        if progress_callback:
+            progress_callback(f"Generating reference clip {os.path.basename(clip_path)}...")
+        if not _synthesize_clip(load_reference_transcript(clip_path), clip_path) and os.path.exists(clip_path):
+            os.remove(clip_path) # don't leave a partial clip behind
+    clips = find_reference_clips(directory)
+    if not clips:
+        raise FileNotFoundError(f"No reference clips (*.wav) found in {directory}, and none could be generated with TTS.")
+    return clips
+
+def load_clip(path: str):
+    """Reads a reference clip as 16 kHz mono int16 samples."""
+    samples, sample_rate = read_wav_file(path)
+    if sample_rate != core.transcription.WHISPER_SAMPLE_RATE:
+        samples = resample(samples, sample_rate, core.transcription.WHISPER_SAMPLE_RATE)
+    return samples
+
+def load_reference_transcript(clip_path: str) -> str | None:
+    """Returns the expected transcript stored next to a clip (<clip>.txt), if there is one."""
+    transcript_path = os.path.splitext(clip_path)[0] + ".txt"
+    if not os.path.exists(transcript_path):
+        return None
+    with open(transcript_path, 'r', encoding='utf-8') as f:
+        return f.read().strip()
+
+def find_models(directory: str = MODELS_DIR) -> list[str]:
+    """Returns the names of the installed whisper models, e.g. ["base", "base.en-q5_1"]."""
+    paths = glob.glob(os.path.join(directory, "ggml-*.bin"))
+    return sorted(os.path.basename(path)[len("ggml-"):-len(".bin")] for path in paths)
+
+def _normalize_words(text: str) -> list[str]:
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+def word_error_counts(reference: str, hypothesis: str) -> tuple[int, int]:
+    """Returns (word edits, reference word count) between two transcripts, ignoring case and punctuation."""
+    ref = _normalize_words(reference)
+    hyp = _normalize_words(hypothesis)
+    # Levenshtein distance over words, one DP row at a time
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, start=1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1], len(ref)
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    edits, words = word_error_counts(reference, hypothesis)
+    return edits / words if words else float(edits > 0)
+
+def default_thread_counts() -> list[int]:
+    """Powers of two up to the CPU count, plus the CPU count itself."""
+    cpu_count = os.cpu_count() or 4
+    counts = {cpu_count}
+    threads = 1
+    while threads < cpu_count:
+        counts.add(threads)
+        threads *= 2
+    return sorted(counts)
+
+def benchmark(model_name: str, clips: list[str] | None = None, thread_counts: list[int] | None = None,
+              beam_sizes=BEAM_SIZES, progress_callback=None) -> list[dict]:
+    """
+    Times whisper-cli on every clip for each (threads, beam_size) combination.
+    Returns one row per combination: threads, beam_size, seconds, audio_seconds
+    and rtf (processing time / audio duration).
+    """
+    clips = clips if clips is not None else ensure_reference_clips(progress_callback=progress_callback)
+    audio = [load_clip(path) for path in clips]
+    audio_seconds = sum(len(samples) for samples in audio) / core.transcription.WHISPER_SAMPLE_RATE
+    execution_provider = get_config().get('hardware', {}).get('whisper_execution_provider', 'CPU')
+    backend = core.transcription.BACKENDS["subprocess"]
+
+    results = []
+    combinations = [(threads, beam_size) for beam_size in beam_sizes for threads in (thread_counts or default_thread_counts())]
+    for i, (threads, beam_size) in enumerate(combinations):
+        if progress_callback:
+            progress_callback(f"Benchmarking {model_name}: {threads} threads, beam size {beam_size} ({i + 1}/{len(combinations)})")
+        start = time.perf_counter()
+        for samples in audio:
+            text = backend.transcribe(samples, model_name, execution_provider, {"threads": threads, "beam_size": beam_size})
+            if text.startswith("Error") or text.startswith("An unexpected error"):
+                raise RuntimeError(text)
+        seconds = time.perf_counter() - start
+        results.append({"threads": threads, "beam_size": beam_size, "seconds": seconds,
+                        "audio_seconds": audio_seconds, "rtf": seconds / audio_seconds})
+    return results
+
+def pick_best(results: list[dict]) -> dict:
+    """Chooses the tuning to persist from benchmark() results."""
+    greedy = [r for r in results if r["beam_size"] == 1] or results
+    best_greedy = min(greedy, key=lambda r: r["seconds"])
+    tuning = {"greedy_threads": best_greedy["threads"], "beam_size": 1, "greedy_rtf": round(best_greedy["rtf"], 3)}
+
+    beam = [r for r in results if r["beam_size"] > 1]
+    if beam:
+        best_beam = min(beam, key=lambda r: r["seconds"])
+        tuning["beam_rtf"] = round(best_beam["rtf"], 3)
+        if best_beam["rtf"] <= BEAM_RTF_BUDGET:
+            tuning["beam_size"] = best_beam["beam_size"]
+            tuning["beam_threads"] = best_beam["threads"]
+    return tuning
+
+def tune(model_name: str | None = None, clips: list[str] | None = None, progress_callback=None) -> dict:
+    """
+    Benchmarks the given (default: configured) model and stores the result in
+    config['transcription']['tuning'][model_name]. Returns the stored tuning.
+    """
+    model_name = model_name or get_config().get('whisper_model', 'base')
+    tuning = pick_best(benchmark(model_name, clips, progress_callback=progress_callback))
+    tuning["benchmarked_at"] = datetime.now().isoformat(timespec="seconds")
+    print(f"Whisper tuning for {model_name}: {tuning}")
+
+    config = load_config()
+    config.setdefault('transcription', {}).setdefault('tuning', {})[model_name] = tuning
+    save_config(config)
+    return tuning
+
+def _run_measured(command: list[str], stdin_data: bytes, cwd: str) -> tuple[str, str, int]:
+    """Runs whisper-cli and returns (stdout, stderr, peak resident memory in bytes)."""
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               cwd=cwd, startupinfo=core.transcription._get_startup_info())
+    peak = [0]
+    def sample_memory():
+        try:
+            ps_process = psutil.Process(process.pid)
+            while process.poll() is None:
+                info = ps_process.memory_info()
+                # Windows tracks the peak itself; elsewhere the sampled maximum has to do.
+                peak[0] = max(peak[0], getattr(info, 'peak_wset', 0) or info.rss)
+                time.sleep(0.02)
+        except psutil.Error:
+            pass
+    sampler = threading.Thread(target=sample_memory, daemon=True)
+    sampler.start()
+    stdout, stderr = process.communicate(stdin_data)
+    sampler.join()
+    if process.returncode != 0:
+        raise RuntimeError(f"Whisper failed with exit code {process.returncode}: {stderr.decode('utf-8', errors='replace').strip()}")
+    return stdout.decode('utf-8', errors='replace'), stderr.decode('utf-8', errors='replace'), peak[0]
+
+def benchmark_model(model_name: str, clips: list[str]) -> dict:
+    """
+    Transcribes every clip with one model through whisper-cli and returns its
+    rtf, load_ms (whisper's own model load timing), peak_rss_mb and wer (None
+    when no clip has a reference transcript).
+    """
+    whisper_dir = get_resource_path("bin/whisper_new")
+    executable = core.transcription._find_executable(whisper_dir)
+    if not executable:
+        raise FileNotFoundError(f"No whisper executable found in '{whisper_dir}'")
+    model_path = core.transcription._get_model_path(model_name)
+    execution_provider = get_config().get('hardware', {}).get('whisper_execution_provider', 'CPU')
+
+    seconds = 0.0
+    audio_seconds = 0.0
+    load_times = []
+    peak_rss = 0
+    edits = words = 0
+    for clip in clips:
+        samples = load_clip(clip)
+        audio_seconds += len(samples) / core.transcription.WHISPER_SAMPLE_RATE
+        decoding = core.transcription.get_decoding_params(model_name, len(samples) / core.transcription.WHISPER_SAMPLE_RATE)
+        command = core.transcription.SubprocessBackend.build_command(executable, model_path, "-", execution_provider, decoding)
+        start = time.perf_counter()
+        stdout, stderr, clip_peak = _run_measured(command, pcm_to_wav_bytes(samples), whisper_dir)
+        seconds += time.perf_counter() - start
+        peak_rss = max(peak_rss, clip_peak)
+        load_match = re.search(r"load time\s*=\s*([\d.]+)\s*ms", stderr)
+        if load_match:
+            load_times.append(float(load_match.group(1)))
+        reference = load_reference_transcript(clip)
+        if reference is not None:
+            clip_edits, clip_words = word_error_counts(reference, core.transcription._clean_transcript(stdout))
+            edits += clip_edits
+            words += clip_words
+
+    return {
+        "model": model_name,
+        "size_mb": round(os.path.getsize(model_path) / (1024 * 1024), 1),
+        "audio_seconds": round(audio_seconds, 2),
+        "seconds": round(seconds, 3),
+        "rtf": round(seconds / audio_seconds, 3) if audio_seconds else None,
+        "load_ms": round(sum(load_times) / len(load_times), 1) if load_times else None,
+        "peak_rss_mb": round(peak_rss / (1024 * 1024), 1),
+        "wer": round(edits / words, 4) if words else None
+    }
+
+def benchmark_models(models: list[str] | None = None, clips: list[str] | None = None, progress_callback=None) -> tuple[list[dict], str]:
+    """
+    Benchmarks every installed model (or the given ones) on the reference clips and
+    saves the results as JSON under benchmarks/. Returns (results, results path).
+    Models that fail to run are reported with an "error" entry.
+    """
+    clips = clips if clips is not None else ensure_reference_clips(progress_callback=progress_callback)
+    models = models if models is not None else find_models()
+    results = []
+    for i, model_name in enumerate(models):
+        if progress_callback:
+            progress_callback(f"Benchmarking model {model_name} ({i + 1}/{len(models)})")
+        try:
+            results.append(benchmark_model(model_name, clips))
+        except Exception as e:
+            print(f"Benchmark of {model_name} failed: {e}")
+            results.append({"model": model_name, "error": str(e)})
+    return results, save_results(results, clips)
+
+def save_results(results: list[dict], clips: list[str]) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    timestamp = datetime.now()
+    path = os.path.join(RESULTS_DIR, f"whisper-models-{timestamp.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "created_at": timestamp.isoformat(timespec="seconds"),
+            "cpu_count": os.cpu_count(),
+            "clips": [os.path.basename(clip) for clip in clips],
+            "results": results
+        }, f, indent=4)
+    print(f"Benchmark results saved to {path}")
+    return path
+
+def select_model(results: list[dict], max_wer: float | None = None) -> str | None:
+    """
+    Returns the fastest model (lowest RTF) whose WER is within max_wer (default:
+    transcription.max_wer in the config), or None if no model qualifies.
+    """
+    if max_wer is None:
+        max_wer = get_config().get('transcription', {}).get('max_wer', DEFAULT_MAX_WER)
+    candidates = [r for r in results if r.get("rtf") is not None and r.get("wer") is not None and r["wer"] <= max_wer]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda r: r["rtf"])["model"]
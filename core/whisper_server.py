@@ -0,0 +1,261 @@
+# core/whisper_server.py
+
+import os
+import socket
+import subprocess
+import threading
+import time
+import requests
+from core import http_client
+from core.utils import get_resource_path, get_default_whisper_threads
+from core.config_manager import get_config, subscribe
+
+# whisper-cli reloads the whole ggml model from disk on every run, which is most
+# of the latency for a short utterance. whisper.cpp also ships an HTTP server
+# that loads the model once and keeps it resident; this module runs it as a
+# managed child process bound to localhost, restarts it when it crashes or when
+# the model/execution provider changes, and sends it in-memory WAV data.
+
+SERVER_EXECUTABLES = ["whisper-server.exe", "server.exe"]
+STARTUP_TIMEOUT_SECONDS = 60.0
+REQUEST_TIMEOUT_SECONDS = 120.0
+MAX_RESTART_BACKOFF_SECONDS = 30.0
+
+# --- Globals ---
+# The server is launched without holding _server_lock, since loading the model
+# can take a while: _starting marks a launch in progress and other callers wait
+# on _server_changed for it. shutdown() is final; only start() undoes it.
+_server_lock = threading.RLock()
+_server_changed = threading.Condition(_server_lock)
+_server_process = None
+_server_port = None
+_server_key = None  # (model_path, execution_provider, threads) the running server was started with
+_threads_override = None  # set by set_threads(); None uses the model's tuning
+_starting = False
+_stopping = False
+
+def _find_server_executable(directory: str) -> str | None:
+    for exe_name in SERVER_EXECUTABLES:
+        exe_path = os.path.join(directory, exe_name)
+        if os.path.exists(exe_path):
+            return exe_path
+    return None
+
+def _get_startup_info():
+    if os.name == 'nt':
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        return startupinfo
+    return None
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _desired_key():
+    config = get_config()
+    model_name = config.get('whisper_model', 'base')
+    model_path = get_resource_path(os.path.join("models", f"ggml-{model_name}.bin"))
+    execution_provider = config.get('hardware', {}).get('whisper_execution_provider', 'CPU')
+    # Most dictations are short and decoded greedily, so the server uses the greedy thread count.
+    tuning = config.get('transcription', {}).get('tuning', {}).get(model_name, {})
+    threads = _threads_override or tuning.get('greedy_threads') or tuning.get('threads') or get_default_whisper_threads()
+    return model_path, execution_provider, threads
+
+def _is_enabled() -> bool:
+    return get_config().get('transcription', {}).get('backend', 'auto') in ('auto', 'server')
+
+def _wait_until_ready(process: subprocess.Popen, port: int) -> bool:
+    """Polls the server's port until it accepts connections (the model is loaded by then)."""
+    deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+def _launch_server(key) -> tuple[subprocess.Popen, int] | None:
+    """Starts whisper-server for key = (model_path, execution_provider, threads) and waits until it is ready."""
+    model_path, execution_provider, threads = key
+    whisper_dir = get_resource_path("bin/whisper_new")
+    executable = _find_server_executable(whisper_dir)
+    if not executable:
+        print(f"No whisper server executable found in '{whisper_dir}'.")
+        return None
+    if not os.path.exists(model_path):
+        print(f"Whisper model not found at {model_path}; not starting the server.")
+        return None
+
+    port = _free_port()
+    command = [executable, "-m", model_path, "--host", "127.0.0.1", "--port", str(port), "-l", "en", "-t", str(threads)]
+    if execution_provider != "GPU":
+        command.append("-ng") # --no-gpu
+    print(f"Starting whisper server on port {port} with model {os.path.basename(model_path)}...")
+    process = subprocess.Popen(command, cwd=whisper_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               startupinfo=_get_startup_info())
+    if not _wait_until_ready(process, port):
+        print("Whisper server failed to start.")
+        process.kill()
+        return None
+    return process, port
+
+def _detach_server() -> subprocess.Popen | None:
+    """Forgets the running server and returns its process for _terminate(). Must be called with _server_lock held."""
+    global _server_process, _server_port, _server_key
+    process = _server_process
+    _server_process, _server_port, _server_key = None, None, None
+    return process
+
+def _terminate(process: subprocess.Popen | None):
+    if process and process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def _watch_server(process: subprocess.Popen):
+    """Restarts the server with backoff if it exits without being asked to."""
+    process.wait()
+    backoff = 1.0
+    while True:
+        with _server_lock:
+            if _stopping or process is not _server_process or not _is_enabled():
+                return
+            print(f"Whisper server exited unexpectedly (code {process.returncode}). Restarting in {backoff:.0f}s...")
+        time.sleep(backoff)
+        with _server_lock:
+            if _stopping or process is not _server_process:
+                return
+            _detach_server()
+        if _ensure_server() is not None:
+            return
+        backoff = min(backoff * 2, MAX_RESTART_BACKOFF_SECONDS)
+
+def _ensure_server() -> int | None:
+    """
+    Returns the port of a running server for the configured model, starting or
+    restarting it if needed, or None if it can't run or has been shut down.
+    """
+    global _starting, _server_process, _server_port, _server_key
+    with _server_changed:
+        while True:
+            if _stopping:
+                return None
+            key = _desired_key()
+            if _server_process and _server_process.poll() is None and _server_key == key:
+                return _server_port
+            if not _starting:
+                break
+            _server_changed.wait() # Someone else is starting it; see what they got.
+        _starting = True
+        old_process = _detach_server()
+
+    launched = orphan = None
+    try:
+        _terminate(old_process)
+        launched = _launch_server(key)
+    finally:
+        with _server_changed:
+            _starting = False
+            if launched and _stopping:
+                orphan, launched = launched[0], None # shutdown() was called while it started.
+            elif launched:
+                _server_process, _server_port = launched
+                _server_key = key
+                threading.Thread(target=_watch_server, args=(_server_process,), daemon=True).start()
+                print("Whisper server is ready.")
+            _server_changed.notify_all()
+    _terminate(orphan)
+    return launched[1] if launched else None
+
+def _on_model_config_changed(diff: dict):
+    """Restarts the server in the background so the new model is resident before the next dictation."""
+    if '' not in diff and 'whisper_execution_provider' not in diff and 'backend' not in diff \
+            and not any(key.startswith('tuning.') for key in diff):
+        return
+    def restart():
+        with _server_lock:
+            if not _server_process and not _starting:
+                return # Not started yet; it will load the new model on first use.
+            process = _detach_server()
+        _terminate(process)
+        if _is_enabled():
+            _ensure_server()
+    threading.Thread(target=restart, daemon=True).start()
+
+subscribe('whisper_model', _on_model_config_changed)
+subscribe('hardware', _on_model_config_changed)
+subscribe('transcription', _on_model_config_changed)
+
+# --- Public Functions ---
+def is_available() -> bool:
+    """True if the server is allowed by transcription.backend and its executable is installed."""
+    return _is_enabled() and _find_server_executable(get_resource_path("bin/whisper_new")) is not None
+
+def warm_up():
+    """Starts the server in the background so the model is loaded before the first dictation."""
+    if is_available():
+        threading.Thread(target=_ensure_server, daemon=True).start()
+
+def start() -> bool:
+    """
+    Starts the server, also after shutdown(), and waits until the model is
+    loaded. Returns False if it can't run.
+    """
+    global _stopping
+    with _server_lock:
+        _stopping = False
+    return is_available() and _ensure_server() is not None
+
+def set_threads(threads: int | None):
+    """
+    Overrides the server's thread count, e.g. for batch workers that share the
+    cores between several servers. Takes effect when the server next starts.
+    """
+    global _threads_override
+    with _server_lock:
+        _threads_override = threads
+
+def transcribe(wav_bytes: bytes, beam_size: int | None = None) -> str | None:
+    """
+    Transcribes a WAV file held in memory. Returns the text, or None if the server
+    is unavailable so the caller can fall back to whisper-cli. beam_size 1 selects
+    greedy decoding; None leaves the server's default.
+    """
+    data = {"response_format": "text", "temperature": "0.0"}
+    if beam_size:
+        data["beam_size"] = str(beam_size)
+    for attempt in range(2):
+        port = _ensure_server()
+        if port is None:
+            return None
+        try:
+            response = http_client.post(
+                f"http://127.0.0.1:{port}/inference",
+                files={"file": ("audio.wav", wav_bytes, "audio/wav")},
+                data=data,
+                timeout=REQUEST_TIMEOUT_SECONDS
+            )
+            response.raise_for_status()
+            return " ".join(line.strip() for line in response.text.splitlines() if line.strip())
+        except requests.exceptions.RequestException as e:
+            print(f"Whisper server request failed: {e}")
+            # A dead or wedged server is replaced once before giving up.
+            with _server_lock:
+                process = _detach_server() if port == _server_port else None
+            _terminate(process)
+    return None
+
+def shutdown():
+    """Stops the server process. It stays stopped until start() is called again."""
+    global _stopping
+    with _server_lock:
+        _stopping = True
+        process = _detach_server()
+    _terminate(process)
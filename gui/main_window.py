@@ -6,7 +6,6 @@ import threading
 import pystray
 from pystray import MenuItem as item
 from PIL import Image, ImageDraw
-import pyaudio
 import numpy as np
 import queue
 import os
@@ -15,7 +14,7 @@ import os
 from core.config_manager import load_config, save_config
 from core.tts import get_available_voices, speak_text
 from core.app_state import register_command_queue
-from core import hotkey_handler
+from core import hotkey_handler, audio_devices
 
 # --- Settings Window Class (Fully Implemented) ---
 
@@ -39,16 +38,7 @@ class SettingsWindow(tk.Toplevel):
         self.protocol("WM_DELETE_WINDOW", self._on_cancel)
 
     def _get_input_devices(self):
-        pa = pyaudio.PyAudio()
-        devices = {}
-        try:
-            for i in range(pa.get_device_count()):
-                dev_info = pa.get_device_info_by_index(i)
-                if dev_info['maxInputChannels'] > 0:
-                    devices[f"{i}: {dev_info['name']}"] = i
-        finally:
-            pa.terminate()
-        return devices
+        return audio_devices.get_input_devices()
 
     def _create_variables(self):
         # General
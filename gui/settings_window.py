@@ -5,22 +5,24 @@ from tkinter import ttk, messagebox
 import webbrowser
 import os
 import json
+import threading
 
 # Import from core
 from core.config_manager import load_config, save_config
 from core.tts import (
-    get_available_sapi_voices, get_kokoro_voices, get_output_devices,
+    get_available_sapi_voices, get_kokoro_voices, get_output_devices, rescan_output_devices,
     play_test_sound, speak_text, trigger_kokoro_model_download,
     open_benchmark_folder, get_kokoro_models, trigger_kokoro_benchmark,
     test_kokoro_voice, get_piper_model_files, get_voices_for_piper_model,
     test_sapi_voice, test_piper_voice, test_openai_voice, get_kokoro_languages
 )
-from core.ai import test_ollama_connection, send_webhook_test, get_ai_response, get_ollama_models
+from core.ai import test_ollama_connection, send_webhook_test, get_ai_response, get_ollama_models, normalize_keep_alive
 from core.model_manager import delete_piper_model
 from core.transcript_saver import clear_transcript_history
 from core.analytics import load_analytics_data, reset_analytics_data
 from core.performance_monitor import get_performance_metrics
 from core.api_manager import start_api_server, stop_api_server, restart_api_server
+from core import whisper_benchmark
 
 def create_settings_window(parent: tk.Tk, on_save_callback=None):
     config = load_config()
@@ -106,7 +108,11 @@ def create_settings_window(parent: tk.Tk, on_save_callback=None):
     ollama_enabled_var = tk.BooleanVar(window, value=ollama_config.get('enabled', False))
     ollama_url_var = tk.StringVar(window, value=ollama_config.get('api_url', ''))
     ollama_model_var = tk.StringVar(window, value=ollama_config.get('model', ''))
+    ollama_keep_alive_var = tk.StringVar(window, value=ollama_config.get('keep_alive', '30m'))
+    ollama_warm_up_var = tk.BooleanVar(window, value=ollama_config.get('warm_up', True))
+    ollama_rewarm_var = tk.BooleanVar(window, value=ollama_config.get('rewarm_when_active', False))
     ai_speak_response_var = tk.BooleanVar(window, value=ollama_config.get('speak_response', True))
+    ai_stream_response_var = tk.BooleanVar(window, value=ollama_config.get('stream_response', True))
     webhook_enabled_var = tk.BooleanVar(window, value=ollama_config.get('webhook_enabled', False))
     webhook_url_var = tk.StringVar(window, value=ollama_config.get('webhook_url', ''))
 
@@ -153,11 +159,25 @@ def create_settings_window(parent: tk.Tk, on_save_callback=None):
     hardware_config = config.get('hardware', {})
     kokoro_execution_provider_var = tk.StringVar(window, value=hardware_config.get('kokoro_execution_provider', 'CPU'))
     whisper_execution_provider_var = tk.StringVar(window, value=hardware_config.get('whisper_execution_provider', 'CPU'))
+    transcription_backend_var = tk.StringVar(window, value=config.get('transcription', {}).get('backend', 'auto'))
+    incremental_transcription_var = tk.BooleanVar(window, value=config.get('transcription', {}).get('incremental', False))
+    whisper_model_var = tk.StringVar(window, value=config.get('whisper_model', 'base'))
+    draft_model_var = tk.StringVar(window, value=config.get('transcription', {}).get('draft_model', 'tiny'))
+    two_pass_actions = config.get('transcription', {}).get('two_pass_actions', {})
+    two_pass_action_vars = {action: tk.BooleanVar(window, value=two_pass_actions.get(action, False))
+                            for action in ("toggle_dictation", "ai_dictation", "voice_conversation")}
 
     audio_config = config.get('audio', {})
     initial_output_device_desc = output_index_map.get(audio_config.get('output_device_index'))
     speaker_desc_var = tk.StringVar(window, value=initial_output_device_desc)
     speak_transcription_var = tk.BooleanVar(window, value=audio_config.get('speak_transcription_result', True))
+    keep_input_stream_open_var = tk.BooleanVar(window, value=audio_config.get('keep_input_stream_open', False))
+    pre_roll_ms_var = tk.IntVar(window, value=audio_config.get('pre_roll_ms', 0))
+    auto_stop_silence_ms_var = tk.IntVar(window, value=audio_config.get('auto_stop_silence_ms', 0))
+    vad_config = config.get('vad', {})
+    vad_enabled_var = tk.BooleanVar(window, value=vad_config.get('enabled', True))
+    vad_threshold_var = tk.DoubleVar(window, value=vad_config.get('threshold_db', -45.0))
+    vad_max_pause_var = tk.IntVar(window, value=vad_config.get('max_pause_ms', 600))
 
     history_config = config.get('history', {})
     transcript_limit_var = tk.IntVar(window, value=history_config.get('transcript_limit', 100))
@@ -289,6 +309,12 @@ def create_settings_window(parent: tk.Tk, on_save_callback=None):
     test_button = ttk.Button(ollama_frame, text="Test Connection", command=lambda: test_ollama_connection(ollama_url_var.get()))
     test_button.grid(row=3, column=0, columnspan=3, pady=5)
 
+    ttk.Label(ollama_frame, text="Keep Model Loaded For:").grid(row=4, column=0, sticky="w", padx=5, pady=2)
+    ttk.Entry(ollama_frame, textvariable=ollama_keep_alive_var, width=10).grid(row=4, column=1, sticky="w", padx=5)
+    ttk.Label(ollama_frame, text="e.g. 30m, 2h, -1 = always").grid(row=4, column=2, sticky="w", padx=5)
+    ttk.Checkbutton(ollama_frame, text="Load the model at startup", variable=ollama_warm_up_var).grid(row=5, column=0, columnspan=3, sticky="w", padx=5)
+    ttk.Checkbutton(ollama_frame, text="Keep the model loaded while I'm using VibeType", variable=ollama_rewarm_var).grid(row=6, column=0, columnspan=3, sticky="w", padx=5)
+
     ai_modes_frame = ttk.LabelFrame(tabs["🤖 AI"], text="AI Modes", padding="10")
     ai_modes_frame.grid(row=1, column=0, columnspan=2, sticky="ew", pady=5)
     ai_modes_frame.columnconfigure(0, weight=1)
@@ -324,6 +350,7 @@ def create_settings_window(parent: tk.Tk, on_save_callback=None):
     ai_output_frame.grid(row=2, column=0, columnspan=2, sticky="ew", pady=5)
     ai_output_frame.columnconfigure(0, weight=1)
     ttk.Checkbutton(ai_output_frame, text="Automatically speak AI responses", variable=ai_speak_response_var).pack(anchor="w")
+    ttk.Checkbutton(ai_output_frame, text="Stream responses (start speaking after the first sentence)", variable=ai_stream_response_var).pack(anchor="w")
 
     output_hooks_frame = ttk.LabelFrame(tabs["🤖 AI"], text="Output Hooks (Webhook)", padding="10")
     output_hooks_frame.grid(row=3, column=0, columnspan=2, sticky="ew", pady=5)
@@ -685,6 +712,78 @@ def create_settings_window(parent: tk.Tk, on_save_callback=None):
     ttk.OptionMenu(hardware_frame, kokoro_execution_provider_var, kokoro_execution_provider_var.get(), "CPU", "CUDA").grid(row=0, column=1, sticky="ew", padx=5)
     ttk.Label(hardware_frame, text="Whisper:").grid(row=1, column=0, sticky="w", padx=5, pady=2)
     ttk.OptionMenu(hardware_frame, whisper_execution_provider_var, whisper_execution_provider_var.get(), "CPU", "GPU").grid(row=1, column=1, sticky="ew", padx=5)
+    ttk.Label(hardware_frame, text="Whisper Backend:").grid(row=2, column=0, sticky="w", padx=5, pady=2)
+    ttk.OptionMenu(hardware_frame, transcription_backend_var, transcription_backend_var.get(), "auto", "in_process", "server", "subprocess").grid(row=2, column=1, sticky="ew", padx=5)
+    ttk.Checkbutton(hardware_frame, text="Transcribe while recording (long dictations finish faster)", variable=incremental_transcription_var).grid(row=3, column=0, columnspan=2, sticky="w", padx=5, pady=(5, 0))
+
+    tuning_status_var = tk.StringVar(window, value="")
+    def run_whisper_tuning():
+        model_name = whisper_model_var.get()
+        tune_button.config(state="disabled")
+        def report(message):
+            window.after(0, lambda: tuning_status_var.set(message))
+        def apply_tuning(tuning):
+            # Runs on the Tk thread. Keeps the window's copy in sync so saving the settings doesn't drop the result.
+            tune_button.config(state="normal")
+            config.setdefault('transcription', {}).setdefault('tuning', {})[model_name] = tuning
+            if tuning['beam_size'] > 1:
+                long_mode = f"beam search on {tuning['beam_threads']} threads"
+            else:
+                long_mode = "greedy"
+            tuning_status_var.set(f"{model_name}: {tuning['greedy_threads']} threads, {long_mode} for long utterances (RTF {tuning['greedy_rtf']}).")
+        def task():
+            try:
+                tuning = whisper_benchmark.tune(model_name, progress_callback=report)
+                window.after(0, lambda: apply_tuning(tuning))
+            except Exception as e:
+                report(f"Tuning failed: {e}")
+                window.after(0, lambda: tune_button.config(state="normal"))
+        threading.Thread(target=task, daemon=True).start()
+    tune_button = ttk.Button(hardware_frame, text="Tune Whisper for This PC", command=run_whisper_tuning)
+    tune_button.grid(row=4, column=0, sticky="w", padx=5, pady=(5, 0))
+    ttk.Label(hardware_frame, textvariable=tuning_status_var).grid(row=4, column=1, sticky="w", padx=5, pady=(5, 0))
+
+    whisper_models_frame = ttk.LabelFrame(tabs["🛠️ Hardware"], text="Whisper Model", padding="10")
+    whisper_models_frame.grid(row=1, column=0, columnspan=2, sticky="ew", pady=5)
+    whisper_models_frame.columnconfigure(1, weight=1)
+    installed_whisper_models = whisper_benchmark.find_models() or [whisper_model_var.get()]
+    ttk.Label(whisper_models_frame, text="Model:").grid(row=0, column=0, sticky="w", padx=5, pady=2)
+    ttk.OptionMenu(whisper_models_frame, whisper_model_var, whisper_model_var.get(), *installed_whisper_models).grid(row=0, column=1, sticky="ew", padx=5)
+
+    model_benchmark_status_var = tk.StringVar(window, value="")
+    def run_model_benchmark():
+        benchmark_button.config(state="disabled")
+        def report(message):
+            window.after(0, lambda: model_benchmark_status_var.set(message))
+        def offer_best_model(results, results_path):
+            benchmark_button.config(state="normal")
+            best = whisper_benchmark.select_model(results)
+            summary = "\n".join(
+                f"{r['model']}: RTF {r['rtf']}, load {r['load_ms']} ms, {r['peak_rss_mb']} MB, WER {r['wer']}"
+                if 'error' not in r else f"{r['model']}: {r['error']}" for r in results)
+            if best is None:
+                messagebox.showinfo("Model Benchmark", f"{summary}\n\nNo model met the WER threshold.\nResults: {results_path}", parent=window)
+            elif messagebox.askyesno("Model Benchmark", f"{summary}\n\nFastest model within the WER threshold: {best}. Use it?\nResults: {results_path}", parent=window):
+                whisper_model_var.set(best)
+        def task():
+            try:
+                results, results_path = whisper_benchmark.benchmark_models(progress_callback=report)
+                report(f"Results saved to {results_path}")
+                window.after(0, lambda: offer_best_model(results, results_path))
+            except Exception as e:
+                report(f"Benchmark failed: {e}")
+                window.after(0, lambda: benchmark_button.config(state="normal"))
+        threading.Thread(target=task, daemon=True).start()
+    benchmark_button = ttk.Button(whisper_models_frame, text="Benchmark Installed Models", command=run_model_benchmark)
+    benchmark_button.grid(row=1, column=0, sticky="w", padx=5, pady=(5, 0))
+    ttk.Label(whisper_models_frame, textvariable=model_benchmark_status_var).grid(row=1, column=1, sticky="w", padx=5, pady=(5, 0))
+
+    ttk.Label(whisper_models_frame, text="Draft Model:").grid(row=2, column=0, sticky="w", padx=5, pady=(10, 2))
+    ttk.OptionMenu(whisper_models_frame, draft_model_var, draft_model_var.get(), *installed_whisper_models).grid(row=2, column=1, sticky="ew", padx=5, pady=(10, 2))
+    ttk.Label(whisper_models_frame, text="Use a fast draft, then refine with the model above, for:").grid(row=3, column=0, columnspan=2, sticky="w", padx=5, pady=(5, 0))
+    two_pass_labels = {"toggle_dictation": "Dictation", "ai_dictation": "AI Dictation", "voice_conversation": "Voice Conversation"}
+    for row, (action, var) in enumerate(two_pass_action_vars.items(), start=4):
+        ttk.Checkbutton(whisper_models_frame, text=two_pass_labels[action], variable=var).grid(row=row, column=0, columnspan=2, sticky="w", padx=20)
 
     # --- Audio I/O Tab ---
     audio_io_frame = ttk.Frame(tabs["🎤 Audio I/O"], padding="10")
@@ -694,7 +793,24 @@ def create_settings_window(parent: tk.Tk, on_save_callback=None):
     speaker_frame.grid(row=0, column=0, columnspan=2, sticky="ew", pady=5)
     speaker_frame.columnconfigure(1, weight=1)
     ttk.Label(speaker_frame, text="Output Device:").grid(row=0, column=0, sticky="w", padx=5, pady=2)
-    ttk.OptionMenu(speaker_frame, speaker_desc_var, initial_output_device_desc or "Select a device", *(output_device_map.keys())).grid(row=0, column=1, sticky="ew", padx=5)
+    speaker_menu = ttk.OptionMenu(speaker_frame, speaker_desc_var, initial_output_device_desc or "Select a device", *(output_device_map.keys()))
+    speaker_menu.grid(row=0, column=1, sticky="ew", padx=5)
+
+    def rescan_speaker_menu():
+        devices = rescan_output_devices()
+        output_device_map.clear()
+        output_device_map.update(devices)
+        output_index_map.clear()
+        output_index_map.update({index: name for name, index in devices.items()})
+
+        menu = speaker_menu["menu"]
+        menu.delete(0, "end")
+        for name in output_device_map:
+            menu.add_command(label=name, command=lambda n=name: speaker_desc_var.set(n))
+        if speaker_desc_var.get() not in output_device_map:
+            speaker_desc_var.set("Select a device")
+
+    ttk.Button(speaker_frame, text="🔄 Rescan Devices", command=rescan_speaker_menu).grid(row=1, column=0, sticky="w", padx=5, pady=5)
     ttk.Button(speaker_frame, text="🔊 Test Speaker", command=lambda: play_test_sound(device_index=get_selected_device_index())).grid(row=1, column=1, sticky="e", padx=5, pady=5)
 
     tts_provider_frame = ttk.LabelFrame(audio_io_frame, text="TTS Provider", padding="10")
@@ -707,6 +823,20 @@ def create_settings_window(parent: tk.Tk, on_save_callback=None):
     tts_behavior_frame.grid(row=2, column=0, columnspan=2, sticky="ew", pady=5)
     ttk.Checkbutton(tts_behavior_frame, text="Automatically speak transcription result", variable=speak_transcription_var).pack(anchor="w")
 
+    microphone_frame = ttk.LabelFrame(audio_io_frame, text="Microphone", padding="10")
+    microphone_frame.grid(row=3, column=0, columnspan=2, sticky="ew", pady=5)
+    microphone_frame.columnconfigure(1, weight=1)
+    ttk.Checkbutton(microphone_frame, text="Keep microphone stream open (faster dictation start)", variable=keep_input_stream_open_var).grid(row=0, column=0, columnspan=2, sticky="w")
+    ttk.Label(microphone_frame, text="Pre-roll (ms, 0 to disable):").grid(row=1, column=0, sticky="w", padx=5, pady=2)
+    ttk.Entry(microphone_frame, textvariable=pre_roll_ms_var, width=10).grid(row=1, column=1, sticky="w", padx=5)
+    ttk.Label(microphone_frame, text="Auto-stop after silence (ms, 0 to disable):").grid(row=5, column=0, sticky="w", padx=5, pady=2)
+    ttk.Entry(microphone_frame, textvariable=auto_stop_silence_ms_var, width=10).grid(row=5, column=1, sticky="w", padx=5)
+    ttk.Checkbutton(microphone_frame, text="Trim silence before transcription", variable=vad_enabled_var).grid(row=2, column=0, columnspan=2, sticky="w", pady=(5, 0))
+    ttk.Label(microphone_frame, text="Silence threshold (dBFS):").grid(row=3, column=0, sticky="w", padx=5, pady=2)
+    ttk.Entry(microphone_frame, textvariable=vad_threshold_var, width=10).grid(row=3, column=1, sticky="w", padx=5)
+    ttk.Label(microphone_frame, text="Longest kept pause (ms):").grid(row=4, column=0, sticky="w", padx=5, pady=2)
+    ttk.Entry(microphone_frame, textvariable=vad_max_pause_var, width=10).grid(row=4, column=1, sticky="w", padx=5)
+
     # --- Model Management Tab ---
     piper_models_frame = ttk.LabelFrame(tabs["📦 Models"], text="Piper TTS Models", padding="10")
     piper_models_frame.grid(row=0, column=0, columnspan=2, sticky="ew", pady=5)
@@ -765,6 +895,11 @@ def create_settings_window(parent: tk.Tk, on_save_callback=None):
 
     # --- Save and Cancel Buttons ---
     def on_save():
+        keep_alive = ollama_keep_alive_var.get().strip() or '30m'
+        if normalize_keep_alive(keep_alive) is None:
+            messagebox.showerror("Invalid Setting", f"'{keep_alive}' is not a valid time to keep the Ollama model loaded.\nUse seconds (300, -1 = always) or a duration (30m, 2h, 1h30m).", parent=window)
+            return
+
         config['theme'] = theme_var.get()
         config['enable_text_injection'] = enable_text_injection_var.get()
         
@@ -777,7 +912,11 @@ def create_settings_window(parent: tk.Tk, on_save_callback=None):
         ollama_config_save['enabled'] = ollama_enabled_var.get()
         ollama_config_save['api_url'] = ollama_url_var.get()
         ollama_config_save['model'] = ollama_model_var.get()
+        ollama_config_save['keep_alive'] = keep_alive
+        ollama_config_save['warm_up'] = ollama_warm_up_var.get()
+        ollama_config_save['rewarm_when_active'] = ollama_rewarm_var.get()
         ollama_config_save['speak_response'] = ai_speak_response_var.get()
+        ollama_config_save['stream_response'] = ai_stream_response_var.get()
         ollama_config_save['webhook_enabled'] = webhook_enabled_var.get()
         ollama_config_save['webhook_url'] = webhook_url_var.get()
         
@@ -821,8 +960,19 @@ def create_settings_window(parent: tk.Tk, on_save_callback=None):
         config.setdefault('tts_providers', {}).setdefault('Piper TTS', {})['length_scale'] = piper_length_scale_var.get()
         config.setdefault('hardware', {})['kokoro_execution_provider'] = kokoro_execution_provider_var.get()
         config.setdefault('hardware', {})['whisper_execution_provider'] = whisper_execution_provider_var.get()
+        config.setdefault('transcription', {})['backend'] = transcription_backend_var.get()
+        config['transcription']['incremental'] = incremental_transcription_var.get()
+        config['transcription']['draft_model'] = draft_model_var.get()
+        config['transcription']['two_pass_actions'] = {action: var.get() for action, var in two_pass_action_vars.items()}
+        config['whisper_model'] = whisper_model_var.get()
         config.setdefault('audio', {})['output_device_index'] = get_selected_device_index()
         config.setdefault('audio', {})['speak_transcription_result'] = speak_transcription_var.get()
+        config.setdefault('audio', {})['keep_input_stream_open'] = keep_input_stream_open_var.get()
+        config.setdefault('audio', {})['pre_roll_ms'] = pre_roll_ms_var.get()
+        config.setdefault('audio', {})['auto_stop_silence_ms'] = auto_stop_silence_ms_var.get()
+        config.setdefault('vad', {})['enabled'] = vad_enabled_var.get()
+        config['vad']['threshold_db'] = vad_threshold_var.get()
+        config['vad']['max_pause_ms'] = vad_max_pause_var.get()
         config.setdefault('history', {})['transcript_limit'] = transcript_limit_var.get()
         config.setdefault('user_experience', {})['show_status_overlay'] = show_status_overlay_var.get()
         
@@ -2,14 +2,14 @@
 
 import sv_ttk
 import tkinter as tk
-from core.config_manager import load_config
+from core.config_manager import get_config
 
 def apply_theme(root: tk.Tk):
     """
     Applies the application theme based on the user's configuration.
     The provided tk.Tk() root window will be themed.
     """
-    config = load_config()
+    config = get_config()
     theme = config.get("theme", "System")
 
     print(f"Applying theme: {theme}")
@@ -9,10 +9,13 @@ import queue
 import webbrowser
 
 # Import from core
-from core.config_manager import load_config, save_config
+from core.config_manager import get_config, load_config, save_config, flush_config
 import gui.settings_window
 from gui.status_overlay import StatusOverlay
 from core.app_state import register_status_callback, register_command_queue
+import core.audio_capture
+import core.transcription
+import core.http_client
 
 class TrayApplication:
     """Manages the system tray icon and application lifecycle in a stable, multi-threaded way."""
@@ -43,7 +46,7 @@ class TrayApplication:
         register_command_queue(self.command_queue)
 
     def _load_state_from_config(self):
-        config = load_config()
+        config = get_config()
         self.ai_mode = config.get('ai_mode', 'Assistant')
         self.show_overlay = config.get('user_experience', {}).get('show_status_overlay', True)
 
@@ -85,6 +88,10 @@ class TrayApplication:
 
     def _shutdown(self):
         print("Shutdown command received. Stopping services...")
+        flush_config()
+        core.audio_capture.shutdown()
+        core.transcription.shutdown()
+        core.http_client.close()
         if self.tray_icon:
             self.tray_icon.stop()
         if self.status_overlay:
@@ -3,7 +3,7 @@
 
 print("RUNNING KOKORO_TTS.PY, TRUE LANGUAGE-AWARE CHUNKING VERSION")
 
-import json, os, re, threading, requests, numpy as np, onnxruntime as ort, sounddevice as sd
+import json, os, re, threading, numpy as np, onnxruntime as ort, sounddevice as sd
 from typing import List, Dict, Union, Optional, Generator
 from kokoro_onnx import Kokoro
 from misaki import en, ja, espeak, zh
@@ -11,6 +11,7 @@ from pathlib import Path
 from queue import Queue
 from tqdm import tqdm
 from langdetect import detect, LangDetectException
+from core import http_client
 import logging
 
 # --- Setup logging ---
@@ -85,7 +86,8 @@ class KokoroTTS:
 
     def _download_file(self, url: str, dest: Path):
         try:
-            with requests.get(url, stream=True) as r:
+            # Shared pooled client; the timeout applies between chunks, not to the whole download.
+            with http_client.get(url, stream=True) as r:
                 r.raise_for_status()
                 total_size = int(r.headers.get('content-length', 0))
                 with open(dest, 'wb') as f, tqdm(total=total_size, unit='iB', unit_scale=True, desc=dest.name) as bar:
@@ -224,6 +226,8 @@ class KokoroTTS:
                         audio_queue.put(audio_chunk)
             audio_queue.put(None)
 
+        playback_errors = []
+
         def consumer():
             try:
                 with sd.OutputStream(samplerate=SAMPLE_RATE, device=device_index, channels=1, dtype='float32') as stream:
@@ -232,11 +236,17 @@ class KokoroTTS:
                         chunk = audio_queue.get()
                         if chunk is None: break
                         stream.write(chunk)
-            except Exception as e: logger.error(f"Audio playback error: {e}")
+            except Exception as e:
+                logger.error(f"Audio playback error: {e}")
+                playback_errors.append(e)
+                # Keep draining so the producer isn't blocked on a full queue.
+                while audio_queue.get() is not None: pass
 
         threads = [threading.Thread(target=producer, daemon=True), threading.Thread(target=consumer, daemon=True)]
         for t in threads: t.start()
         for t in threads: t.join()
+        # Re-raised so the caller can react to a failing output device.
+        if playback_errors: raise playback_errors[0]
 
     # --- MEMORY SYNTHESIS ---
     def synthesize_to_memory(self, text: str, language_name: str, voice_or_embedding: Union[str, np.ndarray], speed: float = 1.0) -> np.ndarray:
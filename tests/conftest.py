@@ -0,0 +1,23 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from unittest.mock import MagicMock
+
+# Runs before any test module is imported.
+#
+# The audio and input stacks (PortAudio, global keyboard/mouse hooks and the
+# clipboard) aren't usable on test machines, so they are stubbed once for the
+# whole session. The constants audio_capture compares against keep their
+# PortAudio values.
+mock_pyaudio = MagicMock(paInt16=8, paContinue=0, paInputOverflow=2)
+for name, module in (('pyaudio', mock_pyaudio), ('pynput', MagicMock()), ('pynput.keyboard', MagicMock()),
+                     ('pynput.mouse', MagicMock()), ('pyperclip', MagicMock())):
+    sys.modules[name] = module
+
+# config.json, the encryption key and anything else written under ~/.VibeType
+# go to a throwaway home directory instead of the user's.
+_home = tempfile.mkdtemp(prefix="vibetype-tests-")
+atexit.register(shutil.rmtree, _home, ignore_errors=True)
+os.environ['HOME'] = os.environ['USERPROFILE'] = _home
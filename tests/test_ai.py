@@ -0,0 +1,91 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+import core.ai as ai
+
+OLLAMA_CONFIG = {'ai_providers': {'Ollama': {
+    'enabled': True, 'api_url': 'http://localhost:11434', 'model': 'llama3', 'keep_alive': '1h', 'stream_response': False}}}
+
+class TestModelResidency(unittest.TestCase):
+
+    def test_keep_alive_normalization(self):
+        # Ollama parses strings as Go durations, so plain numbers must be sent as numbers.
+        self.assertEqual(ai.normalize_keep_alive("-1"), -1)
+        self.assertEqual(ai.normalize_keep_alive("300"), 300)
+        self.assertEqual(ai.normalize_keep_alive("30m"), "30m")
+        self.assertEqual(ai.normalize_keep_alive("1h30m"), "1h30m")
+        self.assertIsNone(ai.normalize_keep_alive("soon"))
+        self.assertIsNone(ai.normalize_keep_alive("30 minutes"))
+
+    def test_keep_alive_seconds(self):
+        self.assertEqual(ai._keep_alive_seconds("30m"), 1800)
+        self.assertEqual(ai._keep_alive_seconds("1h30m"), 5400)
+        self.assertEqual(ai._keep_alive_seconds(300), 300)
+        self.assertIsNone(ai._keep_alive_seconds(-1))
+        self.assertIsNone(ai._keep_alive_seconds("-5m"))
+
+    def test_invalid_keep_alive_falls_back_to_default(self):
+        self.assertEqual(ai._get_keep_alive({'keep_alive': 'soon'}), ai.DEFAULT_KEEP_ALIVE)
+
+    def test_warm_up_loads_model_with_keep_alive(self):
+        with patch.object(ai, 'get_config', return_value=OLLAMA_CONFIG), \
+                patch.object(ai.http_client, 'post') as mock_post:
+            ai._warm_model()
+        payload = mock_post.call_args.kwargs["json"]
+        self.assertEqual(payload, {"model": "llama3", "prompt": "", "keep_alive": "1h"})
+        self.assertIsNotNone(ai._last_request_time)
+
+    def test_keep_alive_minus_one_is_sent_as_a_number(self):
+        config = {'ai_providers': {'Ollama': dict(OLLAMA_CONFIG['ai_providers']['Ollama'], keep_alive='-1')}}
+        with patch.object(ai, 'get_config', return_value=config), \
+                patch.object(ai.http_client, 'post') as mock_post:
+            ai._warm_model()
+        self.assertEqual(mock_post.call_args.kwargs["json"]["keep_alive"], -1)
+
+    def test_requests_send_keep_alive(self):
+        response = MagicMock()
+        response.json.return_value = {"response": "Hi."}
+        with patch.object(ai, 'get_config', return_value=OLLAMA_CONFIG), \
+                patch.object(ai.http_client, 'post', return_value=response) as mock_post, \
+                patch.object(ai, 'post_to_webhook'):
+            self.assertEqual(ai.get_ai_response("hello", "Chat"), "Hi.")
+        self.assertEqual(mock_post.call_args.kwargs["json"]["keep_alive"], "1h")
+
+    def test_model_change_loads_the_model(self):
+        with patch.object(ai.threading, 'Thread') as mock_thread:
+            ai._on_ollama_config_changed({'prompts.Chat': 'new prompt'})
+            mock_thread.assert_not_called()
+            ai._on_ollama_config_changed({'model': 'mistral'})
+        # Straight to _warm_model(): the startup-only warm_up setting doesn't apply here.
+        self.assertIs(mock_thread.call_args.kwargs["target"], ai._warm_model)
+        mock_thread.return_value.start.assert_called_once()
+
+    def _rewarm(self, keep_alive, idle_seconds):
+        config = {'ai_providers': {'Ollama': dict(OLLAMA_CONFIG['ai_providers']['Ollama'],
+                                                  keep_alive=keep_alive, rewarm_when_active=True)}}
+        now = ai.time.monotonic()
+        with patch.object(ai, 'get_config', return_value=config), \
+                patch.object(ai, '_last_request_time', now - idle_seconds), \
+                patch.object(ai, '_last_activity_time', now), \
+                patch.object(ai.http_client, 'post') as mock_post:
+            ai._rewarm_if_expiring()
+        return mock_post.call_count
+
+    def test_rewarm_before_keep_alive_runs_out(self):
+        self.assertEqual(self._rewarm("10m", idle_seconds=560), 1)
+        self.assertEqual(self._rewarm("10m", idle_seconds=60), 0)
+
+    def test_short_keep_alive_is_not_rewarmed(self):
+        self.assertEqual(self._rewarm(0, idle_seconds=0), 0)
+        self.assertEqual(self._rewarm("30s", idle_seconds=30), 0)
+        self.assertEqual(self._rewarm(-1, idle_seconds=3600), 0)
+
+    def test_keep_alive_zero_is_not_warmed(self):
+        config = {'ai_providers': {'Ollama': dict(OLLAMA_CONFIG['ai_providers']['Ollama'], keep_alive='0')}}
+        with patch.object(ai, 'get_config', return_value=config), \
+                patch.object(ai.http_client, 'post') as mock_post:
+            ai._warm_model()
+        mock_post.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
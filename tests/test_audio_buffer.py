@@ -0,0 +1,55 @@
+import os
+import unittest
+import numpy as np
+
+from core.audio_buffer import PcmBuffer, RingBuffer, read_wav_file, release_recording
+
+class TestPcmBuffer(unittest.TestCase):
+
+    def test_appends_grow_in_memory_buffer(self):
+        buffer = PcmBuffer(sample_rate=16000, initial_seconds=0.001)
+        chunks = [np.arange(i * 100, (i + 1) * 100, dtype=np.int16) for i in range(50)]
+        for chunk in chunks:
+            buffer.append(chunk.tobytes())
+
+        recording = buffer.finalize()
+        self.assertIsInstance(recording, np.ndarray)
+        np.testing.assert_array_equal(recording, np.concatenate(chunks))
+        self.assertAlmostEqual(buffer.duration_seconds, 5000 / 16000)
+
+    def test_spills_to_temp_wav_past_limit(self):
+        buffer = PcmBuffer(sample_rate=16000, max_in_memory_bytes=1000)
+        samples = np.arange(2000, dtype=np.int16)
+        for chunk in np.split(samples, 10):
+            buffer.append(chunk)
+
+        recording = buffer.finalize()
+        try:
+            self.assertIsInstance(recording, str)
+            read_back, sample_rate = read_wav_file(recording)
+            self.assertEqual(sample_rate, 16000)
+            np.testing.assert_array_equal(read_back, samples)
+        finally:
+            release_recording(recording)
+        self.assertFalse(os.path.exists(recording))
+
+class TestRingBuffer(unittest.TestCase):
+
+    def test_keeps_most_recent_samples_in_order(self):
+        ring = RingBuffer(5)
+        ring.append(np.array([1, 2, 3], dtype=np.int16))
+        np.testing.assert_array_equal(ring.get(), [1, 2, 3])
+        ring.append(np.array([4, 5, 6, 7], dtype=np.int16).tobytes())
+        np.testing.assert_array_equal(ring.get(), [3, 4, 5, 6, 7])
+        ring.append(np.arange(10, 22, dtype=np.int16))
+        np.testing.assert_array_equal(ring.get(), [17, 18, 19, 20, 21])
+
+    def test_clear(self):
+        ring = RingBuffer(4)
+        ring.append(np.array([1, 2], dtype=np.int16))
+        ring.clear()
+        self.assertEqual(len(ring), 0)
+        self.assertEqual(ring.get().size, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import queue
+import unittest
+
+import core.audio_capture as audio_capture
+
+class TestStreamCallback(unittest.TestCase):
+
+    def setUp(self):
+        audio_capture.reset_capture_stats()
+
+    def tearDown(self):
+        audio_capture.reset_capture_stats()
+
+    def test_callback_queues_frames_and_counts_overflows(self):
+        frame_queue = queue.SimpleQueue()
+        callback = audio_capture._make_stream_callback(frame_queue, 16000)
+
+        self.assertEqual(callback(b'\x01\x00' * 1024, 1024, {'input_buffer_adc_time': 1.0}, 0), (None, 0))
+        callback(b'\x02\x00' * 1024, 1024, {'input_buffer_adc_time': 1.064}, 2)
+
+        self.assertEqual(frame_queue.get_nowait(), b'\x01\x00' * 1024)
+        self.assertEqual(frame_queue.get_nowait(), b'\x02\x00' * 1024)
+        stats = audio_capture.get_capture_stats()
+        self.assertEqual(stats['callbacks'], 2)
+        self.assertEqual(stats['frames'], 2048)
+        self.assertEqual(stats['overflows'], 1)
+        self.assertEqual(stats['dropped_frames'], 0)
+
+    def test_gap_in_adc_timeline_counts_dropped_frames(self):
+        frame_queue = queue.SimpleQueue()
+        callback = audio_capture._make_stream_callback(frame_queue, 16000)
+
+        callback(b'\x00\x00' * 1024, 1024, {'input_buffer_adc_time': 1.0}, 0)
+        # One whole chunk (64 ms) is missing between these callbacks.
+        callback(b'\x00\x00' * 1024, 1024, {'input_buffer_adc_time': 1.128}, 0)
+
+        self.assertEqual(audio_capture.get_capture_stats()['dropped_frames'], 1024)
+
+if __name__ == '__main__':
+    unittest.main()
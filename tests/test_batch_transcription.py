@@ -0,0 +1,98 @@
+import json
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+import numpy as np
+
+from core.audio_buffer import pcm_to_wav_bytes
+import core.batch_transcription as batch_transcription
+import core.transcription as transcription
+
+def _write_wav(path, seconds=1.0, rate=16000):
+    samples = (np.sin(np.arange(int(rate * seconds)) / 5) * 8000).astype(np.int16)
+    with open(path, 'wb') as f:
+        f.write(pcm_to_wav_bytes(samples, rate))
+
+class TestBatchTranscription(unittest.TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._temp_dir.cleanup)
+        self.dir = self._temp_dir.name
+
+    def test_find_audio_files_searches_directories_recursively(self):
+        os.makedirs(os.path.join(self.dir, "sub"))
+        for name in ("b.wav", os.path.join("sub", "a.wav"), "notes.txt"):
+            open(os.path.join(self.dir, name), 'wb').close()
+        files = batch_transcription.find_audio_files(self.dir)
+        self.assertEqual([os.path.relpath(f, self.dir) for f in files], ["b.wav", os.path.join("sub", "a.wav")])
+
+    def test_files_in_manifest_for_the_same_model_are_skipped(self):
+        path = os.path.join(self.dir, "done.wav")
+        _write_wav(path)
+        manifest_path = os.path.join(self.dir, "manifest.json")
+        batch_transcription.save_manifest(manifest_path, {
+            batch_transcription.file_hash(path): {"file": path, "model": "base", "text": "hello"}})
+
+        with patch.object(batch_transcription, 'get_config', return_value={'whisper_model': 'base'}), \
+                patch.object(batch_transcription, 'ProcessPoolExecutor') as mock_pool:
+            mock_pool.return_value.__enter__.return_value.submit.side_effect = AssertionError("nothing to transcribe")
+            stats = batch_transcription.transcribe_files([path], os.path.join(self.dir, "out.jsonl"))
+        self.assertEqual((stats["files"], stats["skipped"]), (0, 1))
+
+    def test_worker_transcribes_a_file(self):
+        path = os.path.join(self.dir, "speech.wav")
+        _write_wav(path, seconds=2.0, rate=8000)
+        backend = MagicMock()
+        backend.transcribe.return_value = "hello there"
+        with patch.object(batch_transcription, '_worker_backend', backend), \
+                patch.object(batch_transcription, '_worker_config', ('base', 'CPU', 2)):
+            result = batch_transcription._transcribe_file(path)
+        self.assertEqual(result["text"], "hello there")
+        self.assertIsNone(result["error"])
+        self.assertAlmostEqual(result["duration_seconds"], 2.0, places=2)
+        self.assertEqual(backend.transcribe.call_args.args[3]["threads"], 2)
+
+    def test_text_output_mirrors_the_input_tree(self):
+        paths = [os.path.join(self.dir, "in", folder, "x.wav") for folder in ("a", "b")]
+        for seconds, path in enumerate(paths, start=1):
+            os.makedirs(os.path.dirname(path))
+            _write_wav(path, seconds=seconds) # different content, so different manifest entries
+        backend = MagicMock()
+        backend.transcribe.side_effect = ["from a", "from b"]
+        output = os.path.join(self.dir, "out")
+
+        # Worker state is shared by threads, so a thread pool stands in for the process pool.
+        with patch.object(batch_transcription, 'get_config', return_value={'whisper_model': 'base'}), \
+                patch.object(batch_transcription, 'ProcessPoolExecutor', ThreadPoolExecutor), \
+                patch.object(batch_transcription, '_init_worker'), \
+                patch.object(batch_transcription, '_worker_backend', backend), \
+                patch.object(batch_transcription, '_worker_config', ('base', 'CPU', 1)), \
+                patch.object(batch_transcription, 'save_manifest') as mock_save:
+            stats = batch_transcription.transcribe_files(paths, output, "text", workers=1)
+
+        self.assertEqual(stats["files"], 2)
+        for folder, text in (("a", "from a"), ("b", "from b")):
+            with open(os.path.join(output, folder, "x.txt"), encoding='utf-8') as f:
+                self.assertEqual(f.read().strip(), text)
+        mock_save.assert_called_once() # batched, not rewritten after every file
+        self.assertEqual(len(mock_save.call_args.args[1]), 2)
+
+    def test_worker_keeps_the_model_resident_with_the_first_backend_that_loads_it(self):
+        in_process, server = MagicMock(), MagicMock()
+        in_process.load.return_value = False # pywhispercpp not installed
+        server.name = transcription.ServerBackend.name
+        server.load.return_value = True
+        with patch.object(transcription, 'get_backends', return_value=[in_process, server]), \
+                patch.object(batch_transcription.util, 'Finalize') as mock_finalize, \
+                patch.object(batch_transcription, '_worker_backend', None), \
+                patch.object(batch_transcription, '_worker_config', None):
+            batch_transcription._init_worker('base', 'CPU', 2)
+            self.assertIs(batch_transcription._worker_backend, server)
+        server.load.assert_called_once_with('base', 'CPU', 2)
+        mock_finalize.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import core.config_manager as config_manager
+import core.encryption as encryption
+
+class TestConfigSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config_path = os.path.join(self.temp_dir.name, "config.json")
+        with open(self.config_path, 'w') as f:
+            json.dump({"theme": "Dark", "input_device_index": 3}, f)
+
+        self.path_patcher = patch.object(config_manager, 'get_config_path', return_value=self.config_path)
+        self.path_patcher.start()
+        config_manager.invalidate_config_cache()
+
+    def tearDown(self):
+        config_manager.invalidate_config_cache()
+        self.path_patcher.stop()
+        self.temp_dir.cleanup()
+
+    def test_snapshot_is_reused_until_file_changes(self):
+        with patch.object(config_manager, '_read_config_from_disk', wraps=config_manager._read_config_from_disk) as mock_read:
+            first = config_manager.get_config()
+            second = config_manager.get_config()
+            self.assertIs(first, second)
+            self.assertEqual(mock_read.call_count, 1)
+
+            # Simulate an external edit with a different size and mtime
+            with open(self.config_path, 'w') as f:
+                json.dump({"theme": "Light", "input_device_index": 3, "language": "fr"}, f)
+            os.utime(self.config_path, ns=(0, 1))
+
+            third = config_manager.get_config()
+            self.assertEqual(mock_read.call_count, 2)
+            self.assertEqual(third['theme'], 'Light')
+
+    def test_view_is_read_only(self):
+        config = config_manager.get_config()
+        with self.assertRaises(TypeError):
+            config['theme'] = 'Light'
+        with self.assertRaises(TypeError):
+            config['privacy']['local_only_mode'] = True
+
+    def test_load_config_returns_independent_copy(self):
+        config = config_manager.load_config()
+        config['theme'] = 'Light'
+        self.assertEqual(config_manager.get_config()['theme'], 'Dark')
+
+    def test_save_config_updates_snapshot(self):
+        config = config_manager.load_config()
+        config['theme'] = 'Light'
+        with patch.object(config_manager, '_read_config_from_disk') as mock_read:
+            config_manager.save_config(config)
+            self.assertEqual(config_manager.get_config()['theme'], 'Light')
+            mock_read.assert_not_called()
+
+class TestConfigSubscriptions(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config_path = os.path.join(self.temp_dir.name, "config.json")
+        with open(self.config_path, 'w') as f:
+            json.dump({"input_device_index": 3}, f)
+
+        self.path_patcher = patch.object(config_manager, 'get_config_path', return_value=self.config_path)
+        self.path_patcher.start()
+        config_manager.invalidate_config_cache()
+        config_manager.get_config()
+
+    def tearDown(self):
+        config_manager.invalidate_config_cache()
+        self.path_patcher.stop()
+        self.temp_dir.cleanup()
+
+    def test_diff_config_flattens_nested_changes(self):
+        old = {"voice": "am_adam", "blend": {"weight": 1.0}, "speed": 1.0}
+        new = {"voice": "af_bella", "blend": {"weight": 0.5}, "speed": 1.0, "language": "Japanese"}
+        self.assertEqual(config_manager.diff_config(old, new), {
+            "voice": ("am_adam", "af_bella"),
+            "blend.weight": (1.0, 0.5),
+            "language": (None, "Japanese"),
+        })
+
+    def test_subscriber_only_notified_for_its_subtree(self):
+        kokoro_callback = MagicMock()
+        hardware_callback = MagicMock()
+        config_manager.subscribe('tts_providers.Kokoro TTS', kokoro_callback)
+        config_manager.subscribe('hardware', hardware_callback)
+        try:
+            config = config_manager.load_config()
+            config['tts_providers']['Kokoro TTS']['model_file'] = 'kokoro-v1.0.fp16.onnx'
+            config_manager.save_config(config)
+
+            kokoro_callback.assert_called_once_with({'model_file': ('kokoro-v1.0.int8.onnx', 'kokoro-v1.0.fp16.onnx')})
+            hardware_callback.assert_not_called()
+
+            # Saving an unchanged config notifies nobody
+            config_manager.save_config(config)
+            self.assertEqual(kokoro_callback.call_count, 1)
+        finally:
+            config_manager.unsubscribe('tts_providers.Kokoro TTS', kokoro_callback)
+            config_manager.unsubscribe('hardware', hardware_callback)
+
+class TestConfigPersistence(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config_path = os.path.join(self.temp_dir.name, "config.json")
+        with open(self.config_path, 'w') as f:
+            json.dump({"input_device_index": 3}, f)
+
+        self.path_patcher = patch.object(config_manager, 'get_config_path', return_value=self.config_path)
+        self.path_patcher.start()
+        config_manager.invalidate_config_cache()
+
+    def tearDown(self):
+        config_manager.invalidate_config_cache()
+        self.path_patcher.stop()
+        self.temp_dir.cleanup()
+
+    def _read_file(self):
+        with open(self.config_path, 'r') as f:
+            return json.load(f)
+
+    def test_rapid_saves_are_coalesced_into_one_atomic_write(self):
+        config = config_manager.load_config()
+        with patch.object(config_manager, '_write_config_atomically', wraps=config_manager._write_config_atomically) as mock_write:
+            for theme in ['Light', 'Dark', 'System', 'Light']:
+                config['theme'] = theme
+                config_manager.save_config(config)
+            mock_write.assert_not_called()
+
+            config_manager.flush_config()
+            self.assertEqual(mock_write.call_count, 1)
+
+        self.assertEqual(self._read_file()['theme'], 'Light')
+        self.assertEqual([f for f in os.listdir(self.temp_dir.name) if f.endswith('.tmp')], [])
+
+    def test_unchanged_secrets_are_not_re_encrypted(self):
+        mock_fernet = MagicMock()
+        mock_fernet.encrypt.side_effect = lambda data: b"enc:" + data
+        with patch.object(encryption, '_fernet', mock_fernet):
+            encryption.clear_cache()
+            config = config_manager.load_config()
+            config['tts_providers']['OpenAI']['api_key'] = 'sk-test'
+            config_manager.save_config(config)
+            config_manager.flush_config()
+
+            config['theme'] = 'Light'
+            config_manager.save_config(config)
+            config_manager.flush_config()
+
+        self.assertEqual(mock_fernet.encrypt.call_count, 1)
+        self.assertEqual(self._read_file()['tts_providers']['OpenAI']['api_key'], 'enc:sk-test')
+        self.assertEqual(config_manager.get_config()['tts_providers']['OpenAI']['api_key'], 'sk-test')
+        encryption.clear_cache()
+
+    def test_failed_write_is_retried(self):
+        real_write = config_manager._write_config_atomically
+        calls = []
+        def fail_once(path, config):
+            calls.append(path)
+            if len(calls) == 1:
+                raise OSError("disk full")
+            real_write(path, config)
+
+        config = config_manager.load_config()
+        config['theme'] = 'Dark'
+        with patch.object(config_manager, '_write_config_atomically', side_effect=fail_once), \
+             patch.object(config_manager, 'SAVE_DEBOUNCE_SECONDS', 0.01):
+            config_manager.save_config(config)
+            config_manager.flush_config()
+            self.assertTrue(config_manager._write_pending)
+
+            deadline = time.monotonic() + 2
+            while config_manager._write_pending and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        self.assertEqual(len(calls), 2)
+        self.assertFalse(config_manager._write_pending)
+        self.assertEqual(self._read_file()['theme'], 'Dark')
+
+        # Once the write went through, external edits are picked up again.
+        with open(self.config_path, 'w') as f:
+            json.dump({"theme": "Light"}, f)
+        os.utime(self.config_path, ns=(0, 0))
+        self.assertEqual(config_manager.get_config()['theme'], 'Light')
+
+if __name__ == '__main__':
+    unittest.main()
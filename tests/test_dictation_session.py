@@ -0,0 +1,97 @@
+import threading
+import time
+import unittest
+
+from core import dictation_session, jobs
+from core.dictation_session import DictationSession
+
+class TestDeliveryOrder(unittest.TestCase):
+
+    def _deliver(self, session, delivered, delay=0.0):
+        time.sleep(delay)
+        try:
+            with dictation_session.delivery_turn(session):
+                delivered.append(session.id)
+        except jobs.JobCancelled:
+            delivered.append(f"cancelled {session.id}")
+        finally:
+            session.complete()
+
+    def test_results_are_delivered_in_session_order(self):
+        first, second = DictationSession(False), DictationSession(False)
+        delivered = []
+        # The second session finishes its work first but has to wait for the first.
+        threads = [threading.Thread(target=self._deliver, args=(first, delivered, 0.2)),
+                   threading.Thread(target=self._deliver, args=(second, delivered))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+        self.assertEqual(delivered, [first.id, second.id])
+        self.assertFalse(dictation_session.has_pending())
+
+    def test_session_without_result_lets_later_sessions_deliver(self):
+        first, second = DictationSession(False), DictationSession(True)
+        delivered = []
+        thread = threading.Thread(target=self._deliver, args=(second, delivered))
+        thread.start()
+        first.complete() # e.g. nothing was recorded
+        thread.join(timeout=5)
+        self.assertEqual(delivered, [second.id])
+
+    def test_cancelled_session_stops_waiting_for_its_turn(self):
+        first, second = DictationSession(False), DictationSession(False)
+        delivered = []
+        thread = threading.Thread(target=self._deliver, args=(second, delivered))
+        thread.start()
+        second.job.cancel()
+        thread.join(timeout=5)
+        self.assertEqual(delivered, [f"cancelled {second.id}"])
+        first.complete()
+        self.assertFalse(dictation_session.has_pending())
+
+    def test_finished_delivery_lets_later_sessions_deliver_while_working(self):
+        first, second = DictationSession(False), DictationSession(False)
+        delivered = []
+        with dictation_session.delivery_turn(first):
+            delivered.append(first.id)
+        first.finish_delivery() # e.g. still refining its injected draft
+        self._deliver(second, delivered)
+        self.assertEqual(delivered, [first.id, second.id])
+        self.assertFalse(first.job.cancelled)
+        first.complete()
+
+    def test_action_defaults_to_dictation_kind(self):
+        session = DictationSession(True, "Chat")
+        self.addCleanup(session.complete)
+        self.assertEqual(session.action, "ai_dictation")
+
+class TestDeliveryQueue(unittest.TestCase):
+
+    def test_items_are_held_until_the_turn(self):
+        first, second = DictationSession(False), DictationSession(True)
+        self.addCleanup(second.complete)
+        delivered = []
+        queue = dictation_session.DeliveryQueue(second, delivered.append)
+        queue.put("One.")
+        queue.put("Two.")
+        self.assertEqual(delivered, []) # the first session hasn't delivered yet
+        first.complete()
+        with dictation_session.delivery_turn(second):
+            queue.join()
+            queue.put("Three.")
+        self.assertEqual(delivered, ["One.", "Two.", "Three."])
+
+    def test_cancelled_session_delivers_nothing(self):
+        first, second = DictationSession(False), DictationSession(True)
+        self.addCleanup(first.complete)
+        self.addCleanup(second.complete)
+        delivered = []
+        queue = dictation_session.DeliveryQueue(second, delivered.append)
+        queue.put("One.")
+        second.job.cancel()
+        queue.join()
+        self.assertEqual(delivered, [])
+
+if __name__ == '__main__':
+    unittest.main()
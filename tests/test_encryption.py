@@ -0,0 +1,45 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+import core.encryption as encryption
+
+class TestEncryptionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_fernet = MagicMock()
+        self.mock_fernet.encrypt.side_effect = lambda data: b"enc:" + data
+        self.mock_fernet.decrypt.side_effect = lambda data: data[len(b"enc:"):]
+        self.fernet_patcher = patch.object(encryption, '_fernet', self.mock_fernet)
+        self.fernet_patcher.start()
+        encryption.clear_cache()
+
+    def tearDown(self):
+        self.fernet_patcher.stop()
+        encryption.clear_cache()
+
+    def test_repeated_decrypt_is_memoized(self):
+        for _ in range(3):
+            self.assertEqual(encryption.decrypt("enc:secret"), "secret")
+        self.assertEqual(self.mock_fernet.decrypt.call_count, 1)
+
+    def test_decrypt_seeds_encrypt_cache(self):
+        encryption.decrypt("enc:secret")
+        self.assertEqual(encryption.encrypt("secret"), "enc:secret")
+        self.mock_fernet.encrypt.assert_not_called()
+
+    def test_key_change_invalidates_cache(self):
+        encryption.decrypt("enc:secret")
+        with patch.object(encryption, '_key_id', 'rotated'):
+            encryption.decrypt("enc:secret")
+        self.assertEqual(self.mock_fernet.decrypt.call_count, 2)
+
+    def test_cache_is_bounded(self):
+        with patch.object(encryption, 'CACHE_SIZE', 2):
+            for secret in ["a", "b", "c"]:
+                encryption.encrypt(secret)
+            self.assertEqual(len(encryption._encrypt_cache), 2)
+            encryption.encrypt("a")
+        self.assertEqual(self.mock_fernet.encrypt.call_count, 4)
+
+if __name__ == '__main__':
+    unittest.main()
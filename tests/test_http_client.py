@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import patch
+
+from core import http_client
+
+class TestHttpClient(unittest.TestCase):
+
+    def _config(self, local_only, ollama_url="http://localhost:11434"):
+        return patch.object(http_client, 'get_config', return_value={
+            'privacy': {'local_only_mode': local_only},
+            'ai_providers': {'Ollama': {'api_url': ollama_url}},
+        })
+
+    def test_local_only_mode_blocks_remote_hosts(self):
+        with self._config(True), patch.object(http_client.get_session(), 'request') as mock_request:
+            with self.assertRaises(http_client.LocalOnlyModeError):
+                http_client.post("https://example.com/hook", json={})
+            with self.assertRaises(http_client.LocalOnlyModeError):
+                http_client.get_openai_client("key")
+            http_client.get("http://localhost:11434/api/tags")
+            http_client.get("http://127.0.0.1:8080/inference")
+        self.assertEqual(mock_request.call_count, 2)
+
+    def test_local_only_mode_allows_the_configured_ollama_host(self):
+        with self._config(True, ollama_url="http://192.168.1.20:11434"), \
+             patch.object(http_client.get_session(), 'request') as mock_request:
+            http_client.post("http://192.168.1.20:11434/api/generate", json={})
+            with self.assertRaises(http_client.LocalOnlyModeError):
+                http_client.post("http://192.168.1.21:8000/hook", json={})
+        self.assertEqual(mock_request.call_count, 1)
+
+    def test_pool_limits_connections_per_host(self):
+        adapter = http_client.get_session().get_adapter("http://localhost")
+        self.assertTrue(adapter.poolmanager.connection_pool_kw["block"])
+        self.assertEqual(adapter.poolmanager.connection_pool_kw["maxsize"], http_client.POOL_CONNECTIONS_PER_HOST)
+
+    def test_requests_share_one_session_with_timeouts(self):
+        with self._config(False), patch.object(http_client.get_session(), 'request') as mock_request:
+            http_client.get("http://localhost:11434/api/tags")
+            http_client.post("https://example.com/hook", timeout=10)
+        self.assertIs(http_client.get_session(), http_client.get_session())
+        self.assertEqual(mock_request.call_args_list[0].kwargs["timeout"],
+                         (http_client.CONNECT_TIMEOUT_SECONDS, http_client.READ_TIMEOUT_SECONDS))
+        self.assertEqual(mock_request.call_args_list[1].kwargs["timeout"], (http_client.CONNECT_TIMEOUT_SECONDS, 10))
+
+    def test_local_only_error_is_a_request_exception(self):
+        # Existing handlers for requests' errors also cover blocked requests.
+        self.assertTrue(issubclass(http_client.LocalOnlyModeError, http_client.requests.exceptions.RequestException))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import subprocess
+import sys
+import threading
+import time
+import unittest
+
+from core import jobs
+
+class TestJobs(unittest.TestCase):
+
+    def test_cancel_kills_tracked_process(self):
+        job = jobs.start_job("test")
+        self.addCleanup(job.finish)
+        process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+        threading.Timer(0.2, job.cancel).start()
+
+        started = time.monotonic()
+        with self.assertRaises(jobs.JobCancelled):
+            with jobs.activate(job), jobs.track_process(process):
+                process.wait()
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertIsNotNone(process.poll())
+
+    def test_cancel_all_jobs_skips_finished_jobs(self):
+        running = jobs.start_job("running")
+        finished = jobs.start_job("finished")
+        finished.finish()
+        jobs.cancel_all_jobs()
+        self.assertTrue(running.cancelled)
+        self.assertFalse(finished.cancelled)
+
+    def test_check_cancelled_uses_the_current_job(self):
+        job = jobs.start_job("test")
+        job.cancel()
+        jobs.check_cancelled() # no current job on this thread
+        with jobs.activate(job):
+            with self.assertRaises(jobs.JobCancelled):
+                jobs.check_cancelled()
+        self.assertIsNone(jobs.current_job())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from unittest.mock import patch
+import numpy as np
+
+import core.long_audio as long_audio
+import core.transcription as transcription
+from core import jobs
+
+RATE = 16000
+
+def _speech(seconds):
+    return (np.sin(np.arange(int(RATE * seconds)) / 5) * 8000).astype(np.int16)
+
+def _pause(seconds):
+    return np.zeros(int(RATE * seconds), dtype=np.int16)
+
+class TestSplitAtSilence(unittest.TestCase):
+
+    def test_cuts_at_pause_nearest_target(self):
+        samples = np.concatenate((_speech(12), _pause(0.6), _speech(17), _pause(0.6), _speech(20)))
+        segments = long_audio.split_at_silence(samples, RATE, target_seconds=30, max_seconds=45)
+
+        self.assertEqual(len(segments), 2)
+        self.assertEqual(segments[0][0], 0)
+        self.assertEqual(segments[-1][1], len(samples))
+        # The cut lands in the second pause (~29.6-30.2s), the one closest to 30s
+        self.assertTrue(29.6 * RATE <= segments[0][1] <= 30.2 * RATE)
+        self.assertEqual(segments[0][1], segments[1][0])
+
+    def test_forced_cut_without_pauses_overlaps(self):
+        samples = _speech(100)
+        segments = long_audio.split_at_silence(samples, RATE, target_seconds=30, max_seconds=45, overlap_seconds=1.0)
+        self.assertEqual(segments[0], (0, 45 * RATE))
+        self.assertEqual(segments[1][0], 44 * RATE)
+        self.assertEqual(segments[-1][1], len(samples))
+
+    def test_short_audio_is_one_segment(self):
+        self.assertEqual(long_audio.split_at_silence(_speech(10), RATE), [(0, 10 * RATE)])
+
+class TestTranscribeLongAudio(unittest.TestCase):
+
+    def test_segments_are_stitched_in_order(self):
+        samples = _speech(100)
+        with patch.object(transcription.SubprocessBackend, 'transcribe', side_effect=["one two", "two three", "four"]):
+            self.assertEqual(long_audio.transcribe_long_audio(samples, workers=1), "one two three four")
+
+    def test_cancelling_the_job_stops_the_segments(self):
+        job = jobs.Job("long audio")
+
+        def transcribe(*args):
+            job.cancel() # e.g. interrupt while the first segment is running
+            jobs.check_cancelled()
+
+        with patch.object(transcription.SubprocessBackend, 'transcribe', side_effect=transcribe) as mock_transcribe, \
+                jobs.activate(job):
+            with self.assertRaises(jobs.JobCancelled):
+                long_audio.transcribe_long_audio(_speech(100), workers=1)
+        mock_transcribe.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
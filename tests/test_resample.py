@@ -0,0 +1,66 @@
+import unittest
+import numpy as np
+
+from core.resample import StreamingResampler, resample
+
+def _sine(rate, seconds, frequency=440, amplitude=10000):
+    t = np.arange(int(rate * seconds)) / rate
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.int16)
+
+class TestStreamingResampler(unittest.TestCase):
+
+    def test_chunked_output_matches_one_shot(self):
+        samples = _sine(44100, 1.0)
+        whole = StreamingResampler(44100, 16000).process(samples)
+
+        resampler = StreamingResampler(44100, 16000)
+        chunked = np.concatenate([resampler.process(samples[i:i + 2822].tobytes()) for i in range(0, len(samples), 2822)])
+
+        np.testing.assert_array_equal(chunked, whole)
+        self.assertEqual(len(whole), 16000)
+
+    def test_stereo_48k_is_downmixed_and_keeps_level(self):
+        left = _sine(48000, 1.0)
+        stereo = np.column_stack((left, left)).ravel()
+        output = StreamingResampler(48000, 16000, channels=2).process(stereo)
+
+        self.assertEqual(len(output), 16000)
+        rms = np.sqrt(np.mean(output[100:-100].astype(np.float64) ** 2))
+        self.assertAlmostEqual(rms, 10000 / np.sqrt(2), delta=100)
+
+    def test_content_above_target_nyquist_is_filtered(self):
+        output = StreamingResampler(48000, 16000).process(_sine(48000, 1.0, frequency=12000))
+        self.assertLess(np.abs(output[100:]).max(), 200)
+
+    def test_tone_just_above_target_nyquist_is_filtered(self):
+        for in_rate, frequency in ((48000, 9000), (44100, 8500)):
+            output = resample(_sine(in_rate, 1.0, frequency=frequency), in_rate, 16000)
+            # More than 60 dB below the input level once the filter has filled.
+            self.assertLess(np.abs(output[200:-200]).max(), 10, (in_rate, frequency))
+
+    def test_speech_band_keeps_level(self):
+        output = resample(_sine(48000, 1.0, frequency=6000), 48000, 16000)
+        rms = np.sqrt(np.mean(output[200:-200].astype(np.float64) ** 2))
+        self.assertAlmostEqual(rms, 10000 / np.sqrt(2), delta=100)
+
+    def test_flush_returns_the_end_of_the_recording(self):
+        samples = np.zeros(4800, dtype=np.int16)
+        samples[-1] = 30000 # a click on the very last sample
+        resampler = StreamingResampler(48000, 16000)
+        self.assertLess(np.abs(resampler.process(samples)).max(), 100)
+        tail = resampler.flush()
+        self.assertGreater(np.abs(tail).max(), 5000)
+
+        # flush() doesn't disturb a stream that carries on.
+        more = _sine(48000, 0.1)
+        continuous = StreamingResampler(48000, 16000)
+        continuous.process(samples)
+        np.testing.assert_array_equal(resampler.process(more), continuous.process(more))
+        np.testing.assert_array_equal(resample(samples, 48000, 16000), np.concatenate((StreamingResampler(48000, 16000).process(samples), tail)))
+
+    def test_native_16k_mono_passes_through(self):
+        samples = _sine(16000, 0.1)
+        np.testing.assert_array_equal(StreamingResampler(16000, 16000).process(samples.tobytes()), samples)
+
+if __name__ == '__main__':
+    unittest.main()
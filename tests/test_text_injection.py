@@ -0,0 +1,61 @@
+import unittest
+from unittest.mock import patch
+
+import core.text_injection as text_injection
+
+class TestReplaceInjectedText(unittest.TestCase):
+
+    def setUp(self):
+        for name, value in (('_input_events', 0), ('_input_listeners', ()), ('_last_injection', None)):
+            patcher = patch.object(text_injection, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch.object(text_injection, '_foreground_window', return_value=42)
+        self.mock_window = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.object(text_injection.time, 'sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        text_injection.inject_text("draft text", replaceable=True)
+
+    def test_untouched_injection_is_replaced(self):
+        with patch.object(text_injection, 'inject_text') as mock_inject:
+            self.assertTrue(text_injection.replace_injected_text("draft text", "refined text"))
+        mock_inject.assert_called_once_with("refined text")
+
+    def test_input_since_injection_prevents_replacement(self):
+        text_injection._count_input_event() # the user typed or clicked
+        with patch.object(text_injection, 'inject_text') as mock_inject:
+            self.assertFalse(text_injection.replace_injected_text("draft text", "refined text"))
+        mock_inject.assert_not_called()
+
+    def test_focus_change_prevents_replacement(self):
+        self.mock_window.return_value = 7
+        self.assertFalse(text_injection.replace_injected_text("draft text", "refined text"))
+
+    def test_later_injection_prevents_replacement(self):
+        text_injection.inject_text("next dictation")
+        self.assertFalse(text_injection.replace_injected_text("draft text", "refined text"))
+
+    def test_plain_injection_does_not_track_input(self):
+        with patch.object(text_injection, '_start_input_tracking') as mock_tracking:
+            text_injection.inject_text("plain dictation")
+        mock_tracking.assert_not_called()
+        self.assertFalse(text_injection.replace_injected_text("plain dictation", "refined text"))
+
+    def test_line_break_is_one_backspace(self):
+        text_injection.inject_text("first line\r\nsecond", replaceable=True)
+        keyboard = text_injection.Controller.return_value
+        keyboard.press.reset_mock()
+        with patch.object(text_injection, 'inject_text'):
+            self.assertTrue(text_injection.replace_injected_text("first line\r\nsecond", "refined"))
+        self.assertEqual(keyboard.press.call_count, len("first line") + 1 + len("second"))
+
+    def test_text_outside_the_bmp_is_not_replaced(self):
+        text_injection.inject_text("thumbs up \U0001F44D", replaceable=True)
+        with patch.object(text_injection, 'inject_text') as mock_inject:
+            self.assertFalse(text_injection.replace_injected_text("thumbs up \U0001F44D", "refined"))
+        mock_inject.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
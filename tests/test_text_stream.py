@@ -0,0 +1,64 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from core.text_stream import SentenceSplitter, ThinkFilter
+
+import core.ai as ai
+
+def _feed_all(stream, chunks):
+    return "".join(stream.feed(chunk) for chunk in chunks) + stream.flush()
+
+class TestThinkFilter(unittest.TestCase):
+
+    def test_removes_think_block_split_across_chunks(self):
+        chunks = ["<th", "ink>let me", " see</thi", "nk>\nThe answer", " is 4."]
+        self.assertEqual(_feed_all(ThinkFilter(), chunks), "\nThe answer is 4.")
+
+    def test_text_without_tags_passes_through_as_it_arrives(self):
+        think_filter = ThinkFilter()
+        self.assertEqual(think_filter.feed("Hello there"), "Hello there")
+        self.assertEqual(think_filter.feed(" a < b"), " a < b")
+
+    def test_holds_back_possible_tag_start(self):
+        think_filter = ThinkFilter()
+        self.assertEqual(think_filter.feed("Hi <thi"), "Hi ")
+        self.assertEqual(think_filter.feed("s is fine"), "<this is fine")
+
+    def test_unclosed_think_block_is_dropped(self):
+        self.assertEqual(_feed_all(ThinkFilter(), ["Answer. <think>still thinking"]), "Answer. ")
+
+class TestSentenceSplitter(unittest.TestCase):
+
+    def test_sentences_are_returned_as_they_complete(self):
+        splitter = SentenceSplitter()
+        self.assertEqual(splitter.feed("Hello there. How"), ["Hello there."])
+        self.assertEqual(splitter.feed(" are you?"), [])  # the next character is still unknown
+        self.assertEqual(splitter.feed(" Fine"), ["How are you?"])
+        self.assertEqual(splitter.flush(), "Fine")
+
+    def test_does_not_split_numbers_or_abbreviations(self):
+        splitter = SentenceSplitter()
+        self.assertEqual(splitter.feed("Pi is 3.14 e.g. roughly. Dr. Who said hi! "),
+                         ["Pi is 3.14 e.g. roughly.", "Dr. Who said hi!"])
+
+    def test_line_breaks_end_sentences(self):
+        self.assertEqual(SentenceSplitter().feed("- first item\n- second"), ["- first item"])
+
+class TestOllamaStreaming(unittest.TestCase):
+
+    def test_sentences_are_passed_on_while_streaming(self):
+        lines = [json.dumps({"response": token, "done": False}).encode()
+                 for token in ["<think>hmm</think>", "It is", " sunny. Take", " a hat."]]
+        lines.append(json.dumps({"response": "", "done": True}).encode())
+        response = MagicMock()
+        response.__enter__.return_value.iter_lines.return_value = lines
+        spoken = []
+        with patch.object(ai.http_client, 'post', return_value=response) as mock_post:
+            raw_text = ai._stream_ollama_response("http://localhost:11434", {"model": "m", "prompt": "p", "stream": False}, spoken.append)
+        self.assertEqual(spoken, ["It is sunny.", "Take a hat."])
+        self.assertEqual(ai._strip_thinking(raw_text), "It is sunny. Take a hat.")
+        self.assertTrue(mock_post.call_args.kwargs["json"]["stream"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,23 @@
+import unittest
+
+from core.transcript_stitching import stitch, stitch_all
+
+class TestTranscriptStitching(unittest.TestCase):
+
+    def test_joins_pieces_without_overlap(self):
+        self.assertEqual(stitch("Hello there.", "How are you?"), "Hello there. How are you?")
+
+    def test_drops_repeated_boundary_words(self):
+        self.assertEqual(stitch("I went to the store", "the store and bought milk."), "I went to the store and bought milk.")
+
+    def test_overlap_ignores_case_and_punctuation(self):
+        self.assertEqual(stitch("Let's meet at noon.", "At noon, then."), "Let's meet at noon. then.")
+
+    def test_fully_repeated_piece_is_dropped(self):
+        self.assertEqual(stitch("Thank you.", "thank you"), "Thank you.")
+
+    def test_stitch_all_skips_empty_pieces(self):
+        self.assertEqual(stitch_all(["", "one two", " ", "two three", ""]), "one two three")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import numpy as np
+
+import core.transcription as transcription
+import core.incremental_transcription as incremental_transcription
+import core.two_pass_transcription as two_pass_transcription
+from core.audio_buffer import PcmBuffer
+import core.dictation_session as dictation_session
+from core import jobs
+
+class TestBackendSelection(unittest.TestCase):
+
+    def _patch_availability(self, **available):
+        patchers = [patch.object(backend, 'is_available', return_value=available.get(name, False))
+                    for name, backend in transcription.BACKENDS.items()]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_auto_prefers_resident_backends(self):
+        self._patch_availability(in_process=True, server=True, subprocess=True)
+        self.assertEqual([b.name for b in transcription.get_backends("auto")], ["in_process", "server", "subprocess"])
+
+    def test_explicit_backend_only_falls_back_to_subprocess(self):
+        self._patch_availability(in_process=True, server=True, subprocess=True)
+        self.assertEqual([b.name for b in transcription.get_backends("server")], ["server", "subprocess"])
+        self.assertEqual([b.name for b in transcription.get_backends("subprocess")], ["subprocess"])
+
+    def test_backends_must_implement_the_interface(self):
+        class Incomplete(transcription.TranscriptionBackend):
+            def is_available(self):
+                return True
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_unavailable_backend_is_skipped(self):
+        self._patch_availability(server=True, subprocess=True)
+        self.assertEqual([b.name for b in transcription.get_backends("auto")], ["server", "subprocess"])
+
+    def test_transcribe_audio_moves_to_next_backend_on_none(self):
+        first, second = MagicMock(), MagicMock()
+        first.transcribe.return_value = None
+        second.transcribe.return_value = "hello world"
+        samples = (np.sin(np.arange(16000) / 5) * 8000).astype(np.int16)
+
+        with patch.object(transcription, 'get_backends', return_value=[first, second]):
+            self.assertEqual(transcription.transcribe_audio(samples), "hello world")
+        first.transcribe.assert_called_once()
+        second.transcribe.assert_called_once()
+
+class TestLongAudio(unittest.TestCase):
+
+    def setUp(self):
+        self.samples = (np.sin(np.arange(16000 * 90) / 5) * 8000).astype(np.int16)
+        patcher = patch.object(transcription.long_audio, 'is_long', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _backend(self, name, text):
+        backend = MagicMock()
+        backend.name = name
+        backend.transcribe.return_value = text
+        return backend
+
+    def test_resident_backend_transcribes_long_audio_in_one_pass(self):
+        backend = self._backend("server", "all of it")
+        with patch.object(transcription, 'get_backends', return_value=[backend]), \
+                patch.object(transcription.long_audio, 'transcribe_long_audio') as mock_long:
+            self.assertEqual(transcription.transcribe_audio(self.samples), "all of it")
+        mock_long.assert_not_called()
+
+    def test_failed_parallel_run_falls_back_to_one_pass(self):
+        backend = self._backend("subprocess", "all of it")
+        with patch.object(transcription, 'get_backends', return_value=[backend]), \
+                patch.object(transcription.long_audio, 'transcribe_long_audio', return_value="Error: whisper failed") as mock_long:
+            self.assertEqual(transcription.transcribe_audio(self.samples), "all of it")
+        mock_long.assert_called_once()
+        backend.transcribe.assert_called_once()
+
+class TestInterruptDuringRecording(unittest.TestCase):
+
+    def test_interrupt_while_recording_still_transcribes_the_dictation(self):
+        session = dictation_session.DictationSession(False)
+        self.addCleanup(session.complete)
+        jobs.cancel_all_jobs() # e.g. interrupt_speech() while the user is still talking
+        session.stop_recording()
+        self.assertFalse(session.job.cancelled)
+
+        backend = MagicMock()
+        backend.transcribe.return_value = "still here"
+        samples = (np.sin(np.arange(16000) / 5) * 8000).astype(np.int16)
+        with patch.object(transcription, 'get_backends', return_value=[backend]), jobs.activate(session.job):
+            self.assertEqual(transcription.transcribe_audio(samples), "still here")
+
+    def test_interrupt_after_recording_cancels_the_dictation(self):
+        session = dictation_session.DictationSession(False)
+        self.addCleanup(session.complete)
+        session.stop_recording()
+        jobs.cancel_all_jobs()
+        self.assertTrue(session.job.cancelled)
+
+class TestIncrementalTranscriber(unittest.TestCase):
+
+    def test_windows_are_cut_at_pauses_and_tail_is_stitched(self):
+        speech = (np.sin(np.arange(16000 * 3) / 5) * 8000).astype(np.int16)
+        pause = np.zeros(16000 // 2, dtype=np.int16)
+        buffer = PcmBuffer(sample_rate=16000)
+        buffer.append(np.concatenate((speech, pause, speech)))
+
+        with patch.object(incremental_transcription, 'get_config', return_value={
+                'transcription': {'incremental_min_window_seconds': 2.0, 'incremental_pause_ms': 300}}):
+            transcriber = incremental_transcription.IncrementalTranscriber(buffer)
+        with patch.object(transcription, 'transcribe_audio', side_effect=["first part", "part two"]) as mock_transcribe:
+            self.assertTrue(transcriber._transcribe_next_window())
+            text = transcriber.finish(buffer.finalize())
+
+        window, tail = (c.args[0] for c in mock_transcribe.call_args_list)
+        # The window is cut inside the pause, after the first stretch of speech
+        self.assertTrue(len(speech) <= len(window) <= len(speech) + len(pause))
+        self.assertEqual(len(window) + len(tail), len(speech) * 2 + len(pause))
+        self.assertEqual(text, "first part two")
+
+class TestTwoPassTranscriber(unittest.TestCase):
+
+    def setUp(self):
+        config = {'whisper_model': 'base', 'transcription': {
+            'draft_model': 'tiny', 'two_pass_min_difference': 0.15, 'two_pass_actions': {'ai_dictation': True}}}
+        patcher = patch.object(two_pass_transcription, 'get_config', return_value=config)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.audio = np.zeros(16000, dtype=np.int16)
+
+    def test_enabled_per_action(self):
+        self.assertTrue(two_pass_transcription.is_enabled('ai_dictation'))
+        self.assertFalse(two_pass_transcription.is_enabled('toggle_dictation'))
+        self.assertFalse(two_pass_transcription.is_enabled(None))
+
+    def test_draft_uses_draft_model_then_refines_with_configured_model(self):
+        with patch.object(transcription, 'transcribe_audio',
+                          side_effect=["draft text", "refined text"]) as mock_transcribe:
+            transcriber = two_pass_transcription.TwoPassTranscriber(self.audio)
+            self.assertEqual(transcriber.draft(), "draft text")
+            self.assertEqual(transcriber.refined(), "refined text")
+        self.assertEqual(mock_transcribe.call_args_list[0].kwargs, {'model_name': 'tiny'})
+        self.assertEqual(mock_transcribe.call_args_list[1].kwargs, {})
+
+    def test_failed_draft_falls_back_to_configured_model(self):
+        with patch.object(transcription, 'transcribe_audio',
+                          side_effect=["Error: model not found", "refined text"]):
+            transcriber = two_pass_transcription.TwoPassTranscriber(self.audio)
+            self.assertEqual(transcriber.draft(), "refined text")
+            self.assertIsNone(transcriber.refined())
+
+    def test_material_difference(self):
+        self.assertFalse(two_pass_transcription.differs_materially("Hello, world.", "hello world"))
+        self.assertTrue(two_pass_transcription.differs_materially("hello word", "hello world"))
+
+if __name__ == '__main__':
+    unittest.main()
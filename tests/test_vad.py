@@ -0,0 +1,60 @@
+import unittest
+import numpy as np
+
+from core.vad import SilenceEndpointer, frame_energy_db, trim_silence
+
+RATE = 16000
+
+def _tone(seconds, amplitude=8000):
+    t = np.arange(round(RATE * seconds)) / RATE
+    return (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+
+def _silence(seconds):
+    return np.zeros(round(RATE * seconds), dtype=np.int16)
+
+class TestVad(unittest.TestCase):
+
+    def test_frame_energy(self):
+        energy = frame_energy_db(np.concatenate((_silence(0.03), _tone(0.03))), 480)
+        self.assertEqual(len(energy), 2)
+        self.assertLess(energy[0], -100)
+        self.assertGreater(energy[1], -20)
+
+    def test_trims_leading_and_trailing_silence(self):
+        samples = np.concatenate((_silence(0.99), _tone(0.9), _silence(2.01)))
+        trimmed, report = trim_silence(samples, RATE, padding_ms=90)
+
+        self.assertAlmostEqual(report['original_seconds'], 3.9)
+        # The tone plus 90 ms of padding on each side
+        self.assertAlmostEqual(report['trimmed_seconds'], 1.08, places=2)
+        self.assertAlmostEqual(report['removed_seconds'], 3.9 - report['trimmed_seconds'])
+        self.assertEqual(len(trimmed), int(round(report['trimmed_seconds'] * RATE)))
+
+    def test_long_pauses_are_shortened(self):
+        samples = np.concatenate((_tone(0.6), _silence(3.0), _tone(0.6)))
+        trimmed, report = trim_silence(samples, RATE, padding_ms=0, max_pause_ms=600)
+        self.assertAlmostEqual(report['trimmed_seconds'], 1.8, places=2)
+
+        short_pause = np.concatenate((_tone(0.6), _silence(0.3), _tone(0.6)))
+        trimmed, report = trim_silence(short_pause, RATE, padding_ms=0, max_pause_ms=600)
+        np.testing.assert_array_equal(trimmed, short_pause)
+
+    def test_silence_only_returns_empty(self):
+        trimmed, report = trim_silence(_silence(2.0), RATE)
+        self.assertEqual(len(trimmed), 0)
+        self.assertAlmostEqual(report['removed_seconds'], 2.0)
+
+class TestSilenceEndpointer(unittest.TestCase):
+
+    def test_triggers_once_after_trailing_silence(self):
+        endpointer = SilenceEndpointer(RATE, silence_ms=500)
+        # Silence before any speech never ends the recording
+        self.assertFalse(any(endpointer.feed(_silence(0.064)) for _ in range(20)))
+
+        self.assertFalse(endpointer.feed(_tone(0.064).tobytes()))
+        results = [endpointer.feed(_silence(0.064).tobytes()) for _ in range(10)]
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(results.index(True), 7) # 8 chunks of 64 ms reach 500 ms
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import glob
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+
+from core.audio_buffer import pcm_to_wav_bytes
+import core.transcription as transcription
+import core.whisper_benchmark as whisper_benchmark
+
+def _row(threads, beam_size, rtf):
+    return {"threads": threads, "beam_size": beam_size, "seconds": rtf * 10, "audio_seconds": 10.0, "rtf": rtf}
+
+class TestPickBest(unittest.TestCase):
+
+    def test_fastest_greedy_threads_and_affordable_beam(self):
+        tuning = whisper_benchmark.pick_best([
+            _row(2, 1, 0.4), _row(4, 1, 0.2), _row(8, 1, 0.25),
+            _row(2, 5, 0.9), _row(4, 5, 0.45), _row(8, 5, 0.5),
+        ])
+        self.assertEqual(tuning["greedy_threads"], 4)
+        self.assertEqual(tuning["beam_size"], 5)
+        self.assertEqual(tuning["beam_threads"], 4)
+        self.assertEqual(tuning["greedy_rtf"], 0.2)
+
+    def test_greedy_and_beam_thread_counts_are_kept_apart(self):
+        tuning = whisper_benchmark.pick_best([_row(8, 1, 0.2), _row(4, 1, 0.3), _row(8, 5, 0.5), _row(4, 5, 0.4)])
+        self.assertEqual(tuning["greedy_threads"], 8)
+        self.assertEqual(tuning["beam_threads"], 4)
+
+    def test_slow_beam_search_falls_back_to_greedy(self):
+        tuning = whisper_benchmark.pick_best([_row(4, 1, 0.3), _row(4, 5, 1.2)])
+        self.assertEqual(tuning["beam_size"], 1)
+        self.assertEqual(tuning["beam_rtf"], 1.2)
+
+class TestDecodingParams(unittest.TestCase):
+
+    def test_short_utterances_decode_greedily(self):
+        config = {"transcription": {"short_utterance_seconds": 8.0, "tuning": {
+            "base": {"greedy_threads": 6, "beam_threads": 4, "beam_size": 5}, "tiny": {"threads": 2, "beam_size": 1}}}}
+        with patch.object(transcription, 'get_config', return_value=config):
+            self.assertEqual(transcription.get_decoding_params("base", 3.0), {"threads": 6, "beam_size": 1})
+            self.assertEqual(transcription.get_decoding_params("base", 20.0), {"threads": 4, "beam_size": 5})
+            self.assertEqual(transcription.get_decoding_params("tiny", 20.0), {"threads": 2, "beam_size": 1})
+            self.assertIsNone(transcription.get_decoding_params("small", 20.0)["beam_size"])
+
+    def test_server_requests_send_the_beam_size(self):
+        with patch.object(transcription.whisper_server, '_ensure_server', return_value=8080), \
+                patch.object(transcription.whisper_server.http_client, 'post') as mock_post:
+            mock_post.return_value.text = "hello"
+            self.assertEqual(transcription.whisper_server.transcribe(b"wav", beam_size=5), "hello")
+        self.assertEqual(mock_post.call_args.kwargs["data"]["beam_size"], "5")
+
+class TestReferenceClips(unittest.TestCase):
+
+    def setUp(self):
+        # A copy of the shipped reference set, so generated audio doesn't land in the tree
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._temp_dir.cleanup)
+        self.clips_dir = self._temp_dir.name
+        self.transcripts = sorted(glob.glob(os.path.join(whisper_benchmark.REFERENCE_CLIPS_DIR, "*.txt")))
+        for path in self.transcripts:
+            shutil.copy(path, self.clips_dir)
+
+    def _speak(self, text, path):
+        samples = (np.sin(np.arange(16000 * 2) / 5) * 8000).astype(np.int16)
+        with open(path, 'wb') as f:
+            f.write(pcm_to_wav_bytes(samples, 16000))
+        return True
+
+    def test_reference_transcripts_are_shipped(self):
+        self.assertGreaterEqual(len(self.transcripts), 3)
+
+    def test_missing_clips_are_generated_with_tts(self):
+        with patch.object(whisper_benchmark, '_synthesize_clip', side_effect=self._speak) as mock_speak:
+            clips = whisper_benchmark.ensure_reference_clips(self.clips_dir)
+            self.assertEqual(len(clips), len(self.transcripts))
+            whisper_benchmark.ensure_reference_clips(self.clips_dir)
+        self.assertEqual(mock_speak.call_count, len(self.transcripts)) # generated once
+
+    def test_no_clips_and_no_tts_is_an_error(self):
+        with patch.object(whisper_benchmark, '_synthesize_clip', return_value=False):
+            with self.assertRaises(FileNotFoundError):
+                whisper_benchmark.ensure_reference_clips(self.clips_dir)
+
+    def test_tuning_benchmark_runs_on_the_shipped_set(self):
+        with patch.object(whisper_benchmark, '_synthesize_clip', side_effect=self._speak):
+            clips = whisper_benchmark.ensure_reference_clips(self.clips_dir)
+        with patch.object(transcription.BACKENDS["subprocess"], 'transcribe', return_value="text") as mock_transcribe:
+            results = whisper_benchmark.benchmark("base", clips, thread_counts=[2, 4])
+        self.assertEqual(len(results), 4) # two thread counts, greedy and beam
+        self.assertEqual(mock_transcribe.call_count, 4 * len(clips))
+        self.assertAlmostEqual(results[0]["audio_seconds"], 2.0 * len(clips))
+
+    def test_model_benchmark_runs_on_the_shipped_set(self):
+        model_path = os.path.join(self.clips_dir, "ggml-base.bin")
+        open(model_path, 'wb').close()
+        # whisper-cli "transcribes" every clip perfectly
+        outputs = [(whisper_benchmark.load_reference_transcript(path), "load time = 12.5 ms", 64 * 1024 * 1024)
+                   for path in self.transcripts]
+        with patch.object(whisper_benchmark, 'REFERENCE_CLIPS_DIR', self.clips_dir), \
+                patch.object(whisper_benchmark, 'RESULTS_DIR', self.clips_dir), \
+                patch.object(whisper_benchmark, '_synthesize_clip', side_effect=self._speak), \
+                patch.object(transcription, '_find_executable', return_value="whisper-cli"), \
+                patch.object(transcription, '_get_model_path', return_value=model_path), \
+                patch.object(whisper_benchmark, '_run_measured', side_effect=outputs):
+            results, results_path = whisper_benchmark.benchmark_models(["base"], clips=None)
+        self.assertEqual(results[0]["wer"], 0.0)
+        self.assertEqual(results[0]["load_ms"], 12.5)
+        self.assertTrue(os.path.exists(results_path))
+
+class TestModelBenchmark(unittest.TestCase):
+
+    def test_word_error_rate_ignores_case_and_punctuation(self):
+        self.assertEqual(whisper_benchmark.word_error_rate("Hello, world.", "hello world"), 0.0)
+        # One substitution and one deletion over four reference words
+        self.assertEqual(whisper_benchmark.word_error_rate("the cat sat down", "the hat sat"), 0.5)
+
+    def test_find_models_includes_quantized_variants(self):
+        with tempfile.TemporaryDirectory() as models_dir:
+            for name in ["ggml-base.bin", "ggml-base.en-q5_1.bin", "ggml-small-q8_0.bin", "notes.txt"]:
+                open(os.path.join(models_dir, name), 'w').close()
+            self.assertEqual(whisper_benchmark.find_models(models_dir), ["base", "base.en-q5_1", "small-q8_0"])
+
+    def test_select_model_picks_fastest_within_wer_threshold(self):
+        results = [
+            {"model": "tiny", "rtf": 0.05, "wer": 0.30},
+            {"model": "base-q5_1", "rtf": 0.10, "wer": 0.12},
+            {"model": "base", "rtf": 0.15, "wer": 0.11},
+            {"model": "small", "error": "failed"},
+        ]
+        self.assertEqual(whisper_benchmark.select_model(results, max_wer=0.15), "base-q5_1")
+        self.assertIsNone(whisper_benchmark.select_model(results, max_wer=0.05))
+
+if __name__ == '__main__':
+    unittest.main()
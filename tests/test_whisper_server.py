@@ -0,0 +1,77 @@
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from core import whisper_server
+
+class TestServerLifecycle(unittest.TestCase):
+
+    def setUp(self):
+        for name, value in (('_server_process', None), ('_server_port', None), ('_server_key', None),
+                            ('_starting', False), ('_stopping', False)):
+            patcher = patch.object(whisper_server, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        for name, kwargs in (('get_config', {'return_value': {}}), ('is_available', {'return_value': True}),
+                             ('_watch_server', {}), ('_terminate', {})):
+            patcher = patch.object(whisper_server, name, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _process(self):
+        process = MagicMock()
+        process.poll.return_value = None
+        return process
+
+    def test_startup_does_not_hold_the_lock(self):
+        launching, release = threading.Event(), threading.Event()
+        def launch(key):
+            launching.set()
+            release.wait(5)
+            return self._process(), 8080
+
+        ports = []
+        with patch.object(whisper_server, '_launch_server', side_effect=launch) as mock_launch:
+            first = threading.Thread(target=lambda: ports.append(whisper_server._ensure_server()))
+            first.start()
+            self.assertTrue(launching.wait(5))
+
+            # Config handlers and other callers aren't blocked by the launch...
+            acquired = whisper_server._server_lock.acquire(timeout=1)
+            self.assertTrue(acquired)
+            whisper_server._server_lock.release()
+
+            # ...and a second caller waits for it instead of launching another server.
+            second = threading.Thread(target=lambda: ports.append(whisper_server._ensure_server()))
+            second.start()
+            release.set()
+            first.join(5)
+            second.join(5)
+
+        self.assertEqual(ports, [8080, 8080])
+        mock_launch.assert_called_once()
+
+    def test_shutdown_is_final_until_start(self):
+        with patch.object(whisper_server, '_launch_server', return_value=(self._process(), 8080)) as mock_launch:
+            self.assertEqual(whisper_server._ensure_server(), 8080)
+            whisper_server.shutdown()
+
+            self.assertIsNone(whisper_server.transcribe(b"wav"))
+            self.assertEqual(mock_launch.call_count, 1)
+
+            self.assertTrue(whisper_server.start())
+            self.assertEqual(mock_launch.call_count, 2)
+
+    def test_server_started_during_shutdown_is_stopped(self):
+        process = self._process()
+        def launch(key):
+            whisper_server.shutdown()
+            return process, 8080
+
+        with patch.object(whisper_server, '_launch_server', side_effect=launch):
+            self.assertIsNone(whisper_server._ensure_server())
+        whisper_server._terminate.assert_called_with(process)
+        self.assertIsNone(whisper_server._server_process)
+
+if __name__ == '__main__':
+    unittest.main()